@@ -1,29 +1,191 @@
 """
 Generate Data for Svelte
 """
+import asyncio
+import functools
 from datetime import datetime
-from pydantic import BaseModel
-from sources.national_rail.models import DeparturesResponse
+
+import httpx
+import pytz
+import structlog
+
+from config import Config, config_store
+from render.models import DashboardInputData, RailwayInformation
+from sources import NationalRail, Weather, Daikin
+from sources.cache import TTLCache
 from sources.weather.models import AirQualityData, WeatherData
-from sources.daikin.models import DaikinInfo
+
+log = structlog.get_logger()
+
+# Deadline for fetching every source
+DASHBOARD_DATA_TIMEOUT = 20
+# Timeout for each HTTP request
+REQUEST_TIMEOUT = 10
+
+
+class SourceCaches:
+    """
+    One cache per upstream source
+    """
+
+    weather = TTLCache("weather")
+    air_quality = TTLCache("air_quality")
+    national_rail = TTLCache("national_rail")
+    daikin = TTLCache("daikin")
+
+
+async def get_railway_information(config: Config) -> RailwayInformation:
+    """
+    One call per origin station, made in worker threads as the SOAP client is blocking
+    """
+    rail_client = await asyncio.to_thread(SourceClients.get_national_rail, config)
+    origin_boards = await asyncio.gather(
+        *(
+            asyncio.to_thread(rail_client.get_origin_boards, at_station, boards)
+            for at_station, boards in NationalRail.group_boards_by_origin(
+                config.stations.boards
+            ).items()
+        )
+    )
+    departures = {}
+    for boards in origin_boards:
+        departures.update(boards)
+    return RailwayInformation(**departures)
+
+
+async def get_weather(config: Config) -> WeatherData:
+    """
+    Current weather for the configured town
+    """
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as http_client:
+        return await Weather.AsyncOpenWeather(
+            config.tokens.open_weather_map, http_client
+        ).get_weather(config.weather.townid, "metric")
 
 
-class RailwayInformation(BaseModel):
+async def get_air_quality(
+    config: Config, weather: "asyncio.Future[WeatherData]"
+) -> AirQualityData:
     """
-    Railway Information
+    Air quality for the configured town, only waiting for the weather
+    to find the coordinates the first time the town is seen
     """
+    coordinates = Weather.town_coordinates.get(config.weather.townid)
+    if coordinates is None:
+        coordinates = (await weather).coord
 
-    northbound: DeparturesResponse
-    southbound: DeparturesResponse
+    async def fetch():
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as http_client:
+            return await Weather.AsyncOpenWeather(
+                config.tokens.open_weather_map, http_client
+            ).get_air_quality(lat=coordinates.lat, lon=coordinates.lon)
 
+    return await SourceCaches.air_quality.get(
+        (coordinates.lat, coordinates.lon), fetch, config.cache.air_quality
+    )
 
-class DashboardInputData(BaseModel):
+
+class SourceClients:
+    """
+    Clients kept between fetches
+    Each is rebuilt only when the configuration sections it depends on change
     """
-    Data for Dashboard
+
+    national_rail: NationalRail.NationalRail | None = None
+    daikin: Daikin.DaikinPoller | None = None
+
+    @classmethod
+    def get_national_rail(cls, config: Config) -> NationalRail.NationalRail:
+        """
+        The National Rail client for the configured token
+        """
+        if cls.national_rail is None:
+            cls.national_rail = NationalRail.NationalRail(
+                config.tokens.national_rail, config.cache.national_rail_wsdl
+            )
+        return cls.national_rail
+
+    @classmethod
+    def get_daikin(cls, config: Config) -> Daikin.DaikinPoller:
+        """
+        The poller for the configured aircon units
+        """
+        if cls.daikin is None:
+            cls.daikin = Daikin.DaikinPoller(config.aircon.endpoints)
+        return cls.daikin
+
+    @classmethod
+    def reset_national_rail(cls, _config: Config):
+        """
+        Rebuild the National Rail client on next use
+        """
+        cls.national_rail = None
+
+    @classmethod
+    def reset_daikin(cls, _config: Config):
+        """
+        Rebuild the Daikin poller on next use, closing the old one's connections
+        """
+        poller, cls.daikin = cls.daikin, None
+        if poller is None:
+            return
+        try:
+            asyncio.get_running_loop().create_task(poller.aclose())
+        except RuntimeError:
+            log.debug("No event loop to close the old Daikin poller")
+
+
+config_store.subscribe("tokens", SourceClients.reset_national_rail)
+config_store.subscribe("cache", SourceClients.reset_national_rail)
+config_store.subscribe("aircon", SourceClients.reset_daikin)
+
+
+async def fetch_dashboard_data(config: Config) -> DashboardInputData:
+    """
+    Fetch every source at the same time, through the source caches
+
+    Raises:
+        asyncio.TimeoutError: The sources took longer than DASHBOARD_DATA_TIMEOUT
     """
+    stations = tuple(
+        (board.name, board.from_crs, board.to_crs, board.rows)
+        for board in config.stations.boards
+    )
+    weather = asyncio.ensure_future(
+        SourceCaches.weather.get(
+            config.weather.townid,
+            functools.partial(get_weather, config),
+            config.cache.weather,
+        )
+    )
+    try:
+        _, air_quality, rail, aircon = await asyncio.wait_for(
+            asyncio.gather(
+                weather,
+                get_air_quality(config, weather),
+                SourceCaches.national_rail.get(
+                    stations,
+                    functools.partial(get_railway_information, config),
+                    config.cache.national_rail,
+                ),
+                SourceCaches.daikin.get(
+                    tuple(config.aircon.endpoints),
+                    SourceClients.get_daikin(config).poll,
+                    config.cache.daikin,
+                ),
+            ),
+            timeout=DASHBOARD_DATA_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        log.error("Timed out fetching dashboard data")
+        raise
 
-    rail: RailwayInformation
-    weather: WeatherData
-    time: datetime
-    air_quality: AirQualityData
-    aircon: list[DaikinInfo]
+    now_utc = datetime.now(pytz.timezone("UTC"))
+    now_london = now_utc.astimezone(pytz.timezone("Europe/London"))
+    return DashboardInputData(
+        time=now_london,
+        rail=rail,
+        weather=weather.result(),
+        air_quality=air_quality,
+        aircon=aircon,
+    )
@@ -7,7 +7,7 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.job import Job
 from fastapi import Request
 import structlog
-from config import load_config
+from config import Config, config_store
 
 log = structlog.get_logger()
 
@@ -41,11 +41,12 @@ class APIConfig:
     def __new__(cls, *args, **kwargs):  # pylint: disable=unused-argument
         return super(APIConfig, cls).__new__(cls)
 
-    def __init__(self):
+    @property
+    def config(self) -> Config:
         """
-        Create Scheduler
+        The current configuration snapshot, reloaded when configuration.ini changes
         """
-        self.config = load_config()
+        return config_store.config
 
     def set_job(self, job: Job):
         """
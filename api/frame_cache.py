@@ -0,0 +1,127 @@
+"""
+Skip rendering when nothing the dashboard shows has changed
+
+Each update fingerprints what the frame is drawn from: the fields of
+`DashboardInputData` the renderers show, the time to the minute, the renderer
+and the layout version. Frames are cached by fingerprint, so an update with a
+known fingerprint reuses the frame instead of rendering. As the minute is part
+of the fingerprint, that is an update run again within the same minute, e.g.
+a manual `/schedule/update` straight after the scheduled one.
+"""
+import hashlib
+import json
+import math
+from collections import OrderedDict
+
+import structlog
+
+from render.models import DashboardInputData
+from sources.national_rail.models import DeparturesResponse
+
+log = structlog.get_logger()
+
+# Bump when the page or the Pillow layout changes, so cached frames are not reused
+LAYOUT_VERSION = 2
+# Frames kept, only the current minute's frames can be hit again, one per renderer
+FRAME_CACHE_SIZE = 2
+
+
+def rounded(value: float) -> tuple[int, int]:
+    """
+    A value as Python's round and Javascript's Math.round show it, they differ at .5
+    """
+    return round(value), math.floor(value + 0.5)
+
+
+def departures_shown(departures: DeparturesResponse) -> dict:
+    """
+    The parts of a board that are drawn
+    """
+    services = departures.trainServices.service if departures.trainServices else []
+    return {
+        "services": [
+            (
+                service.std,
+                service.etd,
+                service.destination.location[0].locationName,
+            )
+            for service in services
+        ],
+        "messages": departures.nrccMessages and departures.nrccMessages.dict(),
+    }
+
+
+def dashboard_fingerprint(data: DashboardInputData, renderer: str) -> str:
+    """
+    Hash of everything a frame rendered from the data depends on
+
+    Args:
+        data: The data the frame is rendered from
+        renderer: Which renderer draws the frame and how, e.g. its dither
+    """
+    weather = data.weather
+    shown = {
+        "layout": LAYOUT_VERSION,
+        "renderer": renderer,
+        # Countdowns change every minute and the clock has no seconds
+        "minute": data.time.strftime("%Y-%m-%d %H:%M"),
+        "northbound": departures_shown(data.rail.northbound),
+        "southbound": departures_shown(data.rail.southbound),
+        "temperatures": [
+            rounded(weather.main.temp),
+            rounded(weather.main.temp_min),
+            rounded(weather.main.temp_max),
+        ],
+        "weather": [weather.weather[0].main, weather.weather[0].description],
+        "aqi": [element.main.aqi for element in data.air_quality.list[:1]],
+        "aircon": [unit.dict() for unit in data.aircon],
+    }
+    return hashlib.blake2b(
+        json.dumps(shown, sort_keys=True, default=str).encode(), digest_size=16
+    ).hexdigest()
+
+
+class FrameCache:
+    """
+    The most recently used packed frames, by dashboard fingerprint
+    """
+
+    def __init__(self, size: int = FRAME_CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._frames: OrderedDict[str, bytes] = OrderedDict()
+
+    def get(self, fingerprint: str) -> bytes | None:
+        """
+        The frame rendered for this fingerprint, counting the hit or miss
+        """
+        frame = self._frames.get(fingerprint)
+        if frame is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._frames.move_to_end(fingerprint)
+        log.info("Dashboard inputs unchanged, reusing frame", fingerprint=fingerprint)
+        return frame
+
+    def put(self, fingerprint: str, frame: bytes):
+        """
+        Store a rendered frame, evicting the least recently used
+        """
+        self._frames[fingerprint] = frame
+        self._frames.move_to_end(fingerprint)
+        while len(self._frames) > self.size:
+            self._frames.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Hits, misses and the hit rate since startup
+        """
+        lookups = self.hits + self.misses
+        return {
+            "frame_cache_hits": self.hits,
+            "frame_cache_misses": self.misses,
+            "frame_cache_hit_rate": self.hits / lookups if lookups else None,
+            "frame_cache_frames": len(self._frames),
+        }
@@ -13,9 +13,13 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from .log_setup import setup_logging
 
+from render.pillow import climate
+
 from .utils import run_dashboard_update
+from .render_webpage import BrowserManager
+from .dashboard_data import SourceClients
 
-from .routers import schedule
+from .routers import display, schedule
 from .dependencies import Scheduler, get_apiconfig
 
 log = structlog.get_logger()
@@ -26,11 +30,15 @@ async def lifespan(fast_app: FastAPI):
     """
     FastAPI Startup/Shutdown
     """
+    if get_apiconfig().config.render.renderer == "pillow":
+        # Rasterize the weather icons now rather than in the first render
+        await asyncio.to_thread(climate.preload_weather_icons)
     fast_app.state.scheduler = Scheduler()
+    fast_app.state.browser = BrowserManager()
     fast_app.state.scheduler.scheduler.add_job(
         run_dashboard_update,
         "cron",
-        args=[get_apiconfig()],
+        args=[get_apiconfig(), fast_app.state.browser],
         minute="*",
         second="0",
         next_run_time=datetime.datetime.now(),
@@ -39,6 +47,11 @@ async def lifespan(fast_app: FastAPI):
 
     yield
 
+    fast_app.state.scheduler.scheduler.shutdown(wait=False)
+    await fast_app.state.browser.stop()
+    if SourceClients.daikin is not None:
+        await SourceClients.daikin.aclose()
+
 
 app = FastAPI(lifespan=lifespan)
 app.add_middleware(
@@ -49,6 +62,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.include_router(schedule.router)
+app.include_router(display.router)
 
 
 def start_uvicorn(async_loop: asyncio.AbstractEventLoop):
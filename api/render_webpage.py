@@ -3,67 +3,315 @@ Use Playwright to render page
 """
 import os
 import io
+import time
 import asyncio
+from pathlib import Path
 
-from playwright.async_api import async_playwright
+from playwright.async_api import (
+    async_playwright,
+    Error as PlaywrightError,
+    TimeoutError as PlaywrightTimeoutError,
+)
 from PIL import Image
+from pydantic import BaseModel
 from structlog import get_logger
 
+from render import threshold
+from waveshare_epd.frame import EPD_HEIGHT, EPD_WIDTH
 
 log = get_logger()
 
 DEFAULT_URL = "http://localhost:8000/index.html"
 
+# Relaunch the browser after this many renders
+MAX_RENDERS = 500
+# Relaunch the browser if its processes use more memory than this
+MAX_MEMORY_MB = 600
+# Deadline for navigating to the page and it becoming ready
+RENDER_TIMEOUT_MS = 30_000
+# The panel's area of the page
+SCREENSHOT_CLIP = {"x": 0, "y": 0, "width": EPD_WIDTH, "height": EPD_HEIGHT}
+# How the screenshot is converted to 1-bit, one of `threshold.METHODS`
+DEFAULT_DITHER = os.getenv("WEBPAGE_DITHER", "threshold")
 
-async def check_class_loaded(page):
+
+class PageNotReadyError(Exception):
+    """
+    The page did not get the `loaded` class before the deadline
+    """
+
+
+class RenderTimings(BaseModel):
+    """
+    How long each phase of a render took, in milliseconds
+    Readiness includes the data load, which is measured inside the browser
+    """
+
+    navigation_ms: float = 0
+    data_load_ms: float = 0
+    readiness_ms: float = 0
+    screenshot_ms: float = 0
+    total_ms: float = 0
+
+
+def elapsed_ms(start: float) -> float:
+    """
+    Milliseconds since a perf_counter start time
+    """
+    return (time.perf_counter() - start) * 1000
+
+
+def process_tree_rss_mb(root_pid: int) -> float:
+    """
+    Sum the resident memory of every descendant process of root_pid
+    This covers the Playwright driver and the browser it launched
+    Returns 0 where /proc is not available
+    """
+    proc = Path("/proc")
+    children: dict[int, list[int]] = {}
+    for stat_file in proc.glob("[0-9]*/stat"):
+        try:
+            # The process name can contain spaces, so split after the closing bracket
+            fields = stat_file.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat_file.parent.name))
+
+    total_pages = 0
+    pending = list(children.get(root_pid, []))
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            total_pages += int((proc / str(pid) / "statm").read_text().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return total_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+async def check_class_loaded(page, timeout_ms: float = RENDER_TIMEOUT_MS):
     """
     There's a CSS class called `loaded` that indicates page is loaded
+    The check runs in the browser on every animation frame rather than being
+    polled from here, Playwright only accepts "raf" or an interval
+
+    Raises:
+        PageNotReadyError: the page did not load within timeout_ms
     """
-    await page.wait_for_selector(".container")
-    while not await page.evaluate(
-        """() => {
-        let container = document.querySelector(".container");
-        return container ? container.classList.contains("loaded") : false;
-    }"""
-    ):
-        await asyncio.sleep(0.05)
+    try:
+        await page.wait_for_function(
+            """() => {
+            let container = document.querySelector(".container");
+            return container ? container.classList.contains("loaded") : false;
+        }""",
+            polling="raf",
+            timeout=timeout_ms,
+        )
+    except PlaywrightTimeoutError as error:
+        raise PageNotReadyError(f"Page not loaded after {timeout_ms:.0f} ms") from error
 
 
-async def generate_image(page):
+async def get_data_load_ms(page) -> float:
     """
-    Once the page has loaded, generate screenshot
-    The screenshot it stored in a file and returned as a Pillow Image
+    Duration of the slowest fetch made by the page, from the browser's resource timings
+    Zero when the page uses its bundled example data
+    """
+    return await page.evaluate(
+        """() => Math.max(0, ...performance.getEntriesByType("resource")
+            .filter((entry) => entry.initiatorType === "fetch")
+            .map((entry) => entry.duration))"""
+    )
+
+
+def write_screenshot(data: bytes):
     """
-    await page.screenshot(path="playwright-screenshot.png")
-    screenshot_data = await page.screenshot(type="png")
+    Save the screenshot to SCREENSHOT_PATH for debugging, if it is set
+    The file is written in a thread, so the render doesn't wait for the SD card
+    """
+    path = os.getenv("SCREENSHOT_PATH")
+    if not path:
+        return
+
+    def log_failure(write: asyncio.Future):
+        if write.exception() is not None:
+            log.warning("Failed to save screenshot", path=path, error=write.exception())
+
+    write = asyncio.get_running_loop().run_in_executor(
+        None, Path(path).write_bytes, data
+    )
+    write.add_done_callback(log_failure)
+
+
+async def generate_image(page, dither: str = DEFAULT_DITHER) -> bytes:
+    """
+    Once the page has loaded, screenshot the panel's area in memory
+    and convert it to the packed frame
+    """
+    screenshot_data = await page.screenshot(type="png", clip=SCREENSHOT_CLIP)
+    write_screenshot(screenshot_data)
     pil_image = Image.open(io.BytesIO(screenshot_data))
-    pil_image = pil_image.convert("L")  # greyscale
-    threshold = 128  # If it's a 0 or a 1 in the B/W image
-    pil_image = pil_image.point(lambda p: p > threshold and 255)
     log.info(f"Image Dimensions: {pil_image.size}")
-    return pil_image
+    return threshold.to_frame(pil_image, dither)
 
 
-async def render_webpage(url=DEFAULT_URL) -> Image:
+class BrowserManager:
     """
-    Create a browser instance that renders the page
+    Keeps a single Firefox browser, context and page alive between renders
+
+    The browser is started lazily on the first render and then reused.
+    It is recycled after `max_renders` renders or when the browser processes
+    use more than `max_memory_mb`, and relaunched if it has crashed.
     """
 
-    async with async_playwright() as playwright:
-        browser = await playwright.firefox.launch(args=["--disable-web-security"])
-        context = await browser.new_context(
-            viewport={"width": 800, "height": 480}, timezone_id="Europe/London"
+    def __init__(
+        self,
+        max_renders: int = MAX_RENDERS,
+        max_memory_mb: int = MAX_MEMORY_MB,
+        dither: str = DEFAULT_DITHER,
+    ):
+        if dither not in threshold.METHODS:
+            raise ValueError(
+                f"Unknown dither {dither!r}, expected one of {list(threshold.METHODS)}"
+            )
+        self.max_renders = max_renders
+        self.max_memory_mb = max_memory_mb
+        self.dither = dither
+        self.renders = 0
+        self.last_timings: RenderTimings | None = None
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._lock = asyncio.Lock()
+
+    def is_alive(self) -> bool:
+        """
+        Whether the browser is connected and the page is still open
+        """
+        return (
+            self._browser is not None
+            and self._browser.is_connected()
+            and self._page is not None
+            and not self._page.is_closed()
+        )
+
+    async def _launch(self):
+        """
+        Launch the browser and open the page that is reused for every render
+        """
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        log.info("Launching browser")
+        self._browser = await self._playwright.firefox.launch(
+            args=["--disable-web-security"]
         )
-        page = await context.new_page()
+        context = await self._browser.new_context(
+            viewport={"width": EPD_WIDTH, "height": EPD_HEIGHT},
+            timezone_id="Europe/London",
+        )
+        self._page = await context.new_page()
+        self._page.on("console", lambda msg: log.info(msg.text))
+        self.renders = 0
+
+    async def _close_browser(self):
+        """
+        Close the browser, ignoring errors from one that has already crashed
+        """
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except PlaywrightError:
+                log.warning("Browser did not close cleanly", exc_info=True)
+        self._browser = None
+        self._page = None
+
+    def _needs_recycle(self) -> bool:
+        """
+        Check the render count and memory limits
+        """
+        if self.renders >= self.max_renders:
+            log.info("Recycling browser after render limit", renders=self.renders)
+            return True
+        memory_mb = process_tree_rss_mb(os.getpid())
+        if memory_mb > self.max_memory_mb:
+            log.info("Recycling browser above memory limit", memory_mb=memory_mb)
+            return True
+        return False
+
+    async def _get_page(self):
+        """
+        Return a live page, relaunching the browser if necessary
+        """
+        if self.is_alive() and self._needs_recycle():
+            await self._close_browser()
+        if not self.is_alive():
+            if self._browser is not None:
+                log.warning("Browser is no longer running, relaunching")
+            await self._close_browser()
+            await self._launch()
+        return self._page
+
+    async def _render(self, page_url: str) -> bytes:
+        """
+        Navigate the existing page to the url (or reload it) and screenshot it
+        into a packed frame. Navigation and readiness share a single deadline
+        """
+        page = await self._get_page()
+        timings = RenderTimings()
+        render_start = time.perf_counter()
+
+        if page.url == page_url:
+            await page.reload(wait_until="domcontentloaded", timeout=RENDER_TIMEOUT_MS)
+        else:
+            await page.goto(
+                page_url, wait_until="domcontentloaded", timeout=RENDER_TIMEOUT_MS
+            )
+        timings.navigation_ms = elapsed_ms(render_start)
 
-        page.on("console", lambda msg: log.info(msg.text))
+        phase_start = time.perf_counter()
+        await check_class_loaded(
+            page, max(RENDER_TIMEOUT_MS - timings.navigation_ms, 1)
+        )
+        timings.readiness_ms = elapsed_ms(phase_start)
+        timings.data_load_ms = await get_data_load_ms(page)
+
+        phase_start = time.perf_counter()
+        frame = await generate_image(page, self.dither)
+        timings.screenshot_ms = elapsed_ms(phase_start)
+        timings.total_ms = elapsed_ms(render_start)
+
+        self.renders += 1
+        self.last_timings = timings
+        log.info("Render timings", **timings.dict())
+        return frame
 
-        page_url = os.getenv("PAGE_URL", url)
-        log.info("Loading Webpage", url=page_url)
-        await page.goto(page_url)
+    async def render(self, page_url: str) -> bytes:
+        """
+        Render the page, relaunching the browser and retrying once if it fails
+        A page that never becomes ready is not retried
+        """
+        async with self._lock:
+            try:
+                return await self._render(page_url)
+            except PlaywrightError:
+                log.error("Render failed, relaunching browser", exc_info=True)
+                await self._close_browser()
+                return await self._render(page_url)
 
-        await check_class_loaded(page)
-        image = await generate_image(page)
+    async def stop(self):
+        """
+        Close the browser and stop Playwright
+        """
+        async with self._lock:
+            await self._close_browser()
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
 
-        await browser.close()
-        return image
+
+async def render_webpage(browser: BrowserManager, url=DEFAULT_URL) -> bytes:
+    """
+    Render the page in the long-lived browser, as a packed frame
+    """
+    page_url = os.getenv("PAGE_URL", url)
+    log.info("Loading Webpage", url=page_url)
+    return await browser.render(page_url)
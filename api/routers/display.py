@@ -0,0 +1,18 @@
+"""
+Display Operations
+"""
+
+from fastapi import APIRouter
+
+from api.utils import rendered_frames, sent_frames
+
+router = APIRouter()
+
+
+@router.get("/display/stats")
+async def get_display_stats():
+    """
+    Counters for frames sent to the display and frames skipped as unchanged,
+    and how often rendering was skipped as the inputs were unchanged
+    """
+    return {**sent_frames.stats(), **rendered_frames.stats()}
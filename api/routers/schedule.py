@@ -2,16 +2,14 @@
 Scheduler Operations
 """
 
-from datetime import datetime, timedelta
-import pytz
-from fastapi import APIRouter, Depends, Request
+import asyncio
+from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
-from api.dashboard_data import DashboardInputData, RailwayInformation
+from api.dashboard_data import DashboardInputData, fetch_dashboard_data
 from api.dependencies import APIConfig, get_apiconfig
 
-from sources import NationalRail, Weather, Daikin
-
 router = APIRouter()
 
 
@@ -59,36 +57,11 @@ async def get_dashboard_data(
     api_config: APIConfig = Depends(get_apiconfig),
 ):
     """
-    Convert DeparturesResponse to DashboardData's NationalRail object.
+    Fetch every source concurrently for the dashboard
     """
-    client = Weather.OpenWeather(token=APIConfig().config.tokens.open_weather_map)
-    weather = client.get_weather(APIConfig().config.weather.townid, "metric")
-    air_quality = client.get_air_quality(lat=weather.coord.lat, lon=weather.coord.lon)
-    rail_client = NationalRail.NationalRail(api_config.config.tokens.national_rail)
-    northbound_trains = rail_client.get_departures(
-        4,
-        api_config.config.stations.northbound_from,
-        api_config.config.stations.northbound_to,
-    )
-    southbound_trains = rail_client.get_departures(
-        4,
-        api_config.config.stations.southbound_from,
-        api_config.config.stations.southbound_to,
-    )
-
-    aircon_data = []
-    for aircon in api_config.config.aircon.endpoints:
-        aircon_data.append(Daikin.DaikinClient(aircon).get_daikin_info())
-    now_utc = datetime.now(pytz.timezone("UTC"))
-    now_london = now_utc.astimezone(pytz.timezone("Europe/London"))
-    dashboard_data = DashboardInputData(
-        time=now_london,
-        rail=RailwayInformation(
-            northbound=northbound_trains, southbound=southbound_trains
-        ),
-        weather=weather,
-        air_quality=air_quality,
-        aircon=aircon_data,
-    )
-
-    return dashboard_data
+    try:
+        return await fetch_dashboard_data(api_config.config)
+    except asyncio.TimeoutError as error:
+        raise HTTPException(
+            status_code=504, detail="Timed out fetching dashboard data"
+        ) from error
@@ -2,40 +2,120 @@
 Image Generation and sending to Display
 """
 
+import asyncio
 import datetime
+import functools
+import os
 
 import httpx
 import structlog
 from fastapi import HTTPException
 from PIL import Image
 
+from config import Config, config_store
 from render import Pillow
-from sources import NationalRail, Weather
-from waveshare_epd import epd7in5_V2
+from waveshare_epd import epd7in5_V2, transport
+from waveshare_epd.frame import FrameDeduplicator, frame_hash, pack_frame
+from waveshare_epd.power import AWAKE_HOURS, PanelPowerManager
 
+from api.dashboard_data import DashboardInputData, fetch_dashboard_data
 from api.dependencies import APIConfig
-from api.render_webpage import render_webpage
+from api.frame_cache import FrameCache, dashboard_fingerprint
+from api.render_webpage import BrowserManager, render_webpage
 
 log = structlog.get_logger()
 
-# Render with webpage?
-USE_WEBPAGE = True
 # Send Directly via SPI?
 SEND_DIRECTLY = False
 
+# The last frame the display acknowledged, the base for deltas
+sent_frames = FrameDeduplicator()
+# Rendered frames by the fingerprint of their inputs
+rendered_frames = FrameCache()
+# Seconds to wait for the display server
+DISPLAY_SERVER_TIMEOUT = 30
 
-def send_to_server(pil_image: Image):
+
+class DisplayServer:
+    """
+    Keep-alive connection to the display server and the frame encodings it accepts
+    Rebuilt when the endpoints section of the configuration changes
+    """
+
+    client: httpx.AsyncClient | None = None
+    # Until the server says otherwise it may be one that only takes raw frames
+    accepted_encodings: tuple[str, ...] = ("raw",)
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """
+        The HTTP client, created in the running event loop
+        """
+        if cls.client is None:
+            cls.client = httpx.AsyncClient(timeout=DISPLAY_SERVER_TIMEOUT)
+        return cls.client
+
+    @classmethod
+    def reset(cls, _config: Config):
+        """
+        Close the connection to the old display server
+        """
+        client, cls.client = cls.client, None
+        cls.accepted_encodings = ("raw",)
+        sent_frames.last_frame = None
+        if client is None:
+            return
+        try:
+            asyncio.get_running_loop().create_task(client.aclose())
+        except RuntimeError:
+            log.debug("No event loop to close the old display server client")
+
+
+config_store.subscribe("endpoints", DisplayServer.reset)
+
+
+async def post_frame(url: str, encoded: transport.EncodedFrame) -> httpx.Response:
+    """
+    POST an encoded frame and remember which encodings the server accepts
+    """
+    headers = {"Content-Type": "application/octet-stream", **encoded.headers}
+    response = await DisplayServer.get_client().post(
+        url, content=encoded.body, headers=headers
+    )
+    DisplayServer.accepted_encodings = transport.parse_accepted(
+        response.headers.get(transport.ACCEPT_HEADER)
+    )
+    log.info(
+        "Sent frame to display server",
+        encoding=encoded.headers.get(transport.ENCODING_HEADER, "raw"),
+        transferred_bytes=len(encoded.body),
+        status_code=response.status_code,
+    )
+    return response
+
+
+async def send_to_server(frame: bytes):
     """
-    Send to a server
+    Send a packed frame to the display server
+
+    The frame is compressed, or sent as a delta against the last frame the
+    server acknowledged, if the server accepts it. If the server no longer
+    has that frame it answers 409 and the whole frame is sent instead.
     """
     # Define the API endpoint URL
     url = APIConfig().config.endpoints.display_server
-    epd = epd7in5_V2.EPD()
-    data_bytes = bytes(epd.getbuffer(pil_image))
 
-    # Send the bytes to the API
-    headers = {"Content-Type": "application/octet-stream"}
-    response = httpx.post(url, content=data_bytes, headers=headers)
+    response = await post_frame(
+        url,
+        transport.encode_frame(
+            frame, sent_frames.last_frame, DisplayServer.accepted_encodings
+        ),
+    )
+    if response.status_code == 409:
+        log.info("Display server does not have the base frame, sending full frame")
+        response = await post_frame(
+            url, transport.encode_frame(frame, None, DisplayServer.accepted_encodings)
+        )
 
     if response.status_code == 200:
         response_data = response.json()
@@ -47,88 +127,97 @@ def send_to_server(pil_image: Image):
         )
 
 
-def send_to_display(pil_image: Image):
+@functools.lru_cache(maxsize=None)
+def get_panel() -> PanelPowerManager:
     """
-    Send Data to Display
+    The directly connected panel, kept initialised between updates
     """
-    epd = epd7in5_V2.EPD()
-    log.info("Initializing the display...")
-    epd.init()
-    epd.display(epd.getbuffer(pil_image))
-    log.info("Sending Display to Sleep")
-    epd.sleep()
+    return PanelPowerManager(epd7in5_V2.EPD())
 
 
-def is_within_update_hours():
+def send_to_display(frame: bytes):
     """
-    Don't need to update in middle of night
+    Send a packed frame to Display
+    The panel is initialised if it is asleep and sleeps once updates stop
     """
-    dashboard_update_enabled_hours = (6, 24)
-    now = datetime.datetime.now()
-    return (
-        dashboard_update_enabled_hours[0]
-        <= now.hour
-        < dashboard_update_enabled_hours[1]
-    )
+    get_panel().display(frame)
 
 
-def round_number_to_string(number: int) -> str:
-    """Round an int and convert to string"""
-    return str(int(round(number)))
+def is_within_update_hours():
+    """
+    Don't need to update in middle of night
+    """
+    return AWAKE_HOURS[0] <= datetime.datetime.now().hour < AWAKE_HOURS[1]
 
 
-def get_weather():
+def save_pil_image(image: Image.Image):
     """
-    Get Weather from Open Weather Map API
+    Save the rendered image to PILLOW_IMAGE_PATH, if it is set, for debugging
+    Saved in the default executor, off the update
     """
-    client = Weather.OpenWeather(token=APIConfig().config.tokens.open_weather_map)
-    data = client.get_weather(APIConfig().config.weather.townid, "metric")
-    temp = {
-        "Average": round_number_to_string(data.main.temp),
-        "High": round_number_to_string(data.main.temp_max),
-        "Low": round_number_to_string(data.main.temp_min),
-        "Weather": data.weather[0].main,
-    }
-    return temp
+    path = os.getenv("PILLOW_IMAGE_PATH")
+    if not path:
+        return
+
+    def log_failure(save: asyncio.Future):
+        if save.exception() is not None:
+            log.warning(
+                "Failed to save Pillow image", path=path, error=save.exception()
+            )
 
+    save = asyncio.get_running_loop().run_in_executor(None, image.save, path)
+    save.add_done_callback(log_failure)
 
-def manually_generate_pil_image(api_config: APIConfig):
+
+async def manually_generate_pil_image(
+    api_config: APIConfig, data: DashboardInputData | None = None
+):
     """
     Manually generate PIL Image
-    Old Method
-    """
-    rail_client = NationalRail.NationalRail(api_config.config.tokens.national_rail)
-    pil_image = Pillow.render_pillow_dashboard(
-        rail_nb=rail_client.get_departures(
-            4,
-            api_config.config.stations.northbound_from,
-            api_config.config.stations.northbound_to,
-        ),
-        rail_sb=rail_client.get_departures(
-            4,
-            api_config.config.stations.southbound_from,
-            api_config.config.stations.southbound_to,
-        ),
-        temperature_data=get_weather(),
-    )
-    pil_image.save("manual-pillow.png")
+    Draws the same sections from the same cached source data as the webpage,
+    without a browser
+    """
+    if data is None:
+        data = await fetch_dashboard_data(api_config.config)
+    pil_image = Pillow.render_dashboard(data)
+    save_pil_image(pil_image)
     log.info("Generated Manual Pillow Image")
     return pil_image
 
 
-async def run_dashboard_update(api_config: APIConfig):
+async def run_dashboard_update(api_config: APIConfig, browser: BrowserManager):
     """
     Run dashboard update if between two hours
     """
 
     if not is_within_update_hours():
         log.info("Dashboard update disabled at this hour")
+        if SEND_DIRECTLY:
+            get_panel().sleep()
+        return
+    config = api_config.config
+    use_webpage = config.render.renderer == "webpage"
+    if not use_webpage and browser.is_alive():
+        # Switched to Pillow, the browser's memory is no longer needed
+        log.info("Rendering with Pillow, stopping the browser")
+        await browser.stop()
+    data = await fetch_dashboard_data(config)
+    fingerprint = dashboard_fingerprint(
+        data, f"webpage:{browser.dither}" if use_webpage else "pillow"
+    )
+    frame = rendered_frames.get(fingerprint)
+    if frame is None:
+        if use_webpage:
+            frame = await render_webpage(browser)
+        else:
+            frame = pack_frame(await manually_generate_pil_image(api_config, data))
+        rendered_frames.put(fingerprint, frame)
+
+    current_hash = frame_hash(frame)
+    if sent_frames.is_duplicate(current_hash):
         return
-    if USE_WEBPAGE:
-        pil_image = await render_webpage()
-    else:
-        pil_image = manually_generate_pil_image(api_config)
     if SEND_DIRECTLY:
-        send_to_display(pil_image)
+        send_to_display(frame)
     else:
-        send_to_server(pil_image)
+        await send_to_server(frame)
+    sent_frames.mark_displayed(current_hash, frame)
@@ -0,0 +1,66 @@
+"""
+Micro-benchmark of frame packing
+
+Compares `waveshare_epd.frame.pack_frame` with the per-byte generator
+that `EPD.getbuffer` used before it
+
+Run with:
+    python -m benchmarks.frame_packing
+"""
+import random
+import timeit
+
+from PIL import Image
+
+from waveshare_epd.frame import EPD_WIDTH, EPD_HEIGHT, pack_frame
+
+
+def legacy_getbuffer(image: Image.Image) -> bytes:
+    """
+    The previous EPD.getbuffer implementation, plus the copy made by send_to_server
+    """
+    imwidth, imheight = image.size
+    if imwidth == EPD_WIDTH and imheight == EPD_HEIGHT:
+        image = image.convert("1")
+    else:
+        image = image.rotate(90, expand=True).convert("1")
+    buf = bytearray(image.tobytes("raw"))
+    buf = bytearray(val ^ 0xFF for val in buf)
+    return bytes(buf)
+
+
+def sample_images() -> dict[str, Image.Image]:
+    """
+    Noisy test images in each of the modes the renderers produce
+    """
+    rng = random.Random(0)
+    noise = Image.frombytes(
+        "L",
+        (EPD_WIDTH, EPD_HEIGHT),
+        bytes(rng.getrandbits(8) for _ in range(EPD_WIDTH * EPD_HEIGHT)),
+    )
+    return {
+        "L": noise,
+        "RGB": noise.convert("RGB"),
+        "1": noise.convert("1"),
+        "L portrait": noise.rotate(90, expand=True),
+    }
+
+
+def main(number: int = 50):
+    """
+    Time both implementations on each sample image
+    """
+    print(f"{'image':<12}{'legacy ms':>12}{'pack_frame ms':>16}{'speedup':>10}")
+    for name, image in sample_images().items():
+        assert legacy_getbuffer(image) == pack_frame(image)
+        legacy = timeit.timeit(lambda: legacy_getbuffer(image), number=number)
+        packed = timeit.timeit(lambda: pack_frame(image), number=number)
+        print(
+            f"{name:<12}{legacy / number * 1000:>12.3f}"
+            f"{packed / number * 1000:>16.3f}{legacy / packed:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
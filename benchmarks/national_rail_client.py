@@ -0,0 +1,47 @@
+"""
+Construction time of the National Rail SOAP client
+
+- cold: empty WSDL cache, so the WSDL and schemas are downloaded
+- warm: fresh process state, WSDL and schemas read from the disk cache
+- reused: the parsed client shared for the life of the process
+
+Needs network access for the cold run
+
+Run with:
+    python -m benchmarks.national_rail_client
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from sources.national_rail import main as national_rail
+
+
+def construct(cache_path: str) -> float:
+    """
+    Seconds to build a NationalRail client
+    """
+    start = time.perf_counter()
+    national_rail.get_soap_client(national_rail.WSDL_CACHE_TIMEOUT, cache_path)
+    return time.perf_counter() - start
+
+
+def main():
+    """
+    Time cold, warm and reused construction
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = str(Path(directory) / "wsdl-cache.db")
+        national_rail.get_soap_client.cache_clear()
+        cold = construct(cache_path)
+        national_rail.get_soap_client.cache_clear()
+        warm = construct(cache_path)
+        reused = construct(cache_path)
+
+    print(f"{'construction':<14}{'ms':>10}")
+    for name, seconds in (("cold", cold), ("warm", warm), ("reused", reused)):
+        print(f"{name:<14}{seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+End-to-end benchmark of the dashboard update pipeline
+
+Runs the same stages as `api.utils.run_dashboard_update`, against the
+upstream responses recorded in benchmarks/recorded:
+
+- fetch: every source through `fetch_dashboard_data`, with empty caches
+- parse: the recorded responses parsed into the source models on their own
+- render_pillow: `render_dashboard`
+- render_playwright: the webpage, only with --webpage as it needs the page served
+- pack: `pack_frame`
+- transport: `send_to_server`, to server.py running in process
+- display: until the display worker has refreshed the simulated panel
+
+The departure times change every iteration so every frame is new. p50/p95 of
+each stage and the peak RSS are printed, and appended as a JSON line to
+benchmarks/results/pipeline.jsonl along with the git commit.
+
+Run with:
+    python -m benchmarks.pipeline [--iterations 20] [--time-scale 1.0]
+"""
+import argparse
+import asyncio
+import copy
+import datetime
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+import structlog
+
+RECORDED = Path(__file__).parent / "recorded"
+RESULTS = Path(__file__).parent / "results" / "pipeline.jsonl"
+DISPLAY_HOST = "display-server"
+STAGES = (
+    "fetch",
+    "parse",
+    "render_pillow",
+    "render_playwright",
+    "pack",
+    "transport",
+    "display",
+)
+
+
+def recorded_json(name: str) -> dict:
+    """
+    A recorded JSON response
+    """
+    return json.loads((RECORDED / name).read_text())
+
+
+def recorded_text(name: str) -> str:
+    """
+    A recorded text response
+    """
+    return (RECORDED / name).read_text().strip()
+
+
+class RecordedDepartures:
+    """
+    Stands in for the SOAP service, returning the recorded board
+
+    The first departures are delayed by a different amount each call,
+    so consecutive frames differ like they do when trains run late.
+    """
+
+    def __init__(self):
+        self.board = recorded_json("departures_HRN.json")
+        self.calls = 0
+
+    def GetDepBoardWithDetails(self, **_kwargs):  # pylint: disable=invalid-name
+        """
+        The recorded board with delays
+        """
+        self.calls += 1
+        board = copy.deepcopy(self.board)
+        for service in board["trainServices"]["service"][:2]:
+            hour, minute = service["std"].split(":")
+            service["etd"] = f"{hour}:{int(minute) + self.calls % 5:02d}"
+        return board
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answers upstream requests from the recordings and sends
+    frames to the display server app
+    """
+
+    def __init__(self, display_app):
+        self.display = httpx.ASGITransport(app=display_app)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host == DISPLAY_HOST:
+            return await self.display.handle_async_request(request)
+        path = request.url.path
+        if path.endswith("/weather"):
+            return httpx.Response(200, json=recorded_json("weather.json"))
+        if path.endswith("/air_pollution"):
+            return httpx.Response(200, json=recorded_json("air_quality.json"))
+        if path == "/common/basic_info":
+            return httpx.Response(200, text=recorded_text("daikin_basic_info.txt"))
+        if path == "/aircon/get_sensor_info":
+            return httpx.Response(200, text=recorded_text("daikin_sensor_info.txt"))
+        return httpx.Response(404)
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """
+    Nearest rank percentile
+    """
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_commit() -> str | None:
+    """
+    The commit being benchmarked
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_recorded():
+    """
+    Parse every recorded response into its model
+    """
+    # pylint: disable=import-outside-toplevel
+    from sources.daikin.models import BasicInfo, SensorInfo, parse_string_to_data
+    from sources.national_rail.main import split_departures
+    from sources.national_rail.models import Board, DeparturesResponse
+    from sources.weather.models import AirQualityData, WeatherData
+
+    WeatherData.parse_obj(recorded_json("weather.json"))
+    AirQualityData.parse_obj(recorded_json("air_quality.json"))
+    BasicInfo.parse_obj(parse_string_to_data(recorded_text("daikin_basic_info.txt")))
+    SensorInfo.parse_obj(parse_string_to_data(recorded_text("daikin_sensor_info.txt")))
+    board = recorded_json("departures_HRN.json")
+    board["filterLocationName"] = board["locationName"]
+    board["filtercrs"] = board["crs"]
+    departures = DeparturesResponse(**board)
+    for to_crs in ("WIH", "FPK"):
+        split_departures(departures, Board(name=to_crs, from_crs="HRN", to_crs=to_crs))
+
+
+async def run(arguments: argparse.Namespace) -> dict:
+    """
+    Run every iteration and summarise each stage
+    """
+    # pylint: disable=import-outside-toplevel
+    import server
+    from api import utils
+    from api.dashboard_data import SourceCaches, SourceClients, fetch_dashboard_data
+    from api.render_webpage import BrowserManager
+    from config import config_store
+    from render import Pillow
+    from sources import NationalRail
+    from waveshare_epd.frame import frame_hash, pack_frame
+
+    config_store.path = RECORDED / "configuration.ini"
+    config_store.reload_if_changed()
+    config = config_store.config
+
+    rail_client = NationalRail.NationalRail.__new__(NationalRail.NationalRail)
+    rail_client.header_value = None
+    rail_client.client = SimpleNamespace(service=RecordedDepartures())
+    SourceClients.national_rail = rail_client
+
+    panel = server.epd.epdconfig
+    if hasattr(panel, "time_scale"):
+        panel.time_scale = arguments.time_scale
+
+    transport = ReplayTransport(server.app)
+
+    class ReplayClient(httpx.AsyncClient):
+        """
+        Every client the pipeline creates uses the replay transport
+        """
+
+        def __init__(self, *args, **kwargs):
+            kwargs.pop("limits", None)
+            super().__init__(*args, **{**kwargs, "transport": transport})
+
+    browser = BrowserManager() if arguments.webpage else None
+    samples = {stage: [] for stage in STAGES}
+
+    with mock.patch("httpx.AsyncClient", ReplayClient):
+        utils.DisplayServer.reset(config)
+        for iteration in range(arguments.warmup + arguments.iterations):
+            timings = {}
+
+            for cache in vars(SourceCaches).values():
+                if hasattr(cache, "clear"):
+                    cache.clear()
+            start = time.perf_counter()
+            data = await fetch_dashboard_data(config)
+            timings["fetch"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            parse_recorded()
+            timings["parse"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            image = Pillow.render_dashboard(data)
+            timings["render_pillow"] = time.perf_counter() - start
+
+            if browser is not None:
+                start = time.perf_counter()
+                await browser.render(arguments.webpage)
+                timings["render_playwright"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            frame = pack_frame(image)
+            timings["pack"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await utils.send_to_server(frame)
+            utils.sent_frames.mark_displayed(frame_hash(frame), frame)
+            timings["transport"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await server.display_worker.wait_until_idle()
+            timings["display"] = time.perf_counter() - start
+
+            if iteration >= arguments.warmup:
+                for stage, seconds in timings.items():
+                    samples[stage].append(seconds * 1000)
+
+    if browser is not None:
+        await browser.stop()
+    await server.display_worker.stop()
+    server.panel.sleep()
+
+    totals = [
+        sum(samples[stage][index] for stage in STAGES if samples[stage])
+        for index in range(arguments.iterations)
+    ]
+    stages = {
+        stage: {
+            "p50_ms": percentile(values, 0.5),
+            "p95_ms": percentile(values, 0.95),
+            "mean_ms": sum(values) / len(values),
+        }
+        for stage, values in {**samples, "total": totals}.items()
+        if values
+    }
+    return {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "iterations": arguments.iterations,
+        "time_scale": arguments.time_scale,
+        "stages": stages,
+        "skipped": [stage for stage in STAGES if not samples[stage]],
+        "peak_rss_mb": peak_rss_mb(),
+        "panel": panel.counters() if hasattr(panel, "counters") else None,
+    }
+
+
+def main():
+    """
+    Run the benchmark, print the results and append them to the results file
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=1.0,
+        help="Multiplies the simulated panel's latencies, 1 is real time",
+    )
+    parser.add_argument(
+        "--webpage", help="URL of the served dashboard, to include Playwright"
+    )
+    parser.add_argument("--output", type=Path, default=RESULTS)
+    arguments = parser.parse_args()
+
+    # The display server drives the simulated panel unless told otherwise
+    os.environ.setdefault("EPD_BACKEND", "simulated")
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    results = asyncio.run(run(arguments))
+
+    print(f"{'stage':<20}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for stage, stats in results["stages"].items():
+        print(
+            f"{stage:<20}{stats['p50_ms']:>10.1f}"
+            f"{stats['p95_ms']:>10.1f}{stats['mean_ms']:>10.1f}"
+        )
+    for stage in results["skipped"]:
+        print(f"{stage:<20}{'skipped':>10}")
+    print(f"peak RSS {results['peak_rss_mb']:.1f} MB")
+
+    arguments.output.parent.mkdir(parents=True, exist_ok=True)
+    with arguments.output.open("a") as results_file:
+        results_file.write(json.dumps(results) + "\n")
+    print(f"Results appended to {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,38 @@ The configuration for the app
 
 """
 import configparser
+import os
+import threading
+import time
 from pathlib import Path
-from pydantic import BaseSettings
+from typing import Callable, Literal, Mapping
 
+import structlog
+from pydantic import BaseSettings, ValidationError
 
-class Tokens(BaseSettings):
+from sources.national_rail.models import Board
+
+log = structlog.get_logger()
+
+CONFIG_PATH = Path(__file__).parent / "configuration.ini"
+# Seconds between checks of the file's modification time
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+class Section(BaseSettings):
+    """
+    Loaded configuration can't be modified, a new snapshot is loaded instead
+    """
+
+    class Config:
+        """
+        Immutable
+        """
+
+        allow_mutation = False
+
+
+class Tokens(Section):
     """
     API Tokens
     """
@@ -16,18 +43,31 @@ class Tokens(BaseSettings):
     open_weather_map: str
 
 
-class Stations(BaseSettings):
+class Stations(Section):
     """
-    Train Stations to query for
+    Departure boards to query for
+    The layouts expect boards named northbound and southbound
     """
 
-    northbound_from: str
-    northbound_to: str
-    southbound_from: str
-    southbound_to: str
+    boards: list[Board]
+
+    def board(self, name: str) -> Board:
+        """
+        Get a board by name
+
+        Raises:
+            KeyError: No board has that name
+        """
+        for board in self.boards:
+            if board.name == name:
+                return board
+        raise KeyError(
+            f"No board named {name!r} in [stations], "
+            f"configured: {[board.name for board in self.boards]}"
+        )
 
 
-class Weather(BaseSettings):
+class Weather(Section):
     """
     Openweathermap town
     """
@@ -35,7 +75,7 @@ class Weather(BaseSettings):
     townid: int
 
 
-class Endpoints(BaseSettings):
+class Endpoints(Section):
     """
     Openweathermap town
     """
@@ -43,7 +83,7 @@ class Endpoints(BaseSettings):
     display_server: str
 
 
-class AirConConfig(BaseSettings):
+class AirConConfig(Section):
     """
     Aircon settings
     """
@@ -51,7 +91,29 @@ class AirConConfig(BaseSettings):
     endpoints: list[str]
 
 
-class Config(BaseSettings):
+class CacheTTL(Section):
+    """
+    Seconds that each source's data is cached for
+    """
+
+    weather: int = 600
+    air_quality: int = 3600
+    national_rail: int = 60
+    daikin: int = 60
+    national_rail_wsdl: int = 604800
+
+
+class Render(Section):
+    """
+    How the dashboard is rendered
+    webpage screenshots the Svelte page with Firefox, pillow draws it natively
+    without a browser
+    """
+
+    renderer: Literal["webpage", "pillow"] = "webpage"
+
+
+class Config(Section):
     """
     Application Configuration Class
     """
@@ -61,19 +123,71 @@ class Config(BaseSettings):
     weather: Weather
     endpoints: Endpoints
     aircon: AirConConfig
+    cache: CacheTTL = CacheTTL()
+    render: Render = Render()
 
 
-def load_config() -> Config:
+def parse_board(name: str, value: str) -> Board:
+    """
+    Parse a board from `name=FROM,TO[,ROWS]`
+
+    Raises:
+        ValueError: The value isn't in that format
+    """
+    parts = [part.strip() for part in value.split(",")]
+    if not 2 <= len(parts) <= 3:
+        raise ValueError(f"[stations] {name}={value!r}, expected {name}=FROM,TO[,ROWS]")
+    from_crs, to_crs, *rows = parts
+    return Board(
+        name=name, from_crs=from_crs, to_crs=to_crs, rows=rows[0] if rows else 4
+    )
+
+
+def parse_boards(stations: Mapping[str, str]) -> list[Board]:
+    """
+    Parse the boards in the stations section
+
+    The old `<name>_from=FROM` and `<name>_to=TO` pairs are still read,
+    as the board `<name>=FROM,TO`
+
+    Raises:
+        ValueError: A board isn't in either format
+    """
+    boards: dict[str, Board | dict[str, str]] = {}
+    for key, value in stations.items():
+        name, _, end = key.rpartition("_")
+        if name and end in ("from", "to") and "," not in value:
+            boards.setdefault(name, {})[end] = value.strip()
+        else:
+            boards[key] = parse_board(key, value)
+    for name, board in boards.items():
+        if isinstance(board, Board):
+            continue
+        if set(board) != {"from", "to"}:
+            raise ValueError(
+                f"[stations] {name}_from and {name}_to must both be set, "
+                f"or use {name}=FROM,TO[,ROWS]"
+            )
+        log.warning(
+            "Deprecated station keys, use name=FROM,TO[,ROWS]",
+            board=name,
+            value=f"{board['from']},{board['to']}",
+        )
+        boards[name] = Board(name=name, from_crs=board["from"], to_crs=board["to"])
+    return list(boards.values())
+
+
+def load_config(path: Path = CONFIG_PATH) -> Config:
     """
     Load and Return the Config from configuration.ini
     """
     config = configparser.ConfigParser()
-    config.read(Path(__file__).parent / "configuration.ini")
+    config.read(path)
 
     # Convert to nested dict
     config_dict = {
         "tokens": dict(config["tokens"]),
-        "stations": dict(config["stations"]),
+        "stations": {"boards": parse_boards(config["stations"])},
         "weather": {k: int(v) for k, v in config["weather"].items()},
         "endpoints": dict(config["endpoints"]),
         "aircon": {
@@ -81,6 +195,83 @@ def load_config() -> Config:
                 e.strip() for e in config.get("aircon", "endpoints").split(",")
             ]
         },
+        "cache": {k: int(v) for k, v in config["cache"].items()}
+        if config.has_section("cache")
+        else {},
+        "render": dict(config["render"]) if config.has_section("render") else {},
     }
 
     return Config(**config_dict)
+
+
+class ConfigStore:
+    """
+    Loads the configuration once and reloads it when the file changes
+
+    `config` is an immutable snapshot. The file's modification time is checked
+    at most every RELOAD_CHECK_INTERVAL seconds, and a changed file is only swapped
+    in once it has been validated. Callbacks can subscribe to a section and are
+    only called when that section changes.
+    """
+
+    def __init__(self, path: Path = CONFIG_PATH):
+        self.path = path
+        self._snapshot: Config | None = None
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._subscribers: list[tuple[str, Callable[[Config], None]]] = []
+
+    @property
+    def config(self) -> Config:
+        """
+        The current configuration snapshot
+        """
+        if (
+            self._snapshot is None
+            or time.monotonic() - self._checked_at > RELOAD_CHECK_INTERVAL
+        ):
+            self.reload_if_changed()
+        return self._snapshot
+
+    def subscribe(self, section: str, callback: Callable[[Config], None]):
+        """
+        Call callback with the new snapshot whenever `section` changes
+        """
+        self._subscribers.append((section, callback))
+
+    def reload_if_changed(self):
+        """
+        Load the file if its modification time has changed since it was last loaded
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                if self._snapshot is None:
+                    raise
+                log.error("Configuration file missing, keeping the old one")
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                new = load_config(self.path)
+            except (configparser.Error, ValidationError, KeyError, ValueError):
+                if self._snapshot is None:
+                    raise
+                log.error("Invalid configuration, keeping the old one", exc_info=True)
+                self._mtime = mtime
+                return
+            old, self._snapshot, self._mtime = self._snapshot, new, mtime
+
+        if old is None:
+            return
+        log.info("Configuration reloaded", path=str(self.path))
+        for section, callback in self._subscribers:
+            if getattr(old, section) != getattr(new, section):
+                log.info("Configuration section changed", section=section)
+                callback(new)
+
+
+config_store = ConfigStore()
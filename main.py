@@ -3,6 +3,7 @@ Home Dashboard for a WaveShare 7.5 e-ink display with Raspberry PI
 """
 import sys
 import datetime
+import functools
 
 import httpx
 import structlog
@@ -17,6 +18,8 @@ from apscheduler.jobstores.base import JobLookupError
 from sources import NationalRail, Weather
 from render import Pillow
 from waveshare_epd import epd7in5_V2, epdconfig
+from waveshare_epd.frame import pack_frame
+from waveshare_epd.power import AWAKE_HOURS, PanelPowerManager
 
 from config import load_config
 
@@ -27,7 +30,7 @@ config = load_config()
 app = FastAPI()
 
 dashboard_update_interval = datetime.timedelta(minutes=5)
-dashboard_update_enabled_hours = (6, 24)  # Update enabled between 6 AM and 11 PM
+dashboard_update_enabled_hours = AWAKE_HOURS  # Update enabled between 6 AM and 11 PM
 
 scheduler = BackgroundScheduler()
 
@@ -99,16 +102,20 @@ def get_weather():
     return temp
 
 
+@functools.lru_cache(maxsize=None)
+def get_panel() -> PanelPowerManager:
+    """
+    The directly connected panel, created by the first frame sent to it
+    """
+    return PanelPowerManager(epd7in5_V2.EPD())
+
+
 def send_to_display(pil_image: Image):
     """
     Send Data to Display
+    The panel is initialised if it is asleep and sleeps once updates stop
     """
-    epd = epd7in5_V2.EPD()
-    log.info("Initializing the display...")
-    epd.init()
-    epd.display(epd.getbuffer(pil_image))
-    log.info("Sending Display to Sleep")
-    epd.sleep()
+    get_panel().display(pack_frame(pil_image))
 
 
 def send_to_server(pil_image: Image):
@@ -117,8 +124,7 @@ def send_to_server(pil_image: Image):
     """
     # Define the API endpoint URL
     url = "http://192.168.0.50:8000/upload"
-    epd = epd7in5_V2.EPD()
-    data_bytes = bytes(epd.getbuffer(pil_image))
+    data_bytes = pack_frame(pil_image)
 
     # Send the bytes to the API
     headers = {"Content-Type": "application/octet-stream"}
@@ -154,13 +160,10 @@ def run_dashboard_update():
         log.info("Dashboard update disabled at this hour")
         return
     rail_client = NationalRail.NationalRail(config.tokens.national_rail)
+    departures = rail_client.get_boards(config.stations.boards)
     pil_image = Pillow.render_pillow_dashboard(
-        rail_nb=rail_client.get_departures(
-            4, config.stations.northbound_from, config.stations.northbound_to
-        ),
-        rail_sb=rail_client.get_departures(
-            4, config.stations.southbound_from, config.stations.southbound_to
-        ),
+        rail_nb=departures["northbound"],
+        rail_sb=departures["southbound"],
         temperature_data=get_weather(),
     )
 
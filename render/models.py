@@ -0,0 +1,40 @@
+"""
+The data the dashboard is rendered from
+Shared by the API, which fetches it, and the renderers, which draw it
+"""
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from sources.daikin.models import DaikinInfo
+from sources.national_rail.models import DeparturesResponse
+from sources.weather.models import AirQualityData, WeatherData
+
+
+class RailwayInformation(BaseModel):
+    """
+    Railway Information
+    Boards other than northbound and southbound are kept as extra fields
+    """
+
+    northbound: DeparturesResponse
+    southbound: DeparturesResponse
+
+    class Config:
+        """
+        Allow any other configured boards
+        """
+
+        extra = "allow"
+
+
+class DashboardInputData(BaseModel):
+    """
+    Data for Dashboard
+    """
+
+    rail: RailwayInformation
+    weather: WeatherData
+    time: datetime
+    air_quality: AirQualityData
+    aircon: list[DaikinInfo]
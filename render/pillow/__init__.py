@@ -1,4 +1,4 @@
 """
 Module Exports
 """
-from .pillow import render_pillow_dashboard
+from .pillow import PillowDashboard, render_dashboard, render_pillow_dashboard
@@ -1,19 +1,173 @@
 """
 Render the weather data
+
+Weather icons are rasterized from their SVGs once and cached, in memory
+and on disk, as 1-bit images at the size they are drawn
 """
+import functools
+import hashlib
+import math
+import os
 from pathlib import Path
+from typing import NamedTuple
+
 from PIL import ImageDraw, Image
-from svglib.svglib import svg2rlg
-from reportlab.graphics import renderPM
 import structlog
+
+from sources.daikin.models import DaikinInfo
+from sources.weather.models import AirQualityData, WeatherData
 from . import fonts
 
 log = structlog.get_logger()
 
+ICON_DIRECTORY = Path(__file__).parent.parent.parent / "weather_icons"
+WEATHER_ICONS = {
+    "Thunderstorm": "057-storm-7.svg",
+    "Drizzle": "099-rain-4.svg",
+    "Rain": "067-storm-6.svg",
+    "Snow": "047-snow-4.svg",
+    "Atmosphere": "091-sunrise.svg",
+    "Clear": "013-sun-8.svg",
+    "Clouds": "051-cloud-3.svg",
+}
+# Largest size the icon is scaled to, keeping its aspect ratio
+ICON_SIZE = (160, 165)
+ICON_POSITION = (550, 170)
+# Left edge and baselines of the weather description, air quality and aircon lines
+CONDITIONS_X = 60
+CONDITIONS_Y = (110, 132)
+# Rasterized icons, keyed by the hash of the SVG and the size
+ICON_CACHE_DIRECTORY = Path(
+    os.environ.get(
+        "WEATHER_ICON_CACHE",
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "eink-train-display"
+        / "weather_icons",
+    )
+)
+
+
+class Conditions(NamedTuple):
+    """
+    Everything in the conditions lines under the clock
+
+    Attributes:
+        description: The weather, e.g. scattered clouds
+        aqi: Air quality index, 1 (good) to 5 (very poor)
+        aircon: Name, indoor temperature and humidity of each aircon unit
+        outdoor: Outdoor temperature measured by the aircon
+    """
+
+    description: str
+    aqi: int | None
+    aircon: tuple[tuple[str, float, int], ...]
+    outdoor: float | None
+
+
+def js_round(number: float) -> int:
+    """
+    Round half up, as Javascript's Math.round on the webpage does
+    """
+    return math.floor(number + 0.5)
+
+
+def get_temperatures(weather: WeatherData) -> dict:
+    """
+    Temperatures and weather type, rounded the same as the webpage
+    """
+    return {
+        "Average": str(js_round(weather.main.temp)),
+        "High": str(js_round(weather.main.temp_max)),
+        "Low": str(js_round(weather.main.temp_min)),
+        "Weather": weather.weather[0].main,
+    }
+
+
+def get_conditions(
+    weather: WeatherData, air_quality: AirQualityData, aircon: list[DaikinInfo]
+) -> Conditions:
+    """
+    The conditions the webpage shows besides the temperatures
+    """
+    return Conditions(
+        description=weather.weather[0].description,
+        aqi=air_quality.list[0].main.aqi if air_quality.list else None,
+        aircon=tuple(
+            (unit.name, unit.temperature.indoor, unit.humidity) for unit in aircon
+        ),
+        outdoor=aircon[0].temperature.outdoor if aircon else None,
+    )
+
+
+def conditions_lines(conditions: Conditions) -> list[str]:
+    """
+    The weather and air quality, then the aircon units, as they are drawn
+    """
+    weather = conditions.description.upper()
+    if conditions.aqi is not None:
+        weather += f"   AQI: {conditions.aqi}"
+    units = [
+        f"{name.upper()}: {indoor:g}C {humidity}%"
+        for name, indoor, humidity in conditions.aircon
+    ]
+    if conditions.outdoor is not None:
+        units.append(f"OUTDOOR: {conditions.outdoor:g}C")
+    return [weather, "   ".join(units)]
+
+
+def draw_conditions(draw: ImageDraw, conditions: Conditions | None):
+    """
+    Draw the weather description, air quality and aircon, if there are conditions
+    """
+    if conditions is None:
+        return
+    for y_position, line in zip(CONDITIONS_Y, conditions_lines(conditions)):
+        fonts.draw_text(draw, (CONDITIONS_X, y_position), line, fonts.font_traininfo)
+
+
+def rasterize_icon(svg_file: Path, size: tuple[int, int] = ICON_SIZE) -> Image:
+    """
+    Render an SVG to a 1-bit image no larger than size
+
+    The image is converted to 1-bit the same way pasting it onto the
+    dashboard did, so the rendered dashboard does not change.
+    svglib and reportlab are only imported here, off the render path.
+    """
+    # pylint: disable=import-outside-toplevel
+    from reportlab.graphics import renderPM
+    from svglib.svglib import svg2rlg
+
+    log.info("Rasterizing weather icon", path=svg_file)
+    icon = renderPM.drawToPIL(svg2rlg(svg_file))
+    icon.thumbnail(size, Image.LANCZOS)
+    return icon.convert("1")
+
+
+def cached_icon(svg_file: Path, size: tuple[int, int] = ICON_SIZE) -> Image:
+    """
+    The rasterized icon from the disk cache, rasterizing it on a miss
+    """
+    key = hashlib.sha256(svg_file.read_bytes() + repr(size).encode()).hexdigest()
+    cache_file = ICON_CACHE_DIRECTORY / f"{key[:32]}.png"
+    try:
+        with Image.open(cache_file) as cached:
+            return cached.copy()
+    except (OSError, ValueError):
+        pass
+    icon = rasterize_icon(svg_file, size)
+    try:
+        ICON_CACHE_DIRECTORY.mkdir(parents=True, exist_ok=True)
+        icon.save(cache_file, "PNG")
+    except OSError:
+        log.warning("Could not write the weather icon cache", path=cache_file)
+    return icon
 
-def get_weather_icon(weather):
+
+@functools.lru_cache(maxsize=len(WEATHER_ICONS))
+def get_weather_icon(weather) -> Image:
     """
     Returns the Pillow Image for the Weather Icon
+    A 1-bit image at the size it is drawn, which must not be modified
 
     Args:
         weather: Weather Types
@@ -21,27 +175,19 @@ def get_weather_icon(weather):
     Returns:
         Image
     """
-
-    base_path = Path(__file__).parent.parent.parent / "weather_icons"
-    match weather:
-        case "Thunderstorm":
-            svg_file = base_path / "057-storm-7.svg"
-        case "Drizzle":
-            svg_file = base_path / "099-rain-4.svg"
-        case "Rain":
-            svg_file = base_path / "067-storm-6.svg"
-        case "Snow":
-            svg_file = base_path / "047-snow-4.svg"
-        case "Atmosphere":
-            svg_file = base_path / "091-sunrise.svg"
-        case "Clear":
-            svg_file = base_path / "013-sun-8.svg"
-        case "Clouds":
-            svg_file = base_path / "051-cloud-3.svg"
-        case _:
-            raise ValueError(f"Unknown weather type: {weather}")
+    if weather not in WEATHER_ICONS:
+        raise ValueError(f"Unknown weather type: {weather}")
+    svg_file = ICON_DIRECTORY / WEATHER_ICONS[weather]
     log.info("SVG Path for Weather", path=svg_file)
-    return renderPM.drawToPIL(svg2rlg(svg_file))
+    return cached_icon(svg_file)
+
+
+def preload_weather_icons():
+    """
+    Load every icon, so the first render does not rasterize any
+    """
+    for weather in WEATHER_ICONS:
+        get_weather_icon(weather)
 
 
 def draw_weather(image, weather):
@@ -52,49 +198,57 @@ def draw_weather(image, weather):
         image: the image canvas to draw onto to
         weather: Weather description
     """
-    icon = get_weather_icon(weather)
-    icon.thumbnail((160, 165), Image.ANTIALIAS)
-    image.paste(icon, (550, 170))
+    image.paste(get_weather_icon(weather), ICON_POSITION)
 
 
-def small_temp_position(draw, text, temp_end_position):
+def small_temp_position(text, temp_end_position):
     """
     Determines the position for the small temperature (min/max)
     Args:
-        draw: _description_
         text: _description_
         temp_end_position: _description_
 
     Returns:
         Position
     """
-    text_length = draw.textsize(text, font=fonts.font_smalltemp)[0]
+    text_length = fonts.text_width(text, fonts.font_smalltemp)
     return temp_end_position - text_length + 28
 
 
-def draw_temp(temp, image, draw: ImageDraw, temp_end_position):
+def draw_temperatures(temp, draw: ImageDraw, temp_end_position):
     """
-    Draw the temperature, min/max and icon
+    Draw the temperature and min/max
 
     Args:
-        image: _description_
         draw: _description_
         temp_end_position: _description_
     """
     hightext = f'{temp["High"]}°C'
     lowtext = f'{temp["Low"]}°C'
     offset = -10
-    draw.text(
-        (small_temp_position(draw, hightext, temp_end_position), 365 + offset),
+    fonts.draw_text(
+        draw,
+        (small_temp_position(hightext, temp_end_position), 365 + offset),
         hightext,
-        font=fonts.font_smalltemp,
-        fill=0,
+        fonts.font_smalltemp,
     )
-    draw.text(
-        (small_temp_position(draw, lowtext, temp_end_position), 400 + offset),
+    fonts.draw_text(
+        draw,
+        (small_temp_position(lowtext, temp_end_position), 400 + offset),
         lowtext,
-        font=fonts.font_smalltemp,
-        fill=0,
+        fonts.font_smalltemp,
     )
-    draw.text((560, 352), f'{temp["Average"]}°C', font=fonts.font_bigtemp, fill=0)
+    fonts.draw_text(draw, (560, 352), f'{temp["Average"]}°C', fonts.font_bigtemp)
+
+
+def draw_temp(temp, image, draw: ImageDraw, temp_end_position):
+    """
+    Draw the temperature, min/max and icon
+
+    Args:
+        image: _description_
+        draw: _description_
+        temp_end_position: _description_
+    """
+    draw_temperatures(temp, draw, temp_end_position)
     draw_weather(image, temp["Weather"])
@@ -17,6 +17,19 @@ train_columns[3] = train_columns[2] + 103
 TRAIN_LINE_OFFSET = 19
 
 
+def departure_issue_lines(departures) -> list[str]:
+    """
+    The engineering message, or that there are no trains, wrapped into lines
+    """
+    if departures.nrccMessages is not None:
+        message = departures.nrccMessages.message[0].value
+        # The message is long with a link to their website, so split it at the .
+        message = message.split(".", 1)[0]
+    else:
+        message = "No scheduled trains"
+    return textwrap.wrap(message, width=50)
+
+
 def draw_departure_issues(draw, y_position, departures):
     """
     Either return blank or display engineering message when no results
@@ -29,18 +42,12 @@ def draw_departure_issues(draw, y_position, departures):
     Returns:
         _description_
     """
-    #
-    if departures.nrccMessages is not None:
-        message = departures.nrccMessages.message[0]._value_1  # pylint: disable=W0212
-        # The message is long with a link to their website, so split it at the .
-        message = message.split(".", 1)[0]
-    else:
-        message = "No scheduled trains"
-    lines = textwrap.wrap(message, width=50)
+    lines = departure_issue_lines(departures)
     # draw.text((train_columns[0], y), message,  font = font_traininfo, fill = 0)
     y_text = y_position
     for line in lines:
-        _, height = draw.textsize(line, font=fonts.font_traininfo)
+        # The bottom of the line's box from the origin, what textsize measured
+        height = fonts.font_traininfo.getbbox(line)[3]
         draw.text(((train_columns[0]), y_text), line, font=fonts.font_traininfo)
         y_text += height
 
@@ -69,6 +76,32 @@ def get_time_until_next_train(time_now: datetime, service):
     return time_until_text
 
 
+def departure_rows(time_now: datetime, services) -> list[tuple[str, str, str, str]]:
+    """
+    Text of each column for each service, as it is drawn
+    """
+    return [
+        (
+            service.std,
+            service.destination.location[0].locationName.upper()[0:17],
+            service.etd.upper(),
+            get_time_until_next_train(time_now, service),
+        )
+        for service in services
+    ]
+
+
+def departures_inputs(time_now: datetime, departures) -> tuple:
+    """
+    Everything `draw_departures` draws, to tell when it needs drawing again
+    """
+    try:
+        services = departures.trainServices.service
+    except (KeyError, AttributeError):
+        return ("issues", tuple(departure_issue_lines(departures)))
+    return ("services", tuple(departure_rows(time_now, services)))
+
+
 def draw_departures(draw: ImageDraw, y_position, time_now: datetime, departures):
     """
     Draw the Train Departures Information
@@ -89,30 +122,7 @@ def draw_departures(draw: ImageDraw, y_position, time_now: datetime, departures)
         draw_departure_issues(draw, y_position, departures)
         return
 
-    for service in services:
-        time_until_text = get_time_until_next_train(time_now, service)
-        draw.text(
-            (train_columns[0], y_position),
-            service.std,
-            font=fonts.font_traininfo,
-            fill=0,
-        )
-        draw.text(
-            (train_columns[1], y_position),
-            service.destination.location[0].locationName.upper()[0:17],
-            font=fonts.font_traininfo,
-            fill=0,
-        )
-        draw.text(
-            (train_columns[2], y_position),
-            service.etd.upper(),
-            font=fonts.font_traininfo,
-            fill=0,
-        )
-        draw.text(
-            (train_columns[3], y_position),
-            time_until_text,
-            font=fonts.font_traininfo,
-            fill=0,
-        )
+    for row in departure_rows(time_now, services):
+        for column, text in zip(train_columns, row):
+            fonts.draw_text(draw, (column, y_position), text, fonts.font_traininfo)
         y_position += TRAIN_LINE_OFFSET
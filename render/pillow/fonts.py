@@ -1,10 +1,13 @@
 """
 Fonts used by pillow
 """
+import functools
+import math
 from pathlib import Path
+from typing import NamedTuple
 
 import structlog
-from PIL import ImageFont
+from PIL import Image, ImageDraw, ImageFont
 
 log = structlog.get_logger()
 
@@ -19,3 +22,196 @@ font_bigtemp = ImageFont.truetype(str(fontdir / "Overpass/Overpass-ExtraLight.tt
 font_smalltemp = ImageFont.truetype(
     str(fontdir / "Overpass/Overpass-ExtraLight.ttf"), 27
 )
+
+# Everything drawn by the clock, the countdowns and the temperatures
+ATLAS_CHARACTERS = "0123456789:-°C HRMINS"
+
+
+class Glyph(NamedTuple):
+    """
+    A rasterized glyph, positions are in pixels from the pen on the baseline
+
+    Attributes:
+        advance: How far the pen moves, a multiple of 1/64 like FreeType's
+        bbox: Control box as Pillow measures it, left, top, right, bottom
+        sprite: 1-bit ink, None for glyphs without any like space
+        ink_x: Left of the sprite
+        top: Top of the sprite, only comparable between glyphs of one atlas
+    """
+
+    advance: float
+    bbox: tuple[int, int, int, int]
+    sprite: Image.Image | None
+    ink_x: int
+    top: int
+
+
+class GlyphAtlas:
+    """
+    The glyphs of a small alphabet at one font size, rasterized once
+
+    Text is drawn by pasting sprites, laid out the way Pillow's basic layout
+    draws 1-bit text. That aligns glyphs by the tallest one in the string and
+    clips them to the control boxes, so the output is identical to `draw.text`.
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont, characters=ATLAS_CHARACTERS):
+        self.font = font
+        self.ascender = font.getmetrics()[0]
+        self._kerning: dict[tuple[str, str], float] = {}
+        self.glyphs = {}
+        for character in characters:
+            sprite, ink_x = self._rasterize(character)
+            self.glyphs[character] = Glyph(
+                font.getlength(character, mode="1"),
+                font.getbbox(character, mode="1", anchor="ls"),
+                sprite,
+                ink_x,
+                0,
+            )
+
+        # Glyph tops are only known relative to each other, from a single render
+        probe = " ".join(c for c, glyph in self.glyphs.items() if glyph.sprite)
+        canvas, origin = self._canvas(probe)
+        for character, pen_x in zip(probe, self._pen_positions(probe)):
+            glyph = self.glyphs[character]
+            if glyph.sprite is None:
+                continue
+            left = origin[0] + pen_x + glyph.ink_x
+            column = canvas.crop((left, 0, left + glyph.sprite.width, canvas.height))
+            self.glyphs[character] = glyph._replace(top=-column.getbbox()[1])
+
+    def _canvas(self, text: str) -> tuple[Image.Image, tuple[int, int]]:
+        """
+        Text drawn as a mask with room around it, and where its pen started
+        """
+        margin = self.font.size * 2
+        canvas = Image.new(
+            "1", (int(self.font.getlength(text, mode="1")) + margin * 2, margin * 2), 0
+        )
+        origin = (margin, margin)
+        ImageDraw.Draw(canvas).text(origin, text, font=self.font, fill=255, anchor="ls")
+        return canvas, origin
+
+    def _rasterize(self, character: str) -> tuple[Image.Image | None, int]:
+        """
+        The glyph's ink and its left relative to the pen
+        """
+        canvas, origin = self._canvas(character)
+        box = canvas.getbbox()
+        if box is None:
+            return None, 0
+        return canvas.crop(box), box[0] - origin[0]
+
+    def kerning(self, left: str, right: str) -> float:
+        """
+        Adjustment to the advance between two glyphs
+        """
+        pair = (left, right)
+        if pair not in self._kerning:
+            self._kerning[pair] = (
+                self.font.getlength(left + right, mode="1")
+                - self.font.getlength(left, mode="1")
+                - self.font.getlength(right, mode="1")
+            )
+        return self._kerning[pair]
+
+    def _pen_positions(self, text: str) -> list[int]:
+        """
+        Pixel the pen is at for each glyph, rounded like FreeType's 26.6 values
+        """
+        positions = []
+        position = 0.0
+        previous = None
+        for character in text:
+            if previous is not None:
+                position += self.kerning(previous, character)
+            positions.append(math.floor(position + 0.5))
+            position += self.glyphs[character].advance
+            previous = character
+        positions.append(math.floor(position + 0.5))
+        return positions
+
+    def supports(self, text: str) -> bool:
+        """
+        Whether every character is in the atlas
+        """
+        return bool(text) and all(character in self.glyphs for character in text)
+
+    def getbbox(self, text: str) -> tuple[int, int, int, int]:
+        """
+        Same as `font.getbbox(text, mode="1")`
+        """
+        positions = self._pen_positions(text)
+        left, top, right, bottom = 0, 0, positions[-1], 0
+        for character, pen_x in zip(text, positions):
+            bbox = self.glyphs[character].bbox
+            left = min(left, pen_x + bbox[0])
+            top = min(top, bbox[1])
+            right = max(right, pen_x + bbox[2])
+            bottom = max(bottom, bbox[3])
+        return left, self.ascender + top, right, self.ascender + bottom
+
+    def getsize(self, text: str) -> tuple[int, int]:
+        """
+        Width and height from the origin, the right and bottom of `getbbox`
+        """
+        return self.getbbox(text)[2:]
+
+    def text(self, draw: ImageDraw.ImageDraw, xy: tuple[int, int], text: str, fill=0):
+        """
+        Draw text at xy, like `draw.text` with the atlas' font
+        """
+        left, top, right, bottom = self.getbbox(text)
+        glyphs = [
+            (pen_x, self.glyphs[character])
+            for character, pen_x in zip(text, self._pen_positions(text))
+            if self.glyphs[character].sprite
+        ]
+        highest = max((glyph.top for _, glyph in glyphs), default=0)
+        for pen_x, glyph in glyphs:
+            x = pen_x + glyph.ink_x
+            y = top + highest - glyph.top
+            # Pillow clips each glyph to the text's control box
+            clip = (
+                max(left, x),
+                max(top, y),
+                min(right, x + glyph.sprite.width),
+                min(bottom, y + glyph.sprite.height),
+            )
+            if clip[0] >= clip[2] or clip[1] >= clip[3]:
+                continue
+            sprite = glyph.sprite.crop(
+                (clip[0] - x, clip[1] - y, clip[2] - x, clip[3] - y)
+            )
+            draw.bitmap((xy[0] + clip[0], xy[1] + clip[1]), sprite, fill=fill)
+
+
+@functools.lru_cache(maxsize=None)
+def glyph_atlas(font: ImageFont.FreeTypeFont) -> GlyphAtlas:
+    """
+    The atlas for a font, built the first time it is used
+    """
+    log.info("Building glyph atlas", font=font.getname(), size=font.size)
+    return GlyphAtlas(font)
+
+
+def draw_text(draw: ImageDraw.ImageDraw, xy: tuple[int, int], text: str, font, fill=0):
+    """
+    Draw text from the font's glyph atlas, or with FreeType if it has other characters
+    """
+    atlas = glyph_atlas(font)
+    if atlas.supports(text):
+        atlas.text(draw, xy, text, fill)
+    else:
+        draw.text(xy, text, font=font, fill=fill)
+
+
+def text_width(text: str, font) -> int:
+    """
+    Width of text from the origin, the right of `font.getbbox(text)`
+    """
+    atlas = glyph_atlas(font)
+    if atlas.supports(text):
+        return atlas.getsize(text)[0]
+    return font.getbbox(text)[2]
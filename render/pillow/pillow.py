@@ -1,16 +1,52 @@
 """
 Render with Pillow
+
+Draws every section of the webpage from the same data, a
+`render.models.DashboardInputData`, without a browser.
+
+The dashboard is a static base layer, the headings, with dynamic regions
+composited on top. A region is only redrawn when the inputs it is drawn from
+change, which for most updates is just the clock and the departures.
 """
+import functools
 from datetime import datetime
+from typing import Callable, Hashable, NamedTuple
 
 import structlog
 from PIL import Image, ImageDraw
 
+from render.models import DashboardInputData
 from sources.national_rail.models import DeparturesResponse
 from . import fonts, departures, climate
 
 log = structlog.get_logger()
 
+SIZE = (800, 480)
+
+
+class Region(NamedTuple):
+    """
+    A dynamic part of the dashboard
+
+    Attributes:
+        name: Reported in `PillowDashboard.changed_regions`
+        box: Left, top, right, bottom. Everything the region draws must fit
+            inside, as the whole box is replaced when it is redrawn
+    """
+
+    name: str
+    box: tuple[int, int, int, int]
+
+
+CLOCK = Region("clock", (0, 0, 420, 100))
+DATE = Region("date", (420, 0, 800, 100))
+CONDITIONS = Region("conditions", (0, 100, 800, 160))
+NORTHBOUND = Region("northbound", (0, 190, 540, 310))
+SOUTHBOUND = Region("southbound", (0, 336, 540, 480))
+ICON = Region("icon", (540, 160, 800, 340))
+TEMPERATURES = Region("temperatures", (540, 340, 800, 480))
+REGIONS = (CLOCK, DATE, NORTHBOUND, SOUTHBOUND, ICON, TEMPERATURES, CONDITIONS)
+
 
 def draw_time(draw: ImageDraw, time: datetime):
     """
@@ -18,67 +54,208 @@ def draw_time(draw: ImageDraw, time: datetime):
     """
     log.info("Drawing the time")
     time_string = time.strftime("%H:%M")
-    draw.text((40, 15), time_string, font=fonts.font_time, fill=0)
+    fonts.draw_text(draw, (40, 15), time_string, fonts.font_time)
 
 
-def draw_date(draw: ImageDraw, time: datetime) -> tuple:
+def date_strings(time: datetime) -> tuple[str, str, str]:
     """
-    Draw the date
+    Day of the week, date and month as they are drawn
     """
-    log.info("Drawing the date")
-    dt_dayofweek = time.strftime("%a").upper()
-    dt_date = time.strftime("%d")
-    dt_month = time.strftime("%b").upper()
-    date_y = 25
-    length_dayofweek = draw.textsize(dt_dayofweek, font=fonts.font_dayofweek)[0]
-    length_date = draw.textsize(dt_date, font=fonts.font_date)[0]
-    length_month = draw.textsize(dt_month, font=fonts.font_date)[0]
+    return time.strftime("%a").upper(), time.strftime("%d"), time.strftime("%b").upper()
+
+
+@functools.lru_cache(maxsize=8)
+def date_layout(dayofweek: str, date: str, month: str) -> tuple[int, int, int, int]:
+    """
+    X positions of the day of the week, date and month, and where the month ends
+    """
+    length_dayofweek = fonts.text_width(dayofweek, fonts.font_dayofweek)
+    length_date = fonts.text_width(date, fonts.font_date)
+    length_month = fonts.text_width(month, fonts.font_date)
     dayofweek_start_position = 428
     date_start_position = dayofweek_start_position + length_dayofweek + 10
     month_start_position = date_start_position + length_date + 10
-    date_x_positions = [
+    return (
         dayofweek_start_position,
         date_start_position,
         month_start_position,
-    ]
+        month_start_position + length_month,
+    )
+
+
+def draw_date(draw: ImageDraw, time: datetime) -> tuple:
+    """
+    Draw the date
+    """
+    log.info("Drawing the date")
+    dt_dayofweek, dt_date, dt_month = date_strings(time)
+    date_y = 25
+    *date_x_positions, month_end_position = date_layout(dt_dayofweek, dt_date, dt_month)
     draw.text(
         (date_x_positions[0], date_y), dt_dayofweek, font=fonts.font_dayofweek, fill=0
     )
     draw.text((date_x_positions[1], date_y), dt_date, font=fonts.font_date, fill=0)
     draw.text((date_x_positions[2], date_y), dt_month, font=fonts.font_date, fill=0)
-    return length_month, month_start_position
+    return month_end_position - date_x_positions[2], date_x_positions[2]
+
+
+def draw_base(draw: ImageDraw):
+    """
+    Draw everything that never changes
+    """
+    draw.text((60, 168), "NORTHBOUND", font=fonts.font_direction, fill=0)
+    draw.text((60, 312), "SOUTHBOUND", font=fonts.font_direction, fill=0)
+
+
+class PillowDashboard:
+    """
+    Keeps the last rendered dashboard, and redraws only the regions whose
+    inputs changed since
+
+    Attributes:
+        changed_regions: Names of the regions redrawn by the last render
+    """
+
+    def __init__(self):
+        self._base: Image.Image | None = None
+        self._frame: Image.Image | None = None
+        self._inputs: dict[str, Hashable] = {}
+        self.changed_regions: list[str] = []
+
+    def base(self) -> Image.Image:
+        """
+        The static layer, drawn once
+        """
+        if self._base is None:
+            self._base = Image.new("1", SIZE, 255)  # 255: clear the frame
+            draw_base(ImageDraw.Draw(self._base))
+        return self._base
+
+    @property
+    def changed_boxes(self) -> list[tuple[int, int, int, int]]:
+        """
+        Bounding boxes of the regions redrawn by the last render
+        """
+        regions = {region.name: region.box for region in REGIONS}
+        return [regions[name] for name in self.changed_regions]
+
+    def reset(self):
+        """
+        Forget the last render, so the next one redraws every region
+        """
+        self._frame = None
+        self._inputs = {}
+
+    def _update(
+        self,
+        region: Region,
+        inputs: Hashable,
+        draw_region: Callable[[Image.Image, ImageDraw.ImageDraw], None],
+    ):
+        """
+        Redraw a region onto the frame if its inputs changed
+        """
+        if region.name in self._inputs and self._inputs[region.name] == inputs:
+            return
+        # Drawn with the dashboard's coordinates, then only the region is kept
+        layer = Image.new("1", SIZE, 255)
+        draw_region(layer, ImageDraw.Draw(layer))
+        self._frame.paste(layer.crop(region.box), region.box[:2])
+        self._inputs[region.name] = inputs
+        self.changed_regions.append(region.name)
+
+    def render(
+        self,
+        rail_nb: DeparturesResponse,
+        rail_sb: DeparturesResponse,
+        temperature_data: dict,
+        time_now: datetime | None = None,
+        conditions: climate.Conditions | None = None,
+    ) -> Image.Image:
+        """
+        Render the dashboard, returning a copy the caller is free to change
+        The conditions lines are left blank without conditions
+        """
+        if self._frame is None:
+            self._frame = self.base().copy()
+            self._inputs = {}
+        self.changed_regions = []
+
+        time_now = time_now or datetime.now()
+        log.info("Current Time", time=time_now.isoformat())
+        date = date_strings(time_now)
+        month_end_position = date_layout(*date)[3]
+
+        self._update(
+            CLOCK,
+            time_now.strftime("%H:%M"),
+            lambda _, draw: draw_time(draw, time_now),
+        )
+        self._update(DATE, date, lambda _, draw: draw_date(draw, time_now))
+        log.info("Drawing the Train Arrivals")
+        for region, rail, y_position in (
+            (NORTHBOUND, rail_nb, 210),
+            (SOUTHBOUND, rail_sb, 356),
+        ):
+            self._update(
+                region,
+                departures.departures_inputs(time_now, rail),
+                lambda _, draw, rail=rail, y_position=y_position: (
+                    departures.draw_departures(draw, y_position, time_now, rail)
+                ),
+            )
+        self._update(
+            ICON,
+            temperature_data["Weather"],
+            lambda image, _: climate.draw_weather(image, temperature_data["Weather"]),
+        )
+        self._update(
+            TEMPERATURES,
+            (
+                temperature_data["High"],
+                temperature_data["Low"],
+                temperature_data["Average"],
+                month_end_position,
+            ),
+            lambda _, draw: climate.draw_temperatures(
+                temperature_data, draw, month_end_position
+            ),
+        )
+        self._update(
+            CONDITIONS,
+            conditions,
+            lambda _, draw: climate.draw_conditions(draw, conditions),
+        )
+        log.info("Regions redrawn", regions=self.changed_regions)
+        return self._frame.copy()
+
+
+dashboard = PillowDashboard()
 
 
 def render_pillow_dashboard(
-    rail_nb: DeparturesResponse, rail_sb: DeparturesResponse, temperature_data: dict
+    rail_nb: DeparturesResponse,
+    rail_sb: DeparturesResponse,
+    temperature_data: dict,
+    time_now: datetime | None = None,
 ) -> Image:
     """
     Render the Pillow Dashboard
     """
-    # Create blank monochrome image to draw onto
-    pil_image = Image.new("1", (800, 480), 255)  # 255: clear the frame
-    draw = ImageDraw.Draw(pil_image)
+    return dashboard.render(rail_nb, rail_sb, temperature_data, time_now)
 
-    time_now = datetime.now()
-    log.info("Current Time", time=time_now.isoformat())
-    draw_time(draw, time_now)
-    length_month, month_start_position = draw_date(draw, time_now)
-    log.info("Drawing the Train Arrivals")
-    draw.text((60, 168), "NORTHBOUND", font=fonts.font_direction, fill=0)
-    departures.draw_departures(
-        draw,
-        210,
-        time_now,
-        rail_nb,
-    )
-    draw.text((60, 312), "SOUTHBOUND", font=fonts.font_direction, fill=0)
-    departures.draw_departures(
-        draw,
-        356,
-        time_now,
-        rail_sb,
-    )
-    climate.draw_temp(
-        temperature_data, pil_image, draw, month_start_position + length_month
+
+def render_dashboard(
+    data: DashboardInputData, time_now: datetime | None = None
+) -> Image:
+    """
+    Render the dashboard from the data the webpage is rendered from
+    The clock shows the time the data was fetched unless time_now is given
+    """
+    return dashboard.render(
+        data.rail.northbound,
+        data.rail.southbound,
+        climate.get_temperatures(data.weather),
+        time_now or data.time,
+        climate.get_conditions(data.weather, data.air_quality, data.aircon),
     )
-    return pil_image
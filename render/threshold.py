@@ -0,0 +1,84 @@
+"""
+Turn a greyscale render into the panel's packed 1bpp frame
+
+Each method is a couple of passes of Pillow's C code over the image:
+- threshold: white above a fixed level, for flat colours like the webpage's
+- ordered: compared against a tiled Bayer matrix, a stable pattern for greys
+- floyd-steinberg: error diffusion, for photos and gradients
+"""
+import functools
+from typing import Callable
+
+from PIL import Image, ImageChops
+
+from waveshare_epd.frame import pack_frame
+
+# Pixels brighter than this are white
+THRESHOLD = 128
+
+BAYER_8X8 = (
+    (0, 32, 8, 40, 2, 34, 10, 42),
+    (48, 16, 56, 24, 50, 18, 58, 26),
+    (12, 44, 4, 36, 14, 46, 6, 38),
+    (60, 28, 52, 20, 62, 30, 54, 22),
+    (3, 35, 11, 43, 1, 33, 9, 41),
+    (51, 19, 59, 27, 49, 17, 57, 25),
+    (15, 47, 7, 39, 13, 45, 5, 37),
+    (63, 31, 55, 23, 61, 29, 53, 21),
+)
+
+
+def threshold(image: Image.Image, level: int = THRESHOLD) -> Image.Image:
+    """
+    White where the pixel is brighter than level
+    """
+    return image.point([0] * (level + 1) + [255] * (255 - level), "1")
+
+
+@functools.lru_cache(maxsize=4)
+def bayer_map(size: tuple[int, int]) -> Image.Image:
+    """
+    The Bayer matrix scaled to 0-255 and tiled over an image of this size
+    """
+    tile = Image.new("L", (8, 8))
+    tile.putdata([(value * 256 + 128) // 64 for row in BAYER_8X8 for value in row])
+    tiled = Image.new("L", size)
+    for top in range(0, size[1], 8):
+        for left in range(0, size[0], 8):
+            tiled.paste(tile, (left, top))
+    return tiled
+
+
+def ordered(image: Image.Image) -> Image.Image:
+    """
+    White where the pixel is brighter than the Bayer matrix at that position
+    """
+    # Clamped at 0, so anything left over is brighter than the matrix
+    difference = ImageChops.subtract(image, bayer_map(image.size))
+    return difference.point([0] + [255] * 255, "1")
+
+
+def floyd_steinberg(image: Image.Image) -> Image.Image:
+    """
+    Error diffusion
+    """
+    return image.convert("1", dither=Image.FLOYDSTEINBERG)
+
+
+METHODS: dict[str, Callable[[Image.Image], Image.Image]] = {
+    "threshold": threshold,
+    "ordered": ordered,
+    "floyd-steinberg": floyd_steinberg,
+}
+
+
+def to_frame(image: Image.Image, method: str = "threshold") -> bytes:
+    """
+    Convert an image to 1-bit with one of `METHODS` and pack it for the panel
+
+    Raises:
+        ValueError: method is not one of `METHODS`
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {list(METHODS)}")
+    return pack_frame(METHODS[method](image.convert("L")))
@@ -3,14 +3,49 @@ Server to receive and display an image
 
 
 """
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
 import structlog
 import uvicorn
-from fastapi import FastAPI, Request, Depends, BackgroundTasks
-from waveshare_epd import epd7in5_V2
+from fastapi import FastAPI, Request, Response, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from waveshare_epd import epd7in5_V2, transport
+from waveshare_epd.async_epd import AsyncEPD
+from waveshare_epd.power import IDLE_TIMEOUT, PanelPowerManager
+from waveshare_epd.frame import FrameDeduplicator, frame_hash
 
 log = structlog.get_logger()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Start the display worker, and let the current refresh finish before exiting
+    """
+    display_worker.start()
+    yield
+    await display_worker.stop()
+    await async_epd.sleep()
+    async_epd.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# The frame currently on the panel, the base for delta uploads
+displayed_frames = FrameDeduplicator()
+
+# Kept between uploads so the driver can diff against the previous frame
+epd = epd7in5_V2.EPD()
+# Kept initialised between frequent uploads
+panel = PanelPowerManager(
+    epd, idle_timeout=float(os.environ.get("PANEL_IDLE_TIMEOUT", IDLE_TIMEOUT))
+)
+# Runs the blocking driver in its own thread so the event loop stays free
+async_epd = AsyncEPD(panel)
 
 
 async def parse_body(request: Request):
@@ -21,39 +56,235 @@ async def parse_body(request: Request):
     return data
 
 
-def display_on_epd(data: bytes):
+async def display_on_epd(data: bytes):
     """
     Send the bytes to the display
+    Only the changed regions are refreshed when the policy allows it,
+    and the panel only sleeps once uploads stop arriving
+    """
+    try:
+        await async_epd.display(data)
+    except Exception:
+        # Not on the panel, so the same frame must not be skipped next time
+        displayed_frames.last_hash = None
+        displayed_frames.last_frame = None
+        raise
+
+
+class DisplayWorker:
     """
-    epd = epd7in5_V2.EPD()
-    log.info("Initializing the display...")
-    epd.init()
-    epd.display(data)
-    log.info("Sending display to sleep")
-    epd.sleep()
+    The only task that drives the panel
+
+    Holds at most one pending frame. A frame uploaded while another is
+    waiting replaces it, so a slow refresh never builds up a queue of
+    stale frames and the SPI bus is never used by two refreshes at once.
+    Refreshes are awaited, so uploads and status requests are still
+    answered while the panel is busy.
+    """
+
+    def __init__(self, display: Callable[[bytes], Awaitable[None]]):
+        self._display = display
+        self._loop = None
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._idle: asyncio.Event | None = None
+        self._pending: tuple[int, bytes] | None = None
+        self.sequence = 0
+        self.refreshing_sequence: int | None = None
+        self.displayed_sequence: int | None = None
+        self.last_refresh_ms: float | None = None
+        self.replaced = 0
+        self.failures = 0
+
+    def start(self):
+        """
+        Start the task in the running event loop, unless it is already running
+        """
+        loop = asyncio.get_running_loop()
+        if loop is self._loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, frame: bytes) -> dict:
+        """
+        Queue a frame, replacing the pending one
+
+        Returns:
+            dict: The queue state after the frame was queued
+        """
+        self.start()
+        self.sequence += 1
+        replaced = None
+        if self._pending is not None:
+            replaced = self._pending[0]
+            self.replaced += 1
+            log.info(
+                "Replacing pending frame", replaced=replaced, sequence=self.sequence
+            )
+        self._pending = (self.sequence, frame)
+        self._idle.clear()
+        self._wakeup.set()
+        return {
+            "sequence": self.sequence,
+            "replaced_sequence": replaced,
+            "refreshing_sequence": self.refreshing_sequence,
+            "displayed_sequence": self.displayed_sequence,
+        }
+
+    async def _run(self):
+        """
+        Display pending frames until cancelled
+        """
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._pending is None:
+                continue
+            sequence, frame = self._pending
+            self._pending = None
+            self.refreshing_sequence = sequence
+
+            start = time.perf_counter()
+            try:
+                await self._display(frame)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Display refresh failed", sequence=sequence)
+                self.failures += 1
+            else:
+                self.last_refresh_ms = (time.perf_counter() - start) * 1000
+                self.displayed_sequence = sequence
+                log.info(
+                    "Frame displayed",
+                    sequence=sequence,
+                    refresh_ms=round(self.last_refresh_ms, 1),
+                )
+            finally:
+                self.refreshing_sequence = None
+                if self._pending is None:
+                    self._idle.set()
+
+    async def wait_until_idle(self):
+        """
+        Wait until every submitted frame has been refreshed or replaced
+        """
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def stop(self):
+        """
+        Stop after the current refresh, dropping any pending frame
+        """
+        self._pending = None
+        if self._task is None:
+            return
+        if self.refreshing_sequence is not None:
+            await self._idle.wait()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def status(self) -> dict:
+        """
+        What is on the panel, what is being refreshed and what is waiting
+        """
+        return {
+            "displayed_sequence": self.displayed_sequence,
+            "refreshing_sequence": self.refreshing_sequence,
+            "pending_sequence": None if self._pending is None else self._pending[0],
+            "last_refresh_ms": self.last_refresh_ms,
+            "frames_replaced": self.replaced,
+            "refresh_failures": self.failures,
+        }
+
+
+display_worker = DisplayWorker(display_on_epd)
+
+
+# Advertised to clients so they can send compressed frames and deltas
+ACCEPTED_ENCODINGS = ", ".join(transport.ENCODINGS)
 
 
 @app.post("/upload")
 async def upload_file(
-    background_tasks: BackgroundTasks,
+    request: Request,
+    response: Response,
     data: bytes = Depends(parse_body),
 ):
     """
     Send Data
+    The body is a frame in any of the transport encodings
+    A delta against a frame this server doesn't have gets a 409,
+    and the client resends a full frame
     """
-    byte_data = data
+    response.headers[transport.ACCEPT_HEADER] = ACCEPTED_ENCODINGS
+    encoding = request.headers.get(transport.ENCODING_HEADER, "raw")
+    try:
+        byte_data = transport.decode_frame(
+            data, request.headers, displayed_frames.last_frame
+        )
+    except transport.BaseFrameMismatch:
+        log.info("Delta base does not match, requesting a full frame")
+        return JSONResponse(
+            status_code=409,
+            content={
+                "message": "Base frame does not match, send a full frame",
+                "frame_hash": displayed_frames.last_hash,
+            },
+            headers={transport.ACCEPT_HEADER: ACCEPTED_ENCODINGS},
+        )
+    except transport.FrameFormatError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
 
     file_size = len(byte_data)
-    log.info(f"Received file size: {file_size} bytes", type=type(data))
+    log.info(
+        f"Received file size: {file_size} bytes",
+        encoding=encoding,
+        transferred_bytes=len(data),
+    )
+
+    current_hash = frame_hash(byte_data)
+    if displayed_frames.is_duplicate(current_hash):
+        return {
+            "message": "Frame unchanged, display not refreshed",
+            "file_size": file_size,
+            "frame_hash": current_hash,
+        }
 
-    # Add the display operation as a background task
-    background_tasks.add_task(display_on_epd, data)
+    # Marked before it is shown, as it is what the panel will end up showing
+    displayed_frames.mark_displayed(current_hash, byte_data)
+    queue = display_worker.submit(byte_data)
 
     return {
         "message": "Data received and processing started",
         "file_size": file_size,
+        "frame_hash": current_hash,
+        "queue": queue,
     }
 
 
+@app.get("/stats")
+async def get_stats():
+    """
+    Counters for frames displayed and frames skipped as unchanged
+    """
+    return displayed_frames.stats()
+
+
+@app.get("/status")
+async def get_status():
+    """
+    The sequence number on the panel, how long the last refresh took
+    and whether the panel is awake
+    """
+    return {**display_worker.status(), **panel.status()}
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="debug")
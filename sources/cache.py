@@ -0,0 +1,106 @@
+"""
+Read-through cache for the data sources
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable, NamedTuple
+
+import structlog
+
+log = structlog.get_logger()
+
+# Stale entries older than this many TTLs are refetched before returning
+MAX_STALE_TTLS = 5
+
+
+class CacheEntry(NamedTuple):
+    """
+    A cached value and when it was fetched
+    """
+
+    value: Any
+    fetched_at: float
+
+
+class TTLCache:
+    """
+    Read-through cache with a TTL, stale-while-revalidate and single-flight
+
+    - Fresh entries are returned directly
+    - Expired entries are returned while a single background refresh runs
+    - Missing entries are fetched, with concurrent requests for the same key
+      sharing one upstream call
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: dict[Hashable, CacheEntry] = {}
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        """
+        Call upstream and store the result
+        """
+        try:
+            value = await fetch()
+            self._entries[key] = CacheEntry(value, time.monotonic())
+            return value
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _log_failure(self, task: asyncio.Task):
+        """
+        Log refreshes that fail, so a background refresh does not fail silently
+        """
+        if not task.cancelled() and task.exception() is not None:
+            log.warning(
+                "Cache refresh failed", cache=self.name, error=repr(task.exception())
+            )
+
+    def _refresh(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Any]]
+    ) -> asyncio.Task:
+        """
+        Start fetching the key, unless a fetch is already in flight
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetch))
+            task.add_done_callback(self._log_failure)
+            self._in_flight[key] = task
+        return task
+
+    async def get(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: float
+    ) -> Any:
+        """
+        Get the value for a key, calling fetch if needed
+
+        Args:
+            key: What is being fetched, e.g. the town ID
+            fetch: Coroutine function that calls upstream
+            ttl: Seconds the value stays fresh
+        """
+        entry = self._entries.get(key)
+        age = None if entry is None else time.monotonic() - entry.fetched_at
+        if age is not None and age <= ttl:
+            self.hits += 1
+            return entry.value
+        if age is not None and age <= ttl * MAX_STALE_TTLS:
+            self.stale_hits += 1
+            log.debug("Serving stale value", cache=self.name, key=key, age=age)
+            self._refresh(key, fetch)
+            return entry.value
+
+        self.misses += 1
+        # Shielded so a caller timing out does not cancel the fetch for other callers
+        return await asyncio.shield(self._refresh(key, fetch))
+
+    def clear(self):
+        """
+        Drop every cached value
+        """
+        self._entries.clear()
@@ -1,4 +1,4 @@
 """
 Exports
 """
-from .main import DaikinClient
+from .main import DaikinClient, AsyncDaikinClient, DaikinPoller
@@ -4,8 +4,11 @@ Example usage of daikinapi module
 use e.g. with "python example.py 192.168.1.3"
 """
 
+import asyncio
+import time
 
 import httpx
+import structlog
 from sources.daikin.models import (
     BasicInfo,
     DaikinInfoTemp,
@@ -14,6 +17,13 @@ from sources.daikin.models import (
     parse_string_to_data,
 )
 
+log = structlog.get_logger()
+
+# Seconds to wait for a unit before using its last reading
+UNIT_TIMEOUT = 2
+# Seconds before the unit name and other basic info is fetched again
+BASIC_INFO_MAX_AGE = 24 * 60 * 60
+
 
 class DaikinClient:
     """
@@ -114,3 +124,162 @@ class DaikinClient:
 
         """
         self.client.close()
+
+
+class AsyncDaikinClient:
+    """
+    Daikin client for use in the event loop
+
+    Attributes:
+        base_url (str): The base URL for the unit.
+        client (httpx.AsyncClient): The shared HTTP client.
+
+    """
+
+    def __init__(self, base_url: str, client: httpx.AsyncClient):
+        self.base_url = f"http://{base_url}"
+        self.client = client
+
+    async def get(self, endpoint: str, params: dict = None) -> dict:
+        """
+        Sends a GET request to the specified endpoint and parses the response.
+        """
+        response = await self.client.get(self.base_url + endpoint, params=params)
+        response.raise_for_status()
+        return parse_string_to_data(response.text)
+
+    async def get_basic_info(self) -> BasicInfo:
+        """
+        Basic Info about Daikin
+        """
+        return BasicInfo.parse_obj(await self.get("/common/basic_info"))
+
+    async def get_sensor_info(self) -> SensorInfo:
+        """
+        GET request to the /aircon/get_sensor_info
+        """
+        return SensorInfo.parse_obj(await self.get("/aircon/get_sensor_info"))
+
+    async def get_daikin_info(self) -> DaikinInfo:
+        """
+        Get Parsed Info, requesting basic and sensor info at the same time
+        """
+        basic, sensor = await asyncio.gather(
+            self.get_basic_info(), self.get_sensor_info()
+        )
+        return DaikinInfo(
+            name=basic.name,
+            temperature=DaikinInfoTemp(indoor=sensor.htemp, outdoor=sensor.otemp),
+            humidity=sensor.hhum,
+        )
+
+
+class DaikinPoller:
+    """
+    Polls every aircon unit at the same time
+
+    Each unit has its own keep-alive connection. The basic info, which is only
+    needed for the unit name, is fetched once and refreshed rarely, so each poll
+    only requests the sensor info. Units that don't answer within `timeout`
+    return their last good reading.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[str],
+        timeout: float = UNIT_TIMEOUT,
+        basic_info_max_age: float = BASIC_INFO_MAX_AGE,
+    ):
+        self.endpoints = list(endpoints)
+        self.timeout = timeout
+        self.basic_info_max_age = basic_info_max_age
+        self._loop = None
+        self._units: dict[str, AsyncDaikinClient] = {}
+        self._basic_info: dict[str, tuple[BasicInfo, float]] = {}
+        self._last_good: dict[str, DaikinInfo] = {}
+
+    def _unit(self, endpoint: str) -> AsyncDaikinClient:
+        """
+        The client for a unit, created in the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Connections can't be shared between event loops
+            self._loop = loop
+            self._units = {}
+        if endpoint not in self._units:
+            self._units[endpoint] = AsyncDaikinClient(
+                endpoint,
+                httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+                ),
+            )
+        return self._units[endpoint]
+
+    async def _get_basic_info(self, endpoint: str) -> BasicInfo:
+        """
+        The cached basic info, fetched if missing or too old
+        """
+        cached = self._basic_info.get(endpoint)
+        if (
+            cached is not None
+            and time.monotonic() - cached[1] < self.basic_info_max_age
+        ):
+            return cached[0]
+        try:
+            basic = await self._unit(endpoint).get_basic_info()
+        except (httpx.HTTPError, ValueError):
+            if cached is None:
+                raise
+            log.warning("Using old Daikin basic info", endpoint=endpoint)
+            return cached[0]
+        self._basic_info[endpoint] = (basic, time.monotonic())
+        return basic
+
+    async def _read_unit(self, endpoint: str) -> DaikinInfo:
+        """
+        Read the sensors of one unit
+        """
+        basic, sensor = await asyncio.gather(
+            self._get_basic_info(endpoint), self._unit(endpoint).get_sensor_info()
+        )
+        return DaikinInfo(
+            name=basic.name,
+            temperature=DaikinInfoTemp(indoor=sensor.htemp, outdoor=sensor.otemp),
+            humidity=sensor.hhum,
+        )
+
+    async def poll_unit(self, endpoint: str) -> DaikinInfo | None:
+        """
+        Read one unit, falling back to its last good reading
+        None if the unit has never been read
+        """
+        try:
+            info = await asyncio.wait_for(self._read_unit(endpoint), self.timeout)
+        except (asyncio.TimeoutError, httpx.HTTPError, ValueError) as error:
+            log.warning(
+                "Daikin unit did not respond, using last reading",
+                endpoint=endpoint,
+                error=repr(error),
+            )
+            return self._last_good.get(endpoint)
+        self._last_good[endpoint] = info
+        return info
+
+    async def poll(self) -> list[DaikinInfo]:
+        """
+        Read every unit at the same time
+        Units that have never responded are left out
+        """
+        readings = await asyncio.gather(
+            *(self.poll_unit(endpoint) for endpoint in self.endpoints)
+        )
+        return [reading for reading in readings if reading is not None]
+
+    async def aclose(self):
+        """
+        Close every connection
+        """
+        await asyncio.gather(*(unit.client.aclose() for unit in self._units.values()))
+        self._units = {}
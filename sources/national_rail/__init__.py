@@ -1,5 +1,5 @@
 """
 Module Exports
 """
-from .main import NationalRail
+from .main import NationalRail, group_boards_by_origin, split_departures
 from . import models
@@ -1,25 +1,91 @@
 """
 National Rail SOAP API
 """
+import functools
+
 from pydantic import ValidationError
 import structlog
 
 from zeep import Client, xsd
+from zeep.cache import SqliteCache
 from zeep.exceptions import Fault
 from zeep.helpers import serialize_object
 from zeep.plugins import HistoryPlugin
+from zeep.transports import Transport
 
-from .models import DeparturesResponse
+from .models import Board, DeparturesResponse, TrainServices
 
 log = structlog.get_logger()
 
+WSDL = "http://lite.realtime.nationalrail.co.uk/OpenLDBWS/wsdl.aspx?ver=2017-10-01"
+# Seconds the downloaded WSDL and schema documents are kept on disk
+WSDL_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+
+@functools.lru_cache(None)
+def get_soap_client(
+    cache_timeout: int = WSDL_CACHE_TIMEOUT, cache_path: str | None = None
+) -> Client:
+    """
+    The parsed SOAP client, shared for the life of the process
+
+    The WSDL and the schemas it imports are cached on disk by zeep,
+    so only the first start after the cache expires downloads them.
+
+    Args:
+        cache_timeout: Seconds the documents are cached for
+        cache_path: The sqlite cache file, zeep's user cache directory by default
+    """
+    log.info("Loading National Rail WSDL", cache_timeout=cache_timeout)
+    transport = Transport(cache=SqliteCache(path=cache_path, timeout=cache_timeout))
+    return Client(wsdl=WSDL, transport=transport, plugins=[HistoryPlugin()])
+
+
+def group_boards_by_origin(boards: list[Board]) -> dict[str, list[Board]]:
+    """
+    Boards grouped by the station they depart from
+    """
+    origins: dict[str, list[Board]] = {}
+    for board in boards:
+        origins.setdefault(board.from_crs, []).append(board)
+    return origins
+
+
+def split_departures(
+    departures: DeparturesResponse, board: Board
+) -> DeparturesResponse:
+    """
+    The view of an unfiltered board that a filtered board for `board` would return
+    Keeps the services that call at the board's destination, up to its rows
+    """
+    location_name = board.to_crs
+    services = []
+    if departures.trainServices is not None:
+        for service in departures.trainServices.service:
+            calling_point_name = service.calls_at(board.to_crs)
+            if calling_point_name is not None:
+                location_name = calling_point_name
+                services.append(service)
+    return departures.copy(
+        update={
+            "filterLocationName": location_name,
+            "filtercrs": board.to_crs,
+            "filterType": "to",
+            "trainServices": TrainServices(service=services[: board.rows])
+            if services
+            else None,
+        }
+    )
+
 
 class NationalRail:
     """
     Class to fetch stuff from National Rail's API
     """
 
-    WSDL = "http://lite.realtime.nationalrail.co.uk/OpenLDBWS/wsdl.aspx?ver=2017-10-01"
+    WSDL = WSDL
+    # The most rows the WithDetails boards return
+    MAX_DETAILED_ROWS = 10
     header = xsd.Element(
         "{http://thalesgroup.com/RTTI/2013-11-28/Token/types}AccessToken",
         xsd.ComplexType(
@@ -32,9 +98,9 @@ class NationalRail:
         ),
     )
 
-    def __init__(self, token):
+    def __init__(self, token, wsdl_cache_timeout: int = WSDL_CACHE_TIMEOUT):
         self.header_value = self.header(TokenValue=token)
-        self.client = Client(wsdl=self.WSDL, plugins=[HistoryPlugin()])
+        self.client = get_soap_client(wsdl_cache_timeout)
 
     def get_departures(self, num_rows, at_station, to_station):
         """
@@ -75,6 +141,79 @@ class NationalRail:
             )
             raise error
 
+    def get_departures_with_details(self, num_rows, at_station) -> DeparturesResponse:
+        """
+        Gets all departures from a station, with the stations each service calls at
+
+        Args:
+            num_rows: Number of Results, at most MAX_DETAILED_ROWS
+            at_station: 3 Letter Station CRS Station Code
+
+        Returns:
+            DeparturesResponse, with the filter set to the station itself
+        """
+        try:
+            log.info(
+                "Getting National Rail Departures With Details",
+                rows=num_rows,
+                at_station=at_station,
+            )
+            response = self.client.service.GetDepBoardWithDetails(
+                numRows=num_rows,
+                crs=at_station,
+                _soapheaders=[self.header_value],
+            )
+            data = serialize_object(response)
+            # Unfiltered boards have no filter, it is set when the board is split
+            data["filterLocationName"] = data["locationName"]
+            data["filtercrs"] = data["crs"]
+            try:
+                return DeparturesResponse(**data)
+            except ValidationError as model_error:
+                log.error("Failed Valdation", response=response)
+                raise model_error
+        except Fault as error:
+            log.error(
+                "Error getting departure information from National Rail",
+                service="departureBoardWithDetails",
+                exc_info=True,
+            )
+            raise error
+
+    def get_origin_boards(
+        self, at_station: str, boards: list[Board]
+    ) -> dict[str, DeparturesResponse]:
+        """
+        Gets every board that departs from one station with a single call
+
+        A single board uses the filtered departure board. Several boards share
+        one wider board with calling points, which is split locally.
+
+        Returns:
+            The departures for each board, by board name
+        """
+        if len(boards) == 1:
+            board = boards[0]
+            return {
+                board.name: self.get_departures(board.rows, at_station, board.to_crs)
+            }
+        departures = self.get_departures_with_details(
+            self.MAX_DETAILED_ROWS, at_station
+        )
+        return {board.name: split_departures(departures, board) for board in boards}
+
+    def get_boards(self, boards: list[Board]) -> dict[str, DeparturesResponse]:
+        """
+        Gets every board, with one call per origin station
+
+        Returns:
+            The departures for each board, by board name
+        """
+        departures = {}
+        for at_station, origin_boards in group_boards_by_origin(boards).items():
+            departures.update(self.get_origin_boards(at_station, origin_boards))
+        return departures
+
     def check_response_errors(self, departures):
         """
         Check response errors
@@ -4,7 +4,7 @@ National Rail Pydantic Models
 from typing import List, Optional
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class LocationDetails(BaseModel):
@@ -37,6 +37,36 @@ class Formation(BaseModel):
     coaches: Optional[str]
 
 
+class CallingPoint(BaseModel):
+    """
+    A station the service calls at
+    """
+
+    locationName: str
+    crs: str
+    st: Optional[str]
+    et: Optional[str]
+    at: Optional[str]
+    isCancelled: Optional[bool]
+
+
+class CallingPointList(BaseModel):
+    """
+    Calling points of one portion of the train
+    """
+
+    callingPoint: List[CallingPoint]
+
+
+class CallingPoints(BaseModel):
+    """
+    Parent key of calling point lists
+    Only returned by the WithDetails boards
+    """
+
+    callingPointList: List[CallingPointList]
+
+
 class Service(BaseModel):
     """
     The train services returned
@@ -66,6 +96,21 @@ class Service(BaseModel):
     currentOrigins: Optional[Location]
     currentDestinations: Optional[Location]
     formation: Optional[Formation]
+    subsequentCallingPoints: Optional[CallingPoints]
+
+    def calls_at(self, crs: str) -> Optional[str]:
+        """
+        Name of the station if the service calls at or terminates at it
+        """
+        for location in self.destination.location:
+            if location.crs == crs:
+                return location.locationName
+        if self.subsequentCallingPoints is not None:
+            for calling_points in self.subsequentCallingPoints.callingPointList:
+                for calling_point in calling_points.callingPoint:
+                    if calling_point.crs == crs:
+                        return calling_point.locationName
+        return None
 
 
 class TrainServices(BaseModel):
@@ -79,9 +124,10 @@ class TrainServices(BaseModel):
 class Message(BaseModel):
     """
     The container of the actual message
+    Pydantic ignores fields starting with an underscore, so it is aliased
     """
 
-    _value_1: str
+    value: str = Field(..., alias="_value_1")
 
 
 class NrccMessages(BaseModel):
@@ -109,3 +155,14 @@ class DeparturesResponse(BaseModel):
     trainServices: TrainServices | None
     busServices: Optional[str]
     ferryServices: Optional[str]
+
+
+class Board(BaseModel):
+    """
+    A departure board to display: trains from one station towards another
+    """
+
+    name: str
+    from_crs: str
+    to_crs: str
+    rows: int = 4
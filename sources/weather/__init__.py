@@ -1,5 +1,5 @@
 """
 Module Exports
 """
-from .open_weather import OpenWeather
+from .open_weather import OpenWeather, AsyncOpenWeather, town_coordinates
 from . import models
@@ -6,11 +6,16 @@ import structlog
 import httpx
 
 from .models import WeatherData, AirQualityData
+from .models.common import Coordinates
 
 UnitType = Literal["standard", "metric", "imperial"]
 
 log = structlog.get_logger()
 
+# The coordinates of a town ID don't change, so air quality can be
+# requested without waiting for the weather response
+town_coordinates: dict[int, Coordinates] = {}
+
 
 class OpenWeather:
     """
@@ -33,7 +38,9 @@ class OpenWeather:
         }
         log.info("Getting Weather Data", location=town_id, units=units)
         response = httpx.get(url=self.endpoint + "weather", params=params).json()
-        return WeatherData(**response)
+        weather = WeatherData(**response)
+        town_coordinates[town_id] = weather.coord
+        return weather
 
     def get_air_quality(self, lat: float, lon: float):
         """
@@ -48,3 +55,45 @@ class OpenWeather:
         response = httpx.get(url=self.endpoint + "air_pollution", params=params).json()
         log.info("API Data", data=response)
         return AirQualityData(**response)
+
+
+class AsyncOpenWeather:
+    """
+    OpenWeather client for use in the event loop
+    Requests are made with the given httpx.AsyncClient
+    """
+
+    def __init__(self, token, client: httpx.AsyncClient):
+        self.token = token
+        self.endpoint = "https://api.openweathermap.org/data/2.5/"
+        self.client = client
+
+    async def get_weather(self, town_id: int, units: UnitType) -> WeatherData:
+        """
+        Get the weather
+        """
+        params = {
+            "id": town_id,
+            "units": units,
+            "APPID": self.token,
+        }
+        log.info("Getting Weather Data", location=town_id, units=units)
+        response = await self.client.get(url=self.endpoint + "weather", params=params)
+        weather = WeatherData(**response.json())
+        town_coordinates[town_id] = weather.coord
+        return weather
+
+    async def get_air_quality(self, lat: float, lon: float) -> AirQualityData:
+        """
+        Get pollution data for a particular latitude / longitude
+        """
+        params = {
+            "lat": lat,
+            "lon": lon,
+            "appid": self.token,
+        }
+        log.info("Getting Air Quality Data", lat=lat, lon=lon)
+        response = await self.client.get(
+            url=self.endpoint + "air_pollution", params=params
+        )
+        return AirQualityData(**response.json())
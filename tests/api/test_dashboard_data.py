@@ -0,0 +1,131 @@
+"""
+Test fetching the dashboard data
+"""
+import asyncio
+import json
+from pathlib import Path
+
+from api import dashboard_data
+from api.dashboard_data import DashboardInputData, RailwayInformation, SourceCaches
+from config import Config
+from sources import Weather
+
+EXAMPLE_DATA = Path(__file__).parents[2] / "render/svelte/src/routes/data.json"
+
+CONFIG = Config(
+    tokens={"national_rail": "dummy-token", "open_weather_map": "dummy-token"},
+    stations={
+        "boards": [
+            {"name": "northbound", "from_crs": "HRN", "to_crs": "WIH"},
+            {"name": "southbound", "from_crs": "HRN", "to_crs": "FPK"},
+        ]
+    },
+    weather={"townid": 6690565},
+    endpoints={"display_server": "http://display/upload"},
+    aircon={"endpoints": ["192.168.0.2"]},
+)
+
+WEATHER = {
+    "coord": {"lon": -0.1237, "lat": 51.5797},
+    "weather": [
+        {"id": 801, "main": "Clouds", "description": "few clouds", "icon": "02d"}
+    ],
+    "base": "stations",
+    "main": {
+        "temp": 24.62,
+        "feels_like": 24.23,
+        "temp_min": 22.55,
+        "temp_max": 26.5,
+        "pressure": 1011,
+        "humidity": 42,
+    },
+    "visibility": 10000,
+    "wind": {"speed": 7.2, "deg": 90},
+    "clouds": {"all": 19},
+    "dt": 1686939348,
+    "sys": {
+        "type": 2,
+        "id": 2075535,
+        "country": "GB",
+        "sunrise": 1686886940,
+        "sunset": 1686946798,
+    },
+    "timezone": 3600,
+    "id": 6690565,
+    "name": "Crouch End",
+    "cod": 200,
+}
+
+AIR_QUALITY = {
+    "coord": {"lon": -0.1237, "lat": 51.5797},
+    "list": [
+        {
+            "main": {"aqi": 2},
+            "components": {
+                "co": 236.23,
+                "no": 0.2,
+                "no2": 13.68,
+                "o3": 56.91,
+                "so2": 1.42,
+                "pm2_5": 8.98,
+                "pm10": 12.89,
+                "nh3": 1.71,
+            },
+            "dt": 1636928400,
+        }
+    ],
+}
+
+BASIC_INFO = (
+    "ret=OK,type=aircon,reg=eu,dst=1,ver=1_14_68,rev=C3FF8A6,pow=1,err=0,"
+    "location=0,name=%4c%69%76%69%6e%67,icon=0,method=home only,port=30050,"
+    "id=,pw=,lpw_flag=0,adp_kind=3,pv=3.20,cpv=3,cpv_minor=20,led=1,"
+    "en_setzone=1,mac=000000000000,adp_mode=run,en_hol=0,ssid1=home,"
+    "radio1=-40,ssid=DaikinAP,grp_name=,en_grp=0"
+)
+SENSOR_INFO = "ret=OK,htemp=22.0,hhum=45,otemp=18.0,err=0,cmpfreq=0"
+
+
+def test_fetch_dashboard_data(httpx_mock, monkeypatch):
+    """
+    Every source is combined into the dashboard data
+    """
+
+    async def get_railway_information(_config):
+        example = json.loads(EXAMPLE_DATA.read_text())
+        return RailwayInformation(**example["rail"])
+
+    monkeypatch.setattr(
+        dashboard_data, "get_railway_information", get_railway_information
+    )
+    Weather.town_coordinates.clear()
+    for cache in (
+        SourceCaches.weather,
+        SourceCaches.air_quality,
+        SourceCaches.national_rail,
+        SourceCaches.daikin,
+    ):
+        cache.clear()
+    base_url = "https://api.openweathermap.org/data/2.5"
+    httpx_mock.add_response(
+        url=f"{base_url}/weather?id=6690565&units=metric&APPID=dummy-token",
+        json=WEATHER,
+    )
+    httpx_mock.add_response(
+        url=f"{base_url}/air_pollution?lat=51.5797&lon=-0.1237&appid=dummy-token",
+        json=AIR_QUALITY,
+    )
+    httpx_mock.add_response(url="http://192.168.0.2/common/basic_info", text=BASIC_INFO)
+    httpx_mock.add_response(
+        url="http://192.168.0.2/aircon/get_sensor_info", text=SENSOR_INFO
+    )
+
+    data = asyncio.run(dashboard_data.fetch_dashboard_data(CONFIG))
+
+    assert isinstance(data, DashboardInputData)
+    assert data.weather.name == "Crouch End"
+    assert data.air_quality.list[0].main.aqi == 2
+    assert data.aircon[0].name == "Living"
+    assert data.aircon[0].temperature.indoor == 22.0
+    assert data.rail.northbound.crs == "HRN"
+    assert Weather.town_coordinates[6690565].lat == 51.5797
@@ -0,0 +1,66 @@
+"""
+Test choosing the renderer for the dashboard update
+"""
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+from PIL import Image
+
+from api import utils
+from api.frame_cache import FrameCache
+from render.pillow import climate
+
+
+def test_pillow_renderer_drops_the_browser(example_data, monkeypatch, tmp_path):
+    """
+    Switching to Pillow stops the browser and renders without it, the render is
+    only saved when PILLOW_IMAGE_PATH is set
+    """
+    stopped = []
+    sent = []
+
+    async def fetch_dashboard_data(_config):
+        return example_data
+
+    async def render_webpage(_browser):
+        raise AssertionError("Rendered with the browser")
+
+    async def send_to_server(frame):
+        sent.append(frame)
+
+    async def stop():
+        stopped.append(True)
+
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    monkeypatch.delenv("PILLOW_IMAGE_PATH", raising=False)
+    monkeypatch.setattr(climate, "ICON_CACHE_DIRECTORY", tmp_path / "icons")
+    monkeypatch.setattr(utils, "fetch_dashboard_data", fetch_dashboard_data)
+    monkeypatch.setattr(utils, "render_webpage", render_webpage)
+    monkeypatch.setattr(utils, "send_to_server", send_to_server)
+    monkeypatch.setattr(utils, "is_within_update_hours", lambda: True)
+    monkeypatch.setattr(utils, "SEND_DIRECTLY", False)
+    monkeypatch.setattr(utils, "rendered_frames", FrameCache())
+    monkeypatch.setattr(utils, "sent_frames", utils.FrameDeduplicator())
+    browser = SimpleNamespace(
+        dither="threshold", is_alive=lambda: not stopped, stop=stop
+    )
+    api_config = SimpleNamespace(
+        config=SimpleNamespace(render=SimpleNamespace(renderer="pillow"))
+    )
+
+    for _ in range(2):
+        asyncio.run(utils.run_dashboard_update(api_config, browser))
+
+    assert stopped == [True]
+    assert len(sent) == 1 and len(sent[0]) == 48000
+    # Nothing is written without PILLOW_IMAGE_PATH
+    assert not list(workdir.iterdir())
+
+    path = tmp_path / "pillow.png"
+    monkeypatch.setenv("PILLOW_IMAGE_PATH", str(path))
+    example_data.time += timedelta(minutes=1)
+    asyncio.run(utils.run_dashboard_update(api_config, browser))
+    assert Image.open(path).size == (800, 480)
@@ -0,0 +1,119 @@
+"""
+Test fingerprinting the dashboard inputs and reusing rendered frames
+"""
+import asyncio
+import json
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from api import utils
+from api.frame_cache import FrameCache, dashboard_fingerprint
+from render.models import DashboardInputData
+from sources.national_rail.models import TrainServices
+
+RECORDED_BOARD = Path(__file__).parents[2] / "benchmarks/recorded/departures_HRN.json"
+
+
+@pytest.fixture(name="data")
+def fixture_data(example_data: DashboardInputData) -> DashboardInputData:
+    """
+    The example data the page is developed against, with trains
+    """
+    example_data.rail.northbound.trainServices = TrainServices.parse_obj(
+        json.loads(RECORDED_BOARD.read_text())["trainServices"]
+    )
+    return example_data
+
+
+def test_fingerprint_ignores_what_is_not_shown(data):
+    """
+    Seconds, fetch times and fields that aren't drawn don't change the fingerprint
+    """
+    fingerprint = dashboard_fingerprint(data, "pillow")
+    data.time = data.time.replace(second=59)
+    data.weather.main.temp += 0.1
+    data.weather.main.pressure += 10
+    data.rail.northbound.generatedAt += timedelta(seconds=30)
+
+    assert dashboard_fingerprint(data, "pillow") == fingerprint
+
+
+def test_fingerprint_changes_with_what_is_shown(data):
+    """
+    The minute, departures, rounded temperatures and the renderer are all part of it
+    """
+    fingerprints = {dashboard_fingerprint(data, "pillow")}
+
+    fingerprints.add(dashboard_fingerprint(data, "webpage:threshold"))
+    data.time += timedelta(minutes=1)
+    fingerprints.add(dashboard_fingerprint(data, "pillow"))
+    data.rail.northbound.trainServices.service[0].etd = "23:40"
+    fingerprints.add(dashboard_fingerprint(data, "pillow"))
+    data.weather.main.temp = 19.5
+    fingerprints.add(dashboard_fingerprint(data, "pillow"))
+    data.aircon[0].humidity += 1
+    fingerprints.add(dashboard_fingerprint(data, "pillow"))
+
+    assert len(fingerprints) == 6
+
+
+def test_frame_cache_is_lru():
+    """
+    The least recently used frame is evicted and hits are counted
+    """
+    cache = FrameCache(size=2)
+    cache.put("a", b"frame a")
+    cache.put("b", b"frame b")
+    assert cache.get("a") == b"frame a"
+    cache.put("c", b"frame c")
+
+    assert cache.get("b") is None
+    assert cache.get("c") == b"frame c"
+    assert cache.stats() == {
+        "frame_cache_hits": 2,
+        "frame_cache_misses": 1,
+        "frame_cache_hit_rate": 2 / 3,
+        "frame_cache_frames": 2,
+    }
+
+
+def test_unchanged_inputs_skip_rendering(data, monkeypatch):
+    """
+    The second update in the same minute with the same data doesn't render
+    """
+    rendered = []
+    sent = []
+
+    async def fetch_dashboard_data(_config):
+        return data
+
+    async def render_webpage(_browser):
+        rendered.append(data.time)
+        return bytes(48000)
+
+    async def send_to_server(frame):
+        sent.append(frame)
+
+    monkeypatch.setattr(utils, "fetch_dashboard_data", fetch_dashboard_data)
+    monkeypatch.setattr(utils, "render_webpage", render_webpage)
+    monkeypatch.setattr(utils, "send_to_server", send_to_server)
+    monkeypatch.setattr(utils, "is_within_update_hours", lambda: True)
+    monkeypatch.setattr(utils, "SEND_DIRECTLY", False)
+    monkeypatch.setattr(utils, "rendered_frames", FrameCache())
+    monkeypatch.setattr(utils, "sent_frames", utils.FrameDeduplicator())
+    browser = SimpleNamespace(dither="threshold", is_alive=lambda: True)
+    api_config = SimpleNamespace(
+        config=SimpleNamespace(render=SimpleNamespace(renderer="webpage"))
+    )
+
+    for _ in range(2):
+        asyncio.run(utils.run_dashboard_update(api_config, browser))
+    data.time += timedelta(minutes=1)
+    asyncio.run(utils.run_dashboard_update(api_config, browser))
+
+    assert len(rendered) == 2
+    assert len(sent) == 1
+    assert utils.rendered_frames.stats()["frame_cache_hits"] == 1
@@ -0,0 +1,248 @@
+"""
+Test capturing the webpage as a frame
+"""
+import asyncio
+import io
+
+import pytest
+from playwright.async_api import (
+    Error as PlaywrightError,
+    TimeoutError as PlaywrightTimeoutError,
+)
+from PIL import Image
+
+from api import render_webpage
+from render import threshold
+
+
+class FakePage:
+    """
+    Returns a screenshot of a page that is half black, and records navigation
+    """
+
+    def __init__(self, fail_goto: int = 0, ready: bool = True):
+        self.screenshots = []
+        self.navigations = []
+        self.waits = []
+        self.url = "about:blank"
+        self.closed = False
+        self.fail_goto = fail_goto
+        self.ready = ready
+
+    def on(self, _event, _callback):
+        """
+        Console messages are ignored
+        """
+
+    def is_closed(self) -> bool:
+        """
+        Closed with the browser
+        """
+        return self.closed
+
+    async def goto(self, url, **kwargs):
+        """
+        Navigate, failing like a crashed browser the first fail_goto times
+        """
+        if self.fail_goto:
+            self.fail_goto -= 1
+            raise PlaywrightError("Target closed")
+        self.navigations.append(("goto", kwargs))
+        self.url = url
+
+    async def reload(self, **kwargs):
+        """
+        Reload the current url
+        """
+        self.navigations.append(("reload", kwargs))
+
+    async def wait_for_function(self, expression, polling=None, timeout=None):
+        """
+        Validate polling the way Playwright does before anything is sent
+        """
+        if isinstance(polling, str) and polling != "raf":
+            raise PlaywrightError(f"Unknown polling option: {polling}")
+        self.waits.append({"expression": expression, "polling": polling})
+        assert 0 < timeout <= render_webpage.RENDER_TIMEOUT_MS
+        if not self.ready:
+            raise PlaywrightTimeoutError("Timeout exceeded")
+
+    async def evaluate(self, _expression):
+        """
+        No fetches were made
+        """
+        return 0
+
+    async def screenshot(self, **kwargs) -> bytes:
+        """
+        Record the arguments and return a PNG
+        """
+        self.screenshots.append(kwargs)
+        image = Image.new("RGB", (800, 480), "white")
+        image.paste("black", (0, 0, 400, 480))
+        png = io.BytesIO()
+        image.save(png, "PNG")
+        return png.getvalue()
+
+
+def test_single_screenshot_in_memory(monkeypatch, tmp_path):
+    """
+    The page is captured once, clipped to the panel, and nothing is written
+    """
+    monkeypatch.delenv("SCREENSHOT_PATH", raising=False)
+    monkeypatch.chdir(tmp_path)
+    page = FakePage()
+
+    frame = asyncio.run(render_webpage.generate_image(page))
+
+    assert page.screenshots == [{"type": "png", "clip": render_webpage.SCREENSHOT_CLIP}]
+    assert frame == threshold.to_frame(
+        Image.open(io.BytesIO(asyncio.run(FakePage().screenshot())))
+    )
+    assert not list(tmp_path.iterdir())
+
+
+def test_debug_screenshot(monkeypatch, tmp_path):
+    """
+    With SCREENSHOT_PATH set the screenshot is also saved there
+    """
+    path = tmp_path / "screenshot.png"
+    monkeypatch.setenv("SCREENSHOT_PATH", str(path))
+
+    # The file is written in the default executor, which asyncio.run waits for
+    asyncio.run(render_webpage.generate_image(FakePage(), "ordered"))
+
+    assert Image.open(path).size == (800, 480)
+
+
+def test_unknown_dither():
+    """
+    The browser manager refuses a dither that doesn't exist
+    """
+    with pytest.raises(ValueError):
+        render_webpage.BrowserManager(dither="halftone")
+
+
+class FakeBrowser:
+    """
+    A browser with a single page, which can be made to crash
+    """
+
+    def __init__(self, page: FakePage):
+        self.page = page
+        self.connected = True
+
+    def is_connected(self) -> bool:
+        """
+        False once closed or crashed
+        """
+        return self.connected
+
+    async def close(self):
+        """
+        Close the browser and its page
+        """
+        self.connected = False
+        self.page.closed = True
+
+
+@pytest.fixture(name="launches")
+def fixture_launches(monkeypatch):
+    """
+    Browsers launched by BrowserManager, opening the pages queued in pages
+    """
+    launched = []
+    pages = []
+
+    async def launch(manager):
+        page = pages.pop(0) if pages else FakePage()
+        launched.append(FakeBrowser(page))
+        # pylint: disable=protected-access
+        manager._browser, manager._page = launched[-1], page
+        manager.renders = 0
+
+    monkeypatch.setattr(render_webpage.BrowserManager, "_launch", launch)
+    monkeypatch.setattr(render_webpage, "process_tree_rss_mb", lambda _pid: 0)
+    monkeypatch.delenv("SCREENSHOT_PATH", raising=False)
+    return launched, pages
+
+
+def test_render_waits_for_loaded_class(launches):
+    """
+    The page is loaded once then reloaded, and readiness is checked in the browser
+    """
+    launched, _ = launches
+    manager = render_webpage.BrowserManager()
+
+    for _ in range(2):
+        frame = asyncio.run(manager.render("http://webpage/"))
+
+    page = launched[0].page
+    assert len(launched) == 1
+    assert [action for action, _ in page.navigations] == ["goto", "reload"]
+    assert [wait["polling"] for wait in page.waits] == ["raf", "raf"]
+    assert "loaded" in page.waits[0]["expression"]
+    assert len(frame) == 48000
+    assert manager.renders == 2
+    assert manager.last_timings.total_ms >= manager.last_timings.navigation_ms
+
+
+def test_browser_recycled_after_render_limit(launches):
+    """
+    The browser is closed and relaunched once it has done max_renders renders
+    """
+    launched, _ = launches
+    manager = render_webpage.BrowserManager(max_renders=2)
+
+    for _ in range(3):
+        asyncio.run(manager.render("http://webpage/"))
+
+    assert len(launched) == 2
+    assert not launched[0].connected
+    assert manager.renders == 1
+
+
+def test_crashed_browser_relaunched(launches):
+    """
+    A browser that is no longer connected is replaced before rendering
+    """
+    launched, _ = launches
+    manager = render_webpage.BrowserManager()
+    asyncio.run(manager.render("http://webpage/"))
+
+    launched[0].connected = False
+    asyncio.run(manager.render("http://webpage/"))
+
+    assert len(launched) == 2
+    assert manager.is_alive()
+
+
+def test_failed_render_retried_once(launches):
+    """
+    A Playwright error relaunches the browser and retries, a second one is raised
+    """
+    launched, pages = launches
+    pages.extend([FakePage(fail_goto=1), FakePage()])
+    manager = render_webpage.BrowserManager()
+
+    asyncio.run(manager.render("http://webpage/"))
+    assert len(launched) == 2
+
+    launched[1].connected = False
+    pages.extend([FakePage(fail_goto=1), FakePage(fail_goto=1)])
+    with pytest.raises(PlaywrightError):
+        asyncio.run(manager.render("http://webpage/"))
+    assert len(launched) == 4
+
+
+def test_page_not_ready(launches):
+    """
+    A page that never gets the loaded class is an error and isn't retried
+    """
+    launched, pages = launches
+    pages.append(FakePage(ready=False))
+    manager = render_webpage.BrowserManager()
+
+    with pytest.raises(render_webpage.PageNotReadyError):
+        asyncio.run(manager.render("http://webpage/"))
+    assert len(launched) == 1
@@ -0,0 +1,161 @@
+"""
+Configuration Store Tests
+"""
+import os
+
+import pytest
+from pydantic import ValidationError
+
+import config
+from config import ConfigStore, load_config
+
+CONFIGURATION = """
+[tokens]
+national_rail=rail-token
+open_weather_map=weather-token
+
+[stations]
+northbound=HRN,WIH,4
+southbound=HRN,FPK,4
+
+[weather]
+townid={townid}
+
+[endpoints]
+display_server=http://display/upload
+
+[aircon]
+endpoints=192.168.0.2
+"""
+
+
+def write_config(path, townid: int, mtime: int):
+    """
+    Write the file with a known modification time
+    """
+    path.write_text(CONFIGURATION.format(townid=townid))
+    os.utime(path, (mtime, mtime))
+
+
+def test_reloads_changed_file(tmp_path, monkeypatch):
+    """
+    A changed file is swapped in and only the changed section's subscribers are called
+    """
+    monkeypatch.setattr(config, "RELOAD_CHECK_INTERVAL", 0)
+    path = tmp_path / "configuration.ini"
+    write_config(path, townid=1, mtime=1000)
+    store = ConfigStore(path)
+    changed = []
+    store.subscribe("weather", lambda new: changed.append(("weather", new)))
+    store.subscribe("aircon", lambda new: changed.append(("aircon", new)))
+
+    first = store.config
+    assert store.config is first
+
+    write_config(path, townid=2, mtime=2000)
+    second = store.config
+
+    assert first.weather.townid == 1
+    assert second.weather.townid == 2
+    assert changed == [("weather", second)]
+
+
+def test_invalid_file_keeps_old_snapshot(tmp_path, monkeypatch):
+    """
+    A file that fails validation does not replace the loaded configuration
+    """
+    monkeypatch.setattr(config, "RELOAD_CHECK_INTERVAL", 0)
+    path = tmp_path / "configuration.ini"
+    write_config(path, townid=1, mtime=1000)
+    store = ConfigStore(path)
+    first = store.config
+
+    write_config(path, townid="not-a-number", mtime=2000)
+
+    assert store.config is first
+
+
+def test_broken_file_keeps_old_snapshot(tmp_path, monkeypatch):
+    """
+    A file that isn't valid INI, e.g. half written, does not replace the loaded
+    configuration, and isn't parsed again until it changes
+    """
+    monkeypatch.setattr(config, "RELOAD_CHECK_INTERVAL", 0)
+    path = tmp_path / "configuration.ini"
+    write_config(path, townid=1, mtime=1000)
+    store = ConfigStore(path)
+    first = store.config
+    loads = []
+    monkeypatch.setattr(
+        config, "load_config", lambda path: loads.append(path) or load_config(path)
+    )
+
+    path.write_text(CONFIGURATION.format(townid=1) + "\n[weather]\ntownid=2\n")
+    os.utime(path, (2000, 2000))
+
+    assert store.config is first
+    assert store.config is first
+    assert len(loads) == 1
+
+
+def test_render_section(tmp_path):
+    """
+    The renderer defaults to the webpage, and only known renderers are accepted
+    """
+    path = tmp_path / "configuration.ini"
+    write_config(path, townid=1, mtime=1000)
+    assert config.load_config(path).render.renderer == "webpage"
+
+    path.write_text(path.read_text() + "\n[render]\nrenderer=pillow\n")
+    assert config.load_config(path).render.renderer == "pillow"
+
+    path.write_text(path.read_text().replace("=pillow", "=firefox"))
+    with pytest.raises(ValidationError):
+        config.load_config(path)
+
+
+def test_legacy_station_keys(tmp_path):
+    """
+    The old <name>_from and <name>_to pairs are read as boards
+    """
+    path = tmp_path / "configuration.ini"
+    write_config(path, townid=1, mtime=1000)
+    path.write_text(
+        path.read_text().replace(
+            "northbound=HRN,WIH,4\nsouthbound=HRN,FPK,4",
+            "northbound_from=HRN\nnorthbound_to=WIH\n"
+            "southbound_from=HRN\nsouthbound_to=FPK",
+        )
+    )
+
+    stations = config.load_config(path).stations
+
+    assert [board.dict() for board in stations.boards] == [
+        {"name": "northbound", "from_crs": "HRN", "to_crs": "WIH", "rows": 4},
+        {"name": "southbound", "from_crs": "HRN", "to_crs": "FPK", "rows": 4},
+    ]
+    assert stations.board("southbound").to_crs == "FPK"
+    with pytest.raises(KeyError, match="eastbound"):
+        stations.board("eastbound")
+
+
+@pytest.mark.parametrize(
+    "stations, key",
+    [
+        ("northbound=HRN\nsouthbound=HRN,FPK", "northbound"),
+        ("northbound_from=HRN\nsouthbound=HRN,FPK", "northbound_to"),
+    ],
+)
+def test_malformed_station_keys(tmp_path, stations, key):
+    """
+    A board in neither format is an error naming the key and the format
+    """
+    path = tmp_path / "configuration.ini"
+    write_config(path, townid=1, mtime=1000)
+    path.write_text(
+        path.read_text().replace("northbound=HRN,WIH,4\nsouthbound=HRN,FPK,4", stations)
+    )
+
+    with pytest.raises(ValueError, match=key) as error:
+        config.load_config(path)
+    assert "=FROM,TO[,ROWS]" in str(error.value)
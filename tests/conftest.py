@@ -0,0 +1,29 @@
+"""
+Fixtures shared by every test
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from render.models import DashboardInputData
+
+EXAMPLE_DATA = Path(__file__).parents[1] / "render/svelte/src/routes/data.json"
+
+
+@pytest.fixture(name="example_data")
+def fixture_example_data() -> DashboardInputData:
+    """
+    The example data the webpage is developed against
+    """
+    example = json.loads(EXAMPLE_DATA.read_text())
+    # Recorded as ISO dates, the API returns timestamps
+    for item, field in (
+        (example["air_quality"]["list"][0], "dt"),
+        (example["weather"], "dt"),
+        (example["weather"]["sys"], "sunrise"),
+        (example["weather"]["sys"], "sunset"),
+    ):
+        item[field] = int(datetime.fromisoformat(item[field]).timestamp())
+    return DashboardInputData.parse_obj(example)
@@ -0,0 +1,25 @@
+"""
+Fixtures shared by the render tests
+"""
+import pytest
+
+from render.pillow import climate
+
+
+@pytest.fixture(name="icon_cache")
+def fixture_icon_cache(tmp_path, monkeypatch):
+    """
+    An empty disk cache and memory cache, counting rasterizations
+    """
+    monkeypatch.setattr(climate, "ICON_CACHE_DIRECTORY", tmp_path)
+    rasterized = []
+    rasterize_icon = climate.rasterize_icon
+
+    def counting_rasterize(svg_file, size=climate.ICON_SIZE):
+        rasterized.append(svg_file.name)
+        return rasterize_icon(svg_file, size)
+
+    monkeypatch.setattr(climate, "rasterize_icon", counting_rasterize)
+    climate.get_weather_icon.cache_clear()
+    yield rasterized
+    climate.get_weather_icon.cache_clear()
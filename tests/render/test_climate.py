@@ -0,0 +1,31 @@
+"""
+Test the weather icon cache
+"""
+import pytest
+
+from render.pillow import climate
+
+
+def test_icon_is_rasterized_once(icon_cache):
+    """
+    Icons are 1-bit at the drawn size, rasterized once and then read from the caches
+    """
+    icon = climate.get_weather_icon("Rain")
+    assert climate.get_weather_icon("Rain") is icon
+    assert icon.mode == "1"
+    assert icon.width <= climate.ICON_SIZE[0] and icon.height <= climate.ICON_SIZE[1]
+
+    climate.get_weather_icon.cache_clear()
+    from_disk = climate.get_weather_icon("Rain")
+
+    assert from_disk.tobytes() == icon.tobytes()
+    assert icon_cache == ["067-storm-6.svg"]
+
+
+def test_unknown_weather(icon_cache):
+    """
+    Weather types without an icon are an error
+    """
+    with pytest.raises(ValueError):
+        climate.get_weather_icon("Volcano")
+    assert not icon_cache
@@ -0,0 +1,68 @@
+"""
+Test the glyph atlas
+"""
+import pytest
+from PIL import Image, ImageDraw
+
+from render.pillow import fonts
+
+CLOCKS = [f"{hour:02d}:{minute:02d}" for hour in range(24) for minute in range(60)]
+TEMPERATURES = [f"{temperature}°C" for temperature in range(-20, 41)]
+COUNTDOWNS = [f"{minutes} MINS" for minutes in range(61)] + [
+    f"{hours} HR {minutes} MINS" for hours in (1, 9, 23) for minutes in range(60)
+]
+
+
+def render(draw_text, text: str) -> bytes:
+    """
+    Text drawn onto a blank 1-bit image by `draw_text`
+    """
+    image = Image.new("1", (800, 200), 255)
+    draw_text(ImageDraw.Draw(image), (40, 15), text)
+    return image.tobytes()
+
+
+@pytest.mark.parametrize(
+    "font, strings",
+    [
+        (fonts.font_time, CLOCKS),
+        (fonts.font_bigtemp, TEMPERATURES),
+        (fonts.font_smalltemp, TEMPERATURES),
+        (fonts.font_traininfo, COUNTDOWNS + CLOCKS[::37]),
+    ],
+)
+def test_atlas_matches_freetype(font, strings):
+    """
+    Text drawn and measured from the atlas is the same as through FreeType
+    """
+    atlas = fonts.GlyphAtlas(font)
+    for text in strings:
+        assert atlas.supports(text)
+        assert render(
+            lambda draw, xy, text: atlas.text(draw, xy, text), text
+        ) == render(
+            lambda draw, xy, text: draw.text(xy, text, font=font, fill=0), text
+        ), text
+        assert atlas.getbbox(text) == font.getbbox(text, mode="1"), text
+        assert atlas.getsize(text)[0] == font.getbbox(text)[2], text
+
+
+def test_unsupported_text_falls_back():
+    """
+    Text with characters outside the atlas is drawn with FreeType
+    """
+    atlas = fonts.glyph_atlas(fonts.font_traininfo)
+    assert fonts.glyph_atlas(fonts.font_traininfo) is atlas
+    assert not atlas.supports("On time")
+    assert not atlas.supports("")
+
+    assert render(
+        lambda draw, xy, text: fonts.draw_text(draw, xy, text, fonts.font_traininfo),
+        "On time",
+    ) == render(
+        lambda draw, xy, text: draw.text(xy, text, font=fonts.font_traininfo, fill=0),
+        "On time",
+    )
+    assert fonts.text_width("On time", fonts.font_traininfo) == (
+        fonts.font_traininfo.getbbox("On time")[2]
+    )
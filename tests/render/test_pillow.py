@@ -0,0 +1,183 @@
+"""
+Test the region-based Pillow dashboard
+"""
+from datetime import datetime
+
+import pytest
+from PIL import ImageChops
+
+from render.models import DashboardInputData, RailwayInformation
+from render.pillow import climate
+from render.pillow.pillow import CONDITIONS, REGIONS, PillowDashboard, render_dashboard
+from sources.national_rail.models import DeparturesResponse
+
+TIME = datetime(2023, 6, 25, 10, 3)
+TEMPERATURES = {"High": 24, "Low": 13, "Average": 19, "Weather": "Clouds"}
+
+# Keep rasterized icons out of the user's cache
+pytestmark = pytest.mark.usefixtures("icon_cache")
+
+
+def departures(*services: tuple[str, str, str]) -> DeparturesResponse:
+    """
+    A board of services given as scheduled time, destination and expected time
+    """
+    return DeparturesResponse(
+        generatedAt="2023-06-25T10:00:00+01:00",
+        locationName="Hornsey",
+        crs="HRN",
+        filterLocationName="Winchmore Hill",
+        filtercrs="WIH",
+        platformAvailable=True,
+        trainServices={
+            "service": [
+                {
+                    "std": std,
+                    "etd": etd,
+                    "operator": "Great Northern",
+                    "operatorCode": "GN",
+                    "serviceType": "train",
+                    "serviceID": str(index),
+                    "origin": {"location": [{"locationName": "Hornsey", "crs": "HRN"}]},
+                    "destination": {
+                        "location": [{"locationName": destination, "crs": "XXX"}]
+                    },
+                }
+                for index, (std, destination, etd) in enumerate(services)
+            ]
+        },
+    )
+
+
+NORTHBOUND = departures(
+    ("10:12", "Welwyn Garden City", "On time"), ("10:24", "Hertford North", "10:26")
+)
+SOUTHBOUND = departures(("10:08", "Moorgate", "On time"))
+
+
+def test_only_changed_regions_are_redrawn():
+    """
+    The first render draws every region, later ones only those with new inputs
+    """
+    dashboard = PillowDashboard()
+
+    dashboard.render(NORTHBOUND, SOUTHBOUND, TEMPERATURES, TIME)
+    assert dashboard.changed_regions == [region.name for region in REGIONS]
+
+    dashboard.render(NORTHBOUND, SOUTHBOUND, TEMPERATURES, TIME.replace(second=40))
+    assert not dashboard.changed_regions
+
+    dashboard.render(NORTHBOUND, SOUTHBOUND, {**TEMPERATURES, "Weather": "Rain"}, TIME)
+    assert dashboard.changed_regions == ["icon"]
+
+    dashboard.render(
+        NORTHBOUND,
+        SOUTHBOUND,
+        {**TEMPERATURES, "Weather": "Rain"},
+        TIME.replace(minute=4),
+    )
+    assert dashboard.changed_regions == ["clock", "northbound", "southbound"]
+    assert dashboard.changed_boxes == [REGIONS[0].box, REGIONS[2].box, REGIONS[3].box]
+
+
+def test_redrawn_regions_match_a_full_render():
+    """
+    Compositing changed regions gives the same image as drawing everything
+    """
+    dashboard = PillowDashboard()
+    dashboard.render(NORTHBOUND, SOUTHBOUND, TEMPERATURES, TIME)
+    delayed = departures(("10:08", "Moorgate", "10:15"))
+    later = TIME.replace(minute=5)
+    colder = {**TEMPERATURES, "Average": 9, "Weather": "Rain"}
+
+    incremental = dashboard.render(NORTHBOUND, delayed, colder, later)
+    full = PillowDashboard().render(NORTHBOUND, delayed, colder, later)
+
+    assert incremental.tobytes() == full.tobytes()
+    # Callers get a copy, drawing on it doesn't change the next render
+    incremental.paste(0, (0, 0, 800, 480))
+    assert dashboard.render(NORTHBOUND, delayed, colder, later).tobytes() == (
+        full.tobytes()
+    )
+
+
+def test_departure_issues_region():
+    """
+    A board without services is redrawn when it gets services again
+    """
+    dashboard = PillowDashboard()
+    empty = NORTHBOUND.copy(update={"trainServices": None})
+    dashboard.render(empty, SOUTHBOUND, TEMPERATURES, TIME)
+
+    dashboard.render(empty, SOUTHBOUND, TEMPERATURES, TIME)
+    assert not dashboard.changed_regions
+
+    dashboard.render(NORTHBOUND, SOUTHBOUND, TEMPERATURES, TIME)
+    assert dashboard.changed_regions == ["northbound"]
+
+
+@pytest.fixture(name="data")
+def fixture_data(example_data: DashboardInputData) -> DashboardInputData:
+    """
+    The example data the webpage is developed against, with these boards
+    """
+    example_data.rail = RailwayInformation(northbound=NORTHBOUND, southbound=SOUTHBOUND)
+    example_data.time = TIME
+    return example_data
+
+
+def test_conditions_match_the_webpage(data):
+    """
+    The description, air quality and aircon lines show what the webpage does
+    """
+    data.weather.main.temp = 18.5
+    conditions = climate.get_conditions(data.weather, data.air_quality, data.aircon)
+
+    assert climate.conditions_lines(conditions) == [
+        "CLEAR SKY   AQI: 2",
+        "LIVING ROOM: 23C 45%   BEDROOM: 27C 35%   OUTDOOR: 19C",
+    ]
+    # Rounded half up like Math.round, not to even
+    assert climate.get_temperatures(data.weather)["Average"] == "19"
+
+
+def test_render_dashboard_draws_every_section(data):
+    """
+    The dashboard is drawn from the webpage's data, with the conditions lines
+    """
+    dashboard = PillowDashboard()
+
+    image = render_dashboard(data)
+    without_conditions = dashboard.render(
+        NORTHBOUND, SOUTHBOUND, climate.get_temperatures(data.weather), TIME
+    )
+
+    difference = ImageChops.difference(
+        image.convert("L"), without_conditions.convert("L")
+    )
+    assert difference.getbbox() is not None
+    left, top, right, bottom = difference.getbbox()
+    assert CONDITIONS.box[0] <= left and right <= CONDITIONS.box[2]
+    assert CONDITIONS.box[1] <= top and bottom <= CONDITIONS.box[3]
+
+
+def test_engineering_message_is_drawn():
+    """
+    A board without services shows the first sentence of its message
+    """
+    disrupted = DeparturesResponse.parse_obj(
+        {
+            **NORTHBOUND.dict(),
+            "trainServices": None,
+            "nrccMessages": {
+                "message": [{"_value_1": "Buses replace trains. More details online"}]
+            },
+        }
+    )
+
+    empty = PillowDashboard().render(
+        NORTHBOUND.copy(update={"trainServices": None}), SOUTHBOUND, TEMPERATURES, TIME
+    )
+    image = PillowDashboard().render(disrupted, SOUTHBOUND, TEMPERATURES, TIME)
+
+    assert image.tobytes() != empty.tobytes()
@@ -0,0 +1,53 @@
+"""
+Test converting renders to packed frames
+"""
+import pytest
+from PIL import Image
+
+from render import threshold
+from waveshare_epd.frame import frame_size, pack_frame
+
+GRADIENT = Image.linear_gradient("L").resize((800, 480))
+
+
+def black_pixels(frame: bytes) -> int:
+    """
+    Number of black pixels in a packed frame
+    """
+    return sum(bin(byte).count("1") for byte in frame)
+
+
+def test_threshold_matches_point():
+    """
+    The fixed threshold gives the same frame as thresholding pixel by pixel
+    """
+    expected = pack_frame(GRADIENT.point(lambda p: p > 128 and 255))
+    assert threshold.to_frame(GRADIENT.convert("RGB")) == expected
+
+
+@pytest.mark.parametrize("method", threshold.METHODS)
+def test_methods_keep_the_grey_level(method):
+    """
+    Every method packs a full frame with about as much black as the image has
+    """
+    frame = threshold.to_frame(GRADIENT, method)
+    assert len(frame) == frame_size()
+    assert black_pixels(frame) == pytest.approx(800 * 480 / 2, rel=0.02)
+
+
+def test_ordered_dither_of_flat_grey():
+    """
+    A flat grey is dithered into a repeating pattern of its level
+    """
+    frame = threshold.to_frame(Image.new("L", (800, 480), 64), "ordered")
+    assert black_pixels(frame) == 800 * 480 * 3 // 4
+    rows = [frame[row * 100 : (row + 1) * 100] for row in range(480)]
+    assert rows[:8] * 60 == rows
+
+
+def test_unknown_method():
+    """
+    Methods other than METHODS are an error
+    """
+    with pytest.raises(ValueError):
+        threshold.to_frame(GRADIENT, "halftone")
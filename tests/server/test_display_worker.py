@@ -0,0 +1,109 @@
+"""
+Test the display worker
+"""
+import asyncio
+import time
+
+from server import DisplayWorker
+from waveshare_epd.async_epd import AsyncEPD
+from waveshare_epd.epd7in5_V2 import EPD
+from waveshare_epd.frame import blank_frame
+from waveshare_epd.power import PanelPowerManager
+
+
+def test_latest_frame_wins():
+    """
+    Frames uploaded during a refresh replace each other, only the newest is shown
+    """
+    shown = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def display(frame: bytes):
+            shown.append(frame)
+            await release.wait()
+
+        worker = DisplayWorker(display)
+        worker.submit(b"first")
+        await asyncio.sleep(0)
+        worker.submit(b"second")
+        state = worker.submit(b"third")
+        release.set()
+        await worker.wait_until_idle()
+        await worker.stop()
+        return state, worker.status()
+
+    state, status = asyncio.run(scenario())
+
+    assert state["sequence"] == 3
+    assert state["replaced_sequence"] == 2
+    assert state["refreshing_sequence"] == 1
+    assert shown == [b"first", b"third"]
+    assert status["displayed_sequence"] == 3
+    assert status["frames_replaced"] == 1
+    assert status["last_refresh_ms"] is not None
+
+
+def test_failed_refresh_does_not_stop_worker():
+    """
+    A refresh that raises is counted and the next frame is still shown
+    """
+    shown = []
+
+    async def display(frame: bytes):
+        if frame == b"bad":
+            raise OSError("SPI error")
+        shown.append(frame)
+
+    async def scenario():
+        worker = DisplayWorker(display)
+        worker.submit(b"bad")
+        await worker.wait_until_idle()
+        worker.submit(b"good")
+        await worker.wait_until_idle()
+        await worker.stop()
+        return worker.status()
+
+    status = asyncio.run(scenario())
+
+    assert shown == [b"good"]
+    assert status["refresh_failures"] == 1
+    assert status["displayed_sequence"] == 2
+
+
+def test_event_loop_runs_during_refresh():
+    """
+    The refresh runs in the panel's executor, the event loop keeps running
+    """
+
+    class SlowEPD(EPD):
+        """
+        Blocks like a real refresh
+        """
+
+        def refresh(self, frame: bytes):
+            """
+            Block the calling thread
+            """
+            time.sleep(0.2)
+
+    async def scenario():
+        epd = AsyncEPD(PanelPowerManager(SlowEPD(), awake_hours=(0, 24)))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.create_task(ticker())
+        await epd.display(blank_frame())
+        await epd.wait_idle()
+        ticking.cancel()
+        epd.panel.sleep()
+        epd.close()
+        return ticks
+
+    assert asyncio.run(scenario()) > 5
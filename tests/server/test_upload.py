@@ -0,0 +1,63 @@
+"""
+Test Display Server
+"""
+import pytest
+from starlette.testclient import TestClient
+
+from server import app, displayed_frames
+from waveshare_epd import transport
+from waveshare_epd.frame import blank_frame, frame_hash
+
+
+@pytest.fixture(name="client")
+def fixture_client():
+    """
+    Client with the display worker running
+    """
+    with TestClient(app) as client:
+        yield client
+
+
+def test_unchanged_frame_is_skipped(client):
+    """
+    Uploading the same frame twice only refreshes the panel once
+    """
+    frame = blank_frame()
+    before = displayed_frames.stats()
+
+    first = client.post("/upload", content=frame)
+    second = client.post("/upload", content=frame)
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert first.json()["frame_hash"] == second.json()["frame_hash"]
+    stats = client.get("/stats").json()
+    assert stats["frames_skipped"] >= before["frames_skipped"] + 1
+    assert stats["last_frame_hash"] == first.json()["frame_hash"]
+
+
+def test_delta_upload(client):
+    """
+    A delta against the displayed frame is applied, a delta against
+    any other frame is answered with a request for the full frame
+    """
+    base = blank_frame()
+    client.post("/upload", content=base)
+    frame = bytearray(base)
+    frame[4000:4100] = b"\xff" * 100
+    frame = bytes(frame)
+
+    delta = transport.encode_frame(frame, base, ("xor-zlib",))
+    stale = transport.encode_frame(base, bytes(reversed(frame)), ("xor-zlib",))
+
+    applied = client.post("/upload", content=delta.body, headers=delta.headers)
+    rejected = client.post("/upload", content=stale.body, headers=stale.headers)
+
+    assert applied.status_code == 200
+    assert applied.json()["frame_hash"] == frame_hash(frame)
+    assert displayed_frames.last_frame == frame
+    assert rejected.status_code == 409
+    assert rejected.json()["frame_hash"] == frame_hash(frame)
+    assert "xor-zlib" in transport.parse_accepted(
+        rejected.headers[transport.ACCEPT_HEADER]
+    )
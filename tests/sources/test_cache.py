@@ -0,0 +1,77 @@
+"""
+Source Cache Tests
+"""
+import asyncio
+
+from sources.cache import TTLCache
+
+
+class Upstream:
+    """
+    Counts calls and returns an increasing value
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch(self):
+        """
+        Slow upstream call
+        """
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.calls
+
+
+def test_concurrent_requests_share_one_call():
+    """
+    Single-flight: concurrent misses for a key make one upstream call
+    """
+    cache = TTLCache("test")
+    upstream = Upstream()
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get("key", upstream.fetch, ttl=60) for _ in range(5))
+        )
+
+    assert asyncio.run(run()) == [1] * 5
+    assert upstream.calls == 1
+
+
+def test_fresh_value_is_reused():
+    """
+    A value within its TTL is returned without calling upstream
+    """
+    cache = TTLCache("test")
+    upstream = Upstream()
+
+    async def run():
+        first = await cache.get("key", upstream.fetch, ttl=60)
+        second = await cache.get("key", upstream.fetch, ttl=60)
+        return first, second
+
+    assert asyncio.run(run()) == (1, 1)
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_stale_value_served_while_refreshing():
+    """
+    An expired value is returned while one background refresh runs
+    """
+    cache = TTLCache("test")
+    upstream = Upstream()
+
+    async def run():
+        await cache.get("key", upstream.fetch, ttl=0.02)
+        await asyncio.sleep(0.03)
+        stale = await asyncio.gather(
+            *(cache.get("key", upstream.fetch, ttl=0.02) for _ in range(3))
+        )
+        await asyncio.sleep(0.05)
+        return stale, await cache.get("key", upstream.fetch, ttl=60)
+
+    stale, refreshed = asyncio.run(run())
+    assert stale == [1, 1, 1]
+    assert refreshed == 2
+    assert upstream.calls == 2
@@ -0,0 +1,43 @@
+"""
+Daikin Poller Tests
+"""
+import asyncio
+
+import httpx
+
+from sources import Daikin
+
+BASIC_INFO = (
+    "ret=OK,type=aircon,reg=eu,dst=1,ver=1_14_68,rev=C3FF8A6,pow=1,err=0,"
+    "location=0,name=%42%65%64%72%6f%6f%6d,icon=0,method=home only,port=30050,"
+    "id=,pw=,lpw_flag=0,adp_kind=3,pv=3.20,cpv=3,cpv_minor=20,led=1,"
+    "en_setzone=1,mac=000000000000,adp_mode=run,en_hol=0,ssid1=home,"
+    "radio1=-40,ssid=DaikinAP,grp_name=,en_grp=0"
+)
+SENSOR_INFO = "ret=OK,htemp=22.0,hhum=45,otemp=18.0,err=0,cmpfreq=0"
+
+
+def test_poller_uses_last_reading_and_cached_name(httpx_mock):
+    """
+    Basic info is fetched once, and a unit that times out returns its last reading
+    """
+    basic_url = "http://192.168.0.2/common/basic_info"
+    sensor_url = "http://192.168.0.2/aircon/get_sensor_info"
+    httpx_mock.add_response(url=basic_url, text=BASIC_INFO)
+    httpx_mock.add_response(url=sensor_url, text=SENSOR_INFO)
+    httpx_mock.add_exception(httpx.ReadTimeout("Timed out"), url=sensor_url)
+    poller = Daikin.DaikinPoller(["192.168.0.2"])
+
+    async def run():
+        first = await poller.poll()
+        second = await poller.poll()
+        await poller.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first[0].name == "Bedroom"
+    assert first[0].temperature.indoor == 22.0
+    assert second == first
+    assert len(httpx_mock.get_requests(url=basic_url)) == 1
+    assert len(httpx_mock.get_requests(url=sensor_url)) == 2
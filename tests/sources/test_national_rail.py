@@ -0,0 +1,92 @@
+"""
+National Rail Client Tests
+"""
+from types import SimpleNamespace
+
+from sources import NationalRail
+from sources.national_rail.models import Board
+
+
+def service(service_id: str, destination: str, calling_at: list[str]) -> dict:
+    """
+    A service as returned by GetDepBoardWithDetails
+    """
+    return {
+        "std": "10:00",
+        "etd": "On time",
+        "operator": "Great Northern",
+        "operatorCode": "GN",
+        "serviceType": "train",
+        "serviceID": service_id,
+        "rsid": None,
+        "origin": {"location": [{"locationName": "Hornsey", "crs": "HRN"}]},
+        "destination": {"location": [{"locationName": destination, "crs": "XXX"}]},
+        "subsequentCallingPoints": {
+            "callingPointList": [
+                {
+                    "callingPoint": [
+                        {"locationName": crs.title(), "crs": crs, "st": "10:05"}
+                        for crs in calling_at
+                    ]
+                }
+            ]
+        },
+    }
+
+
+BOARD = {
+    "generatedAt": "2023-06-25T10:00:00+01:00",
+    "locationName": "Hornsey",
+    "crs": "HRN",
+    "nrccMessages": None,
+    "platformAvailable": True,
+    "trainServices": {
+        "service": [
+            service("1", "Welwyn Garden City", ["AAP", "WIH", "ENF"]),
+            service("2", "Moorgate", ["FPK", "MOG"]),
+            service("3", "Hertford North", ["AAP", "WIH", "HFN"]),
+            service("4", "Moorgate", ["FPK", "MOG"]),
+        ]
+    },
+}
+
+
+class FakeService:
+    """
+    Records the SOAP operations that are called
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def GetDepBoardWithDetails(self, **kwargs):  # pylint: disable=invalid-name
+        """
+        Unfiltered board with calling points
+        """
+        self.calls.append(("GetDepBoardWithDetails", kwargs["crs"]))
+        return BOARD
+
+
+def test_boards_from_one_origin_use_one_call():
+    """
+    Two boards from the same station are split from a single wider board
+    """
+    fake_service = FakeService()
+    rail_client = NationalRail.NationalRail.__new__(NationalRail.NationalRail)
+    rail_client.header_value = None
+    rail_client.client = SimpleNamespace(service=fake_service)
+
+    departures = rail_client.get_boards(
+        [
+            Board(name="northbound", from_crs="HRN", to_crs="WIH", rows=1),
+            Board(name="southbound", from_crs="HRN", to_crs="FPK", rows=4),
+        ]
+    )
+
+    assert fake_service.calls == [("GetDepBoardWithDetails", "HRN")]
+    northbound = departures["northbound"]
+    assert [s.serviceID for s in northbound.trainServices.service] == ["1"]
+    assert (northbound.filtercrs, northbound.filterLocationName) == ("WIH", "Wih")
+    southbound = departures["southbound"]
+    assert [s.serviceID for s in southbound.trainServices.service] == ["2", "4"]
+    assert southbound.filtercrs == "FPK"
@@ -0,0 +1,70 @@
+"""
+EPD Driver Tests
+"""
+from waveshare_epd.epd7in5_V2 import EPD, RefreshPolicy
+from waveshare_epd.frame import EPD_WIDTH, blank_frame
+
+
+def frame_with_clock(value: int) -> bytes:
+    """
+    A blank frame with a small changed area in the top left
+    """
+    frame = bytearray(blank_frame())
+    frame[20 * (EPD_WIDTH // 8) + 3] = value
+    return bytes(frame)
+
+
+def test_refresh_policy():
+    """
+    First frame is full, small changes are partial until the limit forces a full refresh
+    """
+    epd = EPD(RefreshPolicy(full_refresh_every=2, max_partial_fraction=0.5))
+
+    epd.refresh(frame_with_clock(1))
+    assert (epd.mode, epd.partial_count) == ("full", 0)
+
+    epd.refresh(frame_with_clock(2))
+    epd.refresh(frame_with_clock(3))
+    assert (epd.mode, epd.partial_count) == ("partial", 2)
+
+    epd.refresh(frame_with_clock(4))
+    assert (epd.mode, epd.partial_count) == ("full", 0)
+
+
+def test_refresh_large_change_is_full():
+    """
+    Changing most of the panel falls back to a full refresh
+    """
+    epd = EPD()
+    epd.refresh(blank_frame())
+    epd.refresh(bytes([0xFF]) * len(blank_frame()))
+    assert (epd.mode, epd.partial_count) == ("full", 0)
+
+
+def test_init_batches_spi_transfers():
+    """
+    Each command and its data is one CS assertion, so init no longer
+    pays two GPIO writes and an SPI transfer for every LUT byte
+    """
+    epd = EPD()
+    epd.init()
+
+    counters = epd.epdconfig.counters()
+    assert counters["spi_bytes"] == 251
+    assert counters["spi_transactions"] < 40
+    assert counters["gpio_writes"] < 80
+
+
+def test_display_streams_frame_in_one_transfer():
+    """
+    The whole frame is sent with a single SPI write
+    """
+    epd = EPD()
+    epd.init()
+    before = epd.epdconfig.counters()
+
+    epd.display(blank_frame())
+
+    after = epd.epdconfig.counters()
+    assert after["spi_bytes"] - before["spi_bytes"] > len(blank_frame())
+    assert after["spi_transactions"] - before["spi_transactions"] < 10
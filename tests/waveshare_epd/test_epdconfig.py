@@ -0,0 +1,147 @@
+"""
+Test waiting on the BUSY pin
+"""
+import sys
+import time
+import types
+
+import pytest
+
+from waveshare_epd import epdconfig
+from waveshare_epd.epdconfig import BusyTimeoutError, poll_until_idle
+
+
+class FakeGPIO:
+    """
+    RPi.GPIO with a BUSY pin that goes high at idle_at
+
+    Edge waits sleep until the edge or their timeout, and raise like the kernel
+    refusing edge detection when edges is False
+    """
+
+    RISING = 31
+
+    def __init__(self, idle_at: float, edges: bool = True):
+        self.idle_at = idle_at
+        self.edges = edges
+        self.edge_timeouts = []
+        self.reads = 0
+
+    def input(self, _pin) -> int:
+        """
+        Low while busy
+        """
+        self.reads += 1
+        return int(time.monotonic() >= self.idle_at)
+
+    def wait_for_edge(self, pin, edge, timeout):
+        """
+        Sleep until the pin rises, or for timeout milliseconds
+        """
+        assert edge == self.RISING
+        if not self.edges:
+            raise RuntimeError("Failed to add edge detection")
+        self.edge_timeouts.append(timeout)
+        wake_at = min(self.idle_at, time.monotonic() + timeout / 1000)
+        time.sleep(max(wake_at - time.monotonic(), 0))
+        return pin if time.monotonic() >= self.idle_at else None
+
+
+@pytest.fixture(name="raspberry_pi")
+def fixture_raspberry_pi(monkeypatch):
+    """
+    Make a RaspberryPi backend on a FakeGPIO
+    """
+
+    def make(gpio: FakeGPIO) -> epdconfig.RaspberryPi:
+        rpi = types.ModuleType("RPi")
+        rpi.GPIO = gpio
+        monkeypatch.setitem(sys.modules, "RPi", rpi)
+        monkeypatch.setitem(sys.modules, "RPi.GPIO", gpio)
+        return epdconfig.RaspberryPi()
+
+    return make
+
+
+def test_poll_until_idle_measures_busy_time():
+    """
+    Polling backs off until the pin goes high and returns how long it took
+    """
+    idle_at = time.monotonic() + 0.05
+    reads = []
+
+    def read():
+        reads.append(None)
+        return int(time.monotonic() >= idle_at)
+
+    busy_ms = poll_until_idle(read, timeout_ms=1000)
+
+    assert busy_ms >= 50
+    # Backing off, rather than spinning, keeps the number of reads small
+    assert len(reads) < 20
+
+
+def test_poll_until_idle_times_out():
+    """
+    A panel that never becomes idle raises instead of hanging
+    """
+    status_commands = []
+
+    with pytest.raises(BusyTimeoutError):
+        poll_until_idle(lambda: 0, 30, lambda: status_commands.append(0x71))
+
+    assert status_commands
+
+
+def test_wait_until_idle_sleeps_on_the_edge(raspberry_pi):
+    """
+    The wait sleeps in edge waits of at most a slice, rather than polling
+    """
+    gpio = FakeGPIO(time.monotonic() + 0.25)
+    backend = raspberry_pi(gpio)
+    status_commands = []
+
+    busy_ms = backend.wait_until_idle(
+        backend.BUSY_PIN, 1000, lambda: status_commands.append(0x71)
+    )
+
+    assert busy_ms >= 250
+    assert backend.edge_detection
+    assert 2 <= len(gpio.edge_timeouts) <= 4
+    assert max(gpio.edge_timeouts) <= epdconfig.EDGE_SLICE_MS + 1
+    assert gpio.reads == len(gpio.edge_timeouts) + 1
+    assert status_commands == [0x71]
+
+
+def test_wait_until_idle_falls_back_to_polling(raspberry_pi):
+    """
+    When edge detection is refused the wait polls, and keeps polling after
+    """
+    gpio = FakeGPIO(time.monotonic() + 0.05, edges=False)
+    backend = raspberry_pi(gpio)
+
+    busy_ms = backend.wait_until_idle(backend.BUSY_PIN, 1000)
+
+    assert busy_ms >= 50
+    assert not backend.edge_detection
+
+    gpio.idle_at = time.monotonic() + 0.05
+    gpio.edges = True
+    backend.wait_until_idle(backend.BUSY_PIN, 1000)
+    assert not gpio.edge_timeouts
+
+
+def test_wait_until_idle_times_out(raspberry_pi):
+    """
+    A panel that never becomes idle raises, and the last slice ends at the timeout
+    """
+    gpio = FakeGPIO(float("inf"))
+    backend = raspberry_pi(gpio)
+
+    start = time.monotonic()
+    with pytest.raises(BusyTimeoutError):
+        backend.wait_until_idle(backend.BUSY_PIN, 250)
+
+    assert 0.25 <= time.monotonic() - start < 1
+    assert max(gpio.edge_timeouts) <= epdconfig.EDGE_SLICE_MS + 1
+    assert gpio.edge_timeouts[-1] < epdconfig.EDGE_SLICE_MS
@@ -0,0 +1,86 @@
+"""
+Frame Packing Tests
+"""
+from PIL import Image, ImageDraw
+
+from waveshare_epd.frame import (
+    EPD_WIDTH,
+    EPD_HEIGHT,
+    Region,
+    blank_frame,
+    dirty_regions,
+    pack_frame,
+)
+
+
+def legacy_getbuffer(image: Image.Image) -> bytes:
+    """
+    The per-byte implementation pack_frame replaced
+    """
+    if image.size == (EPD_WIDTH, EPD_HEIGHT):
+        image = image.convert("1")
+    else:
+        image = image.rotate(90, expand=True).convert("1")
+    return bytes(val ^ 0xFF for val in image.tobytes("raw"))
+
+
+def sample_image(mode: str = "L") -> Image.Image:
+    """
+    Image with some text and a gradient so dithering is exercised
+    """
+    image = Image.linear_gradient("L").resize((EPD_WIDTH, EPD_HEIGHT))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((10, 10, 200, 100), fill=0)
+    draw.text((300, 200), "12:34", fill=255)
+    return image.convert(mode)
+
+
+def test_pack_frame_matches_legacy():
+    """
+    Every input mode gives the same bytes as the old getbuffer
+    """
+    for mode in ("L", "RGB", "1"):
+        image = sample_image(mode)
+        assert pack_frame(image) == legacy_getbuffer(image)
+
+
+def test_pack_frame_portrait():
+    """
+    Portrait images are rotated into landscape
+    """
+    image = sample_image("L").rotate(90, expand=True)
+    frame = pack_frame(image)
+    assert len(frame) == EPD_WIDTH // 8 * EPD_HEIGHT
+    assert frame == legacy_getbuffer(image)
+
+
+def test_pack_frame_white_is_zero():
+    """
+    The panel convention is 0 for white and 1 for black
+    """
+    assert pack_frame(Image.new("1", (EPD_WIDTH, EPD_HEIGHT), 255)) == blank_frame()
+    assert set(pack_frame(Image.new("L", (EPD_WIDTH, EPD_HEIGHT), 0))) == {0xFF}
+
+
+def test_pack_frame_wrong_size():
+    """
+    Wrong dimensions give a blank frame
+    """
+    assert pack_frame(Image.new("L", (100, 100))) == blank_frame()
+
+
+def test_dirty_regions():
+    """
+    Changed bytes are grouped into byte aligned regions per band of rows
+    """
+    old = blank_frame()
+    new = bytearray(old)
+    row_bytes = EPD_WIDTH // 8
+    new[10 * row_bytes + 2] = 0x01
+    new[14 * row_bytes + 5] = 0x80
+    new[300 * row_bytes + 50] = 0xFF
+
+    regions = dirty_regions(old, bytes(new))
+
+    assert regions == [Region(16, 10, 48, 15), Region(400, 300, 408, 301)]
+    assert dirty_regions(old, old) == []
@@ -0,0 +1,60 @@
+"""
+Test the panel power manager
+"""
+import time
+
+from waveshare_epd.epd7in5_V2 import EPD
+from waveshare_epd.frame import blank_frame
+from waveshare_epd.power import PanelPowerManager
+
+
+class CountingEPD(EPD):
+    """
+    Counts how often the panel is initialised and put to sleep
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.inits = 0
+
+    def init(self) -> int:
+        """
+        Count full initialisations
+        """
+        self.inits += 1
+        return super().init()
+
+
+def test_panel_stays_awake_between_frames():
+    """
+    Frequent frames initialise the panel once, it sleeps after the idle timeout
+    """
+    epd = CountingEPD()
+    panel = PanelPowerManager(epd, idle_timeout=0.2, awake_hours=(0, 24))
+
+    panel.display(blank_frame())
+    panel.display(bytes([0xFF]) * len(blank_frame()))
+    assert panel.awake
+    assert (epd.inits, panel.sleeps) == (1, 0)
+
+    time.sleep(0.4)
+    assert not panel.awake
+    assert panel.sleeps == 1
+
+    panel.display(blank_frame())
+    assert panel.awake
+    assert epd.inits == 2
+    panel.sleep()
+
+
+def test_panel_sleeps_outside_awake_hours():
+    """
+    Outside the awake hours the panel sleeps straight after each frame
+    """
+    epd = CountingEPD()
+    panel = PanelPowerManager(epd, idle_timeout=60, awake_hours=(0, 0))
+
+    panel.display(blank_frame())
+
+    assert not panel.awake
+    assert panel.sleeps == 1
@@ -0,0 +1,60 @@
+"""
+Test the simulated panel
+"""
+from waveshare_epd.epd7in5_V2 import EPD, RefreshPolicy
+from waveshare_epd.frame import EPD_WIDTH, blank_frame, pack_frame
+from waveshare_epd.simulator import SimulatedPanel
+
+
+def frame_with_block(value: int) -> bytes:
+    """
+    A blank frame with a few changed bytes
+    """
+    frame = bytearray(blank_frame())
+    for row in range(100, 110):
+        frame[row * (EPD_WIDTH // 8) + 20] = value
+    return bytes(frame)
+
+
+def test_simulated_refreshes(tmp_path):
+    """
+    The simulated panel shows what the driver sent and models each kind of refresh
+    """
+    panel = SimulatedPanel(time_scale=0.001)
+    epd = EPD(RefreshPolicy(full_refresh_every=5), backend=panel)
+
+    epd.refresh(frame_with_block(0xFF))
+    assert panel.displayed == frame_with_block(0xFF)
+    assert panel.refreshes == {"full": 1, "fast": 0, "partial": 0}
+    assert epd.last_busy_ms > 0
+
+    epd.refresh(frame_with_block(0x0F))
+    assert panel.displayed == frame_with_block(0x0F)
+    assert panel.refreshes == {"full": 1, "fast": 0, "partial": 1}
+    assert panel.busy_ms >= panel.latency_ms["full"] + panel.latency_ms["partial"]
+
+    path = tmp_path / "panel.png"
+    panel.save_png(str(path))
+    assert pack_frame(panel.image()) == frame_with_block(0x0F)
+    assert path.exists()
+
+
+def test_simulated_deep_sleep():
+    """
+    The panel ignores writes in deep sleep until it is reset by init
+    """
+    panel = SimulatedPanel(time_scale=0.001)
+    epd = EPD(backend=panel)
+
+    epd.refresh(frame_with_block(0xFF))
+    epd.sleep()
+    assert panel.asleep
+
+    epd.display(blank_frame())
+    assert panel.displayed == frame_with_block(0xFF)
+
+    epd.init()
+    epd.display(blank_frame())
+    assert not panel.asleep
+    assert panel.displayed == blank_frame()
+    assert panel.counters()["spi_transactions"] > 0
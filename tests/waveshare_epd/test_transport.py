@@ -0,0 +1,88 @@
+"""
+Test the frame transport encodings
+"""
+import pytest
+
+from waveshare_epd import transport
+from waveshare_epd.frame import blank_frame, frame_size
+
+
+def dashboard_frame(changed_row: int = 0) -> bytes:
+    """
+    A mostly white frame with some black rows, like a dashboard
+    """
+    frame = bytearray(blank_frame())
+    for row in (10, 200, 300 + changed_row):
+        frame[row * 100 : row * 100 + 60] = bytes(range(60))
+    return bytes(frame)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"a", b"aaa", b"abc" * 100, bytes(1000), bytes(range(256)) * 3],
+)
+def test_rle_round_trip(data):
+    """
+    RLE decodes back to the original for runs and literals of any length
+    """
+    assert transport.rle_decode(transport.rle_encode(data), len(data)) == data
+
+
+def test_smallest_encoding_is_used():
+    """
+    A delta against the acknowledged frame is much smaller than the frame
+    """
+    base, frame = dashboard_frame(), dashboard_frame(changed_row=1)
+
+    encoded = transport.encode_frame(frame, base, transport.ENCODINGS)
+
+    assert encoded.headers[transport.ENCODING_HEADER].startswith("xor-")
+    assert len(encoded.body) < frame_size() // 100
+    assert transport.decode_frame(encoded.body, encoded.headers, base) == frame
+
+
+@pytest.mark.parametrize("encoding", transport.ENCODINGS)
+def test_every_encoding_round_trips(encoding):
+    """
+    Each encoding decodes back to the frame
+    """
+    base, frame = dashboard_frame(), dashboard_frame(changed_row=1)
+
+    encoded = transport.encode_frame(frame, base, (encoding,))
+
+    assert encoded.headers[transport.ENCODING_HEADER] == encoding
+    assert transport.decode_frame(encoded.body, encoded.headers, base) == frame
+
+
+def test_delta_against_other_base_is_rejected():
+    """
+    A delta can only be applied to the base frame it was made against
+    """
+    encoded = transport.encode_frame(
+        dashboard_frame(1), dashboard_frame(), ("xor-zlib",)
+    )
+
+    with pytest.raises(transport.BaseFrameMismatch):
+        transport.decode_frame(encoded.body, encoded.headers, dashboard_frame(2))
+    with pytest.raises(transport.BaseFrameMismatch):
+        transport.decode_frame(encoded.body, encoded.headers, None)
+
+
+def test_oversized_frame_is_rejected():
+    """
+    A compressed body can't expand past the size of a frame
+    """
+    encoded = transport.encode_frame(bytes(frame_size() * 2), None, ("zlib",))
+
+    with pytest.raises(transport.FrameFormatError):
+        transport.decode_frame(encoded.body, encoded.headers)
+
+
+def test_unversioned_body_is_raw():
+    """
+    Clients that don't send the version header send raw frames
+    """
+    frame = dashboard_frame()
+
+    assert transport.decode_frame(frame, {}) == frame
+    assert transport.parse_accepted(None) == ("raw",)
@@ -0,0 +1,92 @@
+"""
+Asyncio facade over the EPD driver
+
+The driver blocks on SPI transfers, BUSY waits and the fixed delays in init
+and sleep. Every call is run in a dedicated single thread executor, which
+also keeps a single writer on the SPI bus, so the event loop only awaits.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from .power import PanelPowerManager
+
+
+class AsyncEPD:
+    """
+    Awaitable panel operations
+
+    `await epd.display(frame)` returns once the refresh has finished,
+    `await epd.wait_idle()` once every operation started so far has finished.
+    """
+
+    def __init__(self, panel: PanelPowerManager):
+        self.panel = panel
+        self._executor: ThreadPoolExecutor | None = None
+        self._running = 0
+        self._loop = None
+        self._idle: asyncio.Event | None = None
+
+    def _idle_event(self) -> asyncio.Event:
+        """
+        Set while no operation is running, created in the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Events can't be shared between event loops
+            self._loop = loop
+            self._idle = asyncio.Event()
+            self._idle.set()
+        return self._idle
+
+    async def _run(self, function: Callable[..., Any], *args) -> Any:
+        """
+        Run a blocking driver call in the panel's executor
+        """
+        idle = self._idle_event()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="epd")
+        self._running += 1
+        idle.clear()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args
+            )
+        finally:
+            self._running -= 1
+            if self._running == 0:
+                idle.set()
+
+    @property
+    def busy(self) -> bool:
+        """
+        Whether an operation is running or waiting to run
+        """
+        return self._running > 0
+
+    async def display(self, frame: bytes):
+        """
+        Refresh the panel with a packed frame, initialising it if it is asleep
+        """
+        await self._run(self.panel.display, frame)
+
+    async def sleep(self):
+        """
+        Put the panel into deep sleep
+        """
+        await self._run(self.panel.sleep)
+
+    async def wait_idle(self):
+        """
+        Wait for every operation started so far to finish
+        """
+        await self._idle_event().wait()
+
+    def close(self):
+        """
+        Stop the executor once the running operation has finished
+        A new one is started by the next operation
+        """
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -31,32 +31,54 @@ Modified epd7in5 from waveshare
 #
 
 
-import os
 import structlog
 from PIL import Image
 
+from .epdconfig import BUSY_TIMEOUT_MS, create_backend
+from .frame import EPD_WIDTH, EPD_HEIGHT, Region, dirty_regions, pack_frame
+
 
 log = structlog.getLogger()
-# Display resolution
-EPD_WIDTH = 800
-EPD_HEIGHT = 480
+
+
+class RefreshPolicy:
+    """
+    Decides when a partial refresh can be used instead of a full one
+
+    Partial refreshes leave ghosting behind, so a full refresh is forced after
+    `full_refresh_every` partial refreshes, or when more than
+    `max_partial_fraction` of the panel has changed.
+    """
+
+    def __init__(self, full_refresh_every: int = 10, max_partial_fraction: float = 0.5):
+        self.full_refresh_every = full_refresh_every
+        self.max_partial_fraction = max_partial_fraction
+
+    def use_partial(self, partial_count: int, changed_fraction: float) -> bool:
+        """
+        Whether the next refresh can be partial
+        """
+        return (
+            partial_count < self.full_refresh_every
+            and changed_fraction <= self.max_partial_fraction
+        )
 
 
 class EPD:
     """
     E-ink paper display handling class
     Supports running as dummy class when not on a raspberry pi
-    """
 
-    def __init__(self):
-        if os.path.exists("/sys/bus/platform/drivers/gpiomem-bcm2835"):
-            from .epdconfig import RaspberryPi  # pylint: disable=C0415
-
-            self.epdconfig = RaspberryPi()
-        else:
-            from .epdconfig import Dummy  # pylint: disable=C0415
+    Args:
+        policy: When to use partial refreshes
+        backend: A backend instance, or the name of one for
+            `epdconfig.create_backend`. Picked from the environment if not given.
+    """
 
-            self.epdconfig = Dummy()
+    def __init__(self, policy: RefreshPolicy | None = None, backend=None):
+        if backend is None or isinstance(backend, str):
+            backend = create_backend(backend)
+        self.epdconfig = backend
 
         self.reset_pin = self.epdconfig.RST_PIN
         self.dc_pin = self.epdconfig.DC_PIN
@@ -65,6 +87,16 @@ class EPD:
         self.width = EPD_WIDTH
         self.height = EPD_HEIGHT
 
+        self.policy = policy or RefreshPolicy()
+        # "full" or "partial" once initialised, None when asleep
+        self.mode: str | None = None
+        # The frame currently on the panel and partial refreshes since the last full one
+        self.previous_frame: bytes | None = None
+        self.partial_count = 0
+        # Milliseconds spent waiting on BUSY, by the last wait and by the last refresh
+        self.last_busy_ms: float | None = None
+        self.refresh_busy_ms = 0.0
+
     # fmt: off
     Voltage_Frame_7IN5_V2 = [
 	0x6, 0x3F, 0x3F, 0x11, 0x24, 0x7, 0x17,
@@ -154,7 +186,7 @@ class EPD:
         self.epdconfig.spi_writebyte([data])
         self.epdconfig.digital_write(self.cs_pin, 1)
 
-    def send_data2(self, data: bytearray | list[int]):
+    def send_data2(self, data: bytes | bytearray | list[int]):
         """
         Sends data to the e-paper display using the spi_writebyte2 method.
         """
@@ -163,25 +195,48 @@ class EPD:
         self.epdconfig.spi_writebyte2(data)
         self.epdconfig.digital_write(self.cs_pin, 1)
 
-    def read_busy(self):
+    def send_command_with_data(
+        self, command: int, payload: bytes | bytearray | list[int] = b""
+    ):
+        """
+        Sends a command followed by its data in a single CS assertion.
+
+        The payload is streamed with one spi_writebyte2 call, rather than
+        toggling DC and CS and making a separate SPI transfer for every byte.
+        """
+        self.epdconfig.digital_write(self.dc_pin, 0)
+        self.epdconfig.digital_write(self.cs_pin, 0)
+        self.epdconfig.spi_writebyte([command])
+        if payload:
+            self.epdconfig.digital_write(self.dc_pin, 1)
+            self.epdconfig.spi_writebyte2(bytes(payload))
+        self.epdconfig.digital_write(self.cs_pin, 1)
+
+    def read_busy(self, timeout_ms: float = BUSY_TIMEOUT_MS) -> float:
         """
         Check the status of the e-Paper display and wait if it is busy.
 
-        This method repeatedly sends the "read status" command (0x71) to the display
-        and reads the BUSY_PIN to check if the display is busy.
-        Once the display is not busy, adds a delay of 20 milliseconds
+        Sends the "read status" command (0x71) and waits for the BUSY_PIN to go
+        high, sleeping on an edge interrupt or polling with backoff rather than
+        spinning. Once the display is not busy, adds a delay of 20 milliseconds
         to ensure the display is ready for the next operation.
 
         Note: This method will block the execution of the program
+
+        Returns:
+            float: Milliseconds the display was busy
+        Raises:
+            BusyTimeoutError: The display was still busy after timeout_ms
         """
         log.debug("e-Paper display busy")
-        self.send_command(0x71)
-        busy = self.epdconfig.digital_read(self.busy_pin)
-        while busy == 0:
-            self.send_command(0x71)
-            busy = self.epdconfig.digital_read(self.busy_pin)
+        busy_ms = self.epdconfig.wait_until_idle(
+            self.busy_pin, timeout_ms, lambda: self.send_command(0x71)
+        )
+        self.last_busy_ms = busy_ms
+        self.refresh_busy_ms += busy_ms
         self.epdconfig.delay_ms(20)
-        log.debug("e-Paper no longer busy")
+        log.debug("e-Paper no longer busy", busy_ms=round(busy_ms, 1))
+        return busy_ms
 
     def set_lut(
         self,
@@ -205,9 +260,7 @@ class EPD:
         lut_list = [lut_vcom, lut_ww, lut_bw, lut_wb, lut_bb]
 
         for command, lut in zip(command_list, lut_list):
-            self.send_command(command)
-            for count in lut:
-                self.send_data(count)
+            self.send_command_with_data(command, lut)
 
     def init(self) -> int:
         """
@@ -241,53 +294,35 @@ class EPD:
         # self.send_data(0x3f)		#VDH=15V
         # self.send_data(0x3f)		#VDL=-15V
 
-        self.send_command(0x01)  # power setting
-        self.send_data(0x17)  # 1-0=11: internal power
-        self.send_data(self.Voltage_Frame_7IN5_V2[6])  # VGH&VGL
-        self.send_data(self.Voltage_Frame_7IN5_V2[1])  # VSH
-        self.send_data(self.Voltage_Frame_7IN5_V2[2])  # VSL
-        self.send_data(self.Voltage_Frame_7IN5_V2[3])  # VSHR
-
-        self.send_command(0x82)  # VCOM DC Setting
-        self.send_data(self.Voltage_Frame_7IN5_V2[4])  # VCOM
-
-        self.send_command(0x06)  # Booster Setting
-        self.send_data(0x27)
-        self.send_data(0x27)
-        self.send_data(0x2F)
-        self.send_data(0x17)
-
-        self.send_command(0x30)  # OSC Setting
-        self.send_data(self.Voltage_Frame_7IN5_V2[0])  # 3C=50Hz, 3A=100HZ
+        voltage = self.Voltage_Frame_7IN5_V2
+        self.send_command_with_data(
+            0x01,  # power setting
+            [
+                0x17,  # 1-0=11: internal power
+                voltage[6],  # VGH&VGL
+                voltage[1],  # VSH
+                voltage[2],  # VSL
+                voltage[3],  # VSHR
+            ],
+        )
+        self.send_command_with_data(0x82, [voltage[4]])  # VCOM DC Setting
+        self.send_command_with_data(0x06, [0x27, 0x27, 0x2F, 0x17])  # Booster Setting
+        self.send_command_with_data(0x30, [voltage[0]])  # OSC 3C=50Hz, 3A=100HZ
 
         self.send_command(0x04)  # POWER ON
         self.epdconfig.delay_ms(100)
         self.read_busy()
 
-        self.send_command(0x00)  # PANNEL SETTING
-        self.send_data(0x3F)  # KW-3f KWR-2F BWROTP-0f BWOTP-1f
-
-        self.send_command(0x61)  # tres
-        self.send_data(0x03)  # source 800
-        self.send_data(0x20)
-        self.send_data(0x01)  # gate 480
-        self.send_data(0xE0)
-
-        self.send_command(0x15)
-        self.send_data(0x00)
-
-        self.send_command(0x50)  # VCOM AND DATA INTERVAL SETTING
-        self.send_data(0x10)
-        self.send_data(0x07)
-
-        self.send_command(0x60)  # TCON SETTING
-        self.send_data(0x22)
-
-        self.send_command(0x65)  # Resolution setting
-        self.send_data(0x00)
-        self.send_data(0x00)  # 800*480
-        self.send_data(0x00)
-        self.send_data(0x00)
+        # PANNEL SETTING KW-3f KWR-2F BWROTP-0f BWOTP-1f
+        self.send_command_with_data(0x00, [0x3F])
+        # tres: source 800, gate 480
+        self.send_command_with_data(0x61, [0x03, 0x20, 0x01, 0xE0])
+        self.send_command_with_data(0x15, [0x00])
+        # VCOM AND DATA INTERVAL SETTING
+        self.send_command_with_data(0x50, [0x10, 0x07])
+        self.send_command_with_data(0x60, [0x22])  # TCON SETTING
+        # Resolution setting 800*480
+        self.send_command_with_data(0x65, [0x00, 0x00, 0x00, 0x00])
 
         self.set_lut(
             self.LUT_VCOM_7IN5_V2,
@@ -296,72 +331,147 @@ class EPD:
             self.LUT_WB_7IN5_V2,
             self.LUT_BB_7IN5_V2,
         )
+        self.mode = "full"
+        return 0
+
+    def init_part(self) -> int:
+        """
+        Initializes the e-paper display for partial refreshes.
+
+        Uses the panel's built in waveform, selected by forcing the temperature,
+        rather than the lookup tables set by `init`.
+
+        If the module initialization fails, it returns -1.
+        """
+        if self.epdconfig.module_init() != 0:
+            return -1
+        self.reset()
+
+        self.send_command_with_data(0x00, [0x1F])  # PANNEL SETTING, LUT from OTP
+
+        self.send_command(0x04)  # POWER ON
+        self.epdconfig.delay_ms(100)
+        self.read_busy()
+
+        self.send_command_with_data(0xE0, [0x02])  # Cascade setting
+        # Force temperature, selects the fast waveform
+        self.send_command_with_data(0xE5, [0x6E])
+        # VCOM AND DATA INTERVAL SETTING
+        # new data is copied to old data after a refresh
+        self.send_command_with_data(0x50, [0xA9, 0x07])
+        self.mode = "partial"
         return 0
 
-    def getbuffer(self, image: Image) -> bytearray:
+    def getbuffer(self, image: Image) -> bytes:
         """
-        Processes PIL Image and returns a bytearray that represents the image data
+        Processes PIL Image and returns the bytes that represent the image data
         The image is converted to monochrome and rotated if necessary
         If dimensions are incorrect, a warning is logged and a blank buffer is returned
 
+        See `waveshare_epd.frame.pack_frame`, which does not need a driver instance
+
         Args:
             image (PIL.Image.Image): The image to process. It should match the width and
             height expected by the display.
 
         Returns:
-            bytearray: A bytearray representing the image data. In this array, 0
-            represents white and 1 represents black, following the e-paper display convention.
+            bytes: The packed image data. In this array, 0 represents white and
+            1 represents black, following the e-paper display convention.
             If the input image does not have the correct dimensions, a blank buffer is returned.
+        """
+        return pack_frame(image, self.width, self.height)
 
-        Raises:
-            If the input is not a valid PIL Image, a TypeError may be raised
-            when the function tries to access the `size` attribute or
-            call the `convert` or `rotate` methods.
-        """
-        imwidth, imheight = image.size
-        if imwidth == self.width and imheight == self.height:
-            image = image.convert("1")
-        elif imwidth == self.height and imheight == self.width:
-            # image has correct dimensions, but needs to be rotated
-            image = image.rotate(90, expand=True).convert("1")
-        else:
-            log.warning(
-                "Incorrect image dimensions, returning blank buffer",
-                expected_x=self.width,
-                expected_y=self.height,
-                actual_x=imwidth,
-                actual_y=imheight,
-            )
-            # return a blank buffer
-            return [0x00] * (int(self.width / 8) * self.height)
-
-        buf = bytearray(image.tobytes("raw"))
-        # The bytes need to be inverted,
-        # PIL Image:   1=white and 0=black
-        # e-paper  :   0=white and 1=black
-        buf = bytearray(val ^ 0xFF for val in buf)
-        return buf
-
-    def display(self, image: bytearray):
+    def display(self, image: bytes | bytearray):
         """
         Sends an image to the e-paper display.
         """
-        self.send_command(0x13)
-        self.send_data2(image)
+        self.send_command_with_data(0x13, image)
+
+        self.send_command(0x12)
+        self.epdconfig.delay_ms(100)
+        self.read_busy()
+
+    def display_partial(self, old_frame: bytes, new_frame: bytes, region: Region):
+        """
+        Refresh a single region of the display, which must be initialised with init_part
+
+        Both the old and new window contents are written, so the result does not
+        depend on what the panel RAM held before deep sleep.
+        """
+        row_bytes = self.width // 8
+        first, end = region.x_start // 8, region.x_end // 8
+        old_view, new_view = memoryview(old_frame), memoryview(new_frame)
+        rows = range(region.y_start * row_bytes, region.y_end * row_bytes, row_bytes)
+        old_window = b"".join(old_view[row + first : row + end] for row in rows)
+        new_window = b"".join(new_view[row + first : row + end] for row in rows)
+
+        self.send_command(0x91)  # Enter partial mode
+        window = []
+        for value in (
+            region.x_start,
+            region.x_end - 1,
+            region.y_start,
+            region.y_end - 1,
+        ):
+            window += [value >> 8, value & 0xFF]
+        window.append(0x01)  # Gates scan inside and outside the window
+        self.send_command_with_data(0x90, window)  # Partial window
+
+        self.send_command_with_data(0x10, old_window)
+        self.send_command_with_data(0x13, new_window)
 
         self.send_command(0x12)
         self.epdconfig.delay_ms(100)
         self.read_busy()
+        self.send_command(0x92)  # Leave partial mode
+
+    def refresh(self, frame: bytes):
+        """
+        Display a packed frame, only refreshing the changed regions where possible
+
+        Initialises the display in the mode it needs, so there is no need to call
+        init first. Falls back to a full refresh for the first frame, when
+        the policy forces one, or when too much of the panel has changed.
+        """
+        self.refresh_busy_ms = 0.0
+        if self.previous_frame is None:
+            regions = None
+        else:
+            regions = dirty_regions(self.previous_frame, frame, self.width, self.height)
+            if not regions:
+                log.info("Frame unchanged, not refreshing")
+                return
+
+        changed_fraction = (
+            1.0
+            if regions is None
+            else sum(region.area for region in regions) / (self.width * self.height)
+        )
+        if regions is not None and self.policy.use_partial(
+            self.partial_count, changed_fraction
+        ):
+            log.info("Partial refresh", regions=regions, fraction=changed_fraction)
+            if self.mode != "partial":
+                self.init_part()
+            for region in regions:
+                self.display_partial(self.previous_frame, frame, region)
+            self.partial_count += 1
+        else:
+            log.info("Full refresh", partial_count=self.partial_count)
+            if self.mode != "full":
+                self.init()
+            self.display(frame)
+            self.partial_count = 0
+        self.previous_frame = bytes(frame)
+        log.info("Refresh complete", busy_ms=round(self.refresh_busy_ms, 1))
 
     def clear(self):
         """
         Clears the e-paper display by setting all pixels to white
         """
-        buf = [0x00] * (int(self.width / 8) * self.height)
-        self.send_command(0x10)
-        self.send_data2(buf)
-        self.send_command(0x13)
-        self.send_data2(buf)
+        buf = bytes(int(self.width / 8) * self.height)
+        self.send_command_with_data(0x10, buf)
+        self.send_command_with_data(0x13, buf)
         self.send_command(0x12)
         self.epdconfig.delay_ms(100)
         self.read_busy()
@@ -373,8 +483,8 @@ class EPD:
         self.send_command(0x02)  # POWER_OFF
         self.read_busy()
 
-        self.send_command(0x07)  # DEEP_SLEEP
-        self.send_data(0xA5)
+        self.send_command_with_data(0x07, [0xA5])  # DEEP_SLEEP
 
         self.epdconfig.delay_ms(2000)
         self.epdconfig.module_exit()
+        self.mode = None
@@ -33,12 +33,58 @@ Waveshare's EPD config file
 import os
 import sys
 import time
+from typing import Callable
+
 import structlog
 import spidev
 
 
 log = structlog.getLogger()
 
+# A full refresh takes around 4s, a panel still busy after this is wedged
+BUSY_TIMEOUT_MS = 30_000
+# Polling interval starts at the first value and doubles up to the second
+POLL_INTERVAL_MS = (1, 50)
+# Edge waits are done in slices, so an edge missed between reading the pin
+# and starting the wait only costs one slice
+EDGE_SLICE_MS = 100
+
+
+class BusyTimeoutError(TimeoutError):
+    """
+    The panel stayed busy for longer than the timeout
+    """
+
+
+def poll_until_idle(
+    read: Callable[[], int | None],
+    timeout_ms: float = BUSY_TIMEOUT_MS,
+    before_read: Callable[[], None] | None = None,
+) -> float:
+    """
+    Poll the BUSY pin with backoff until it goes high
+
+    Args:
+        read: Reads the BUSY pin, 0 while the panel is busy
+        timeout_ms: Raise BusyTimeoutError if still busy after this long
+        before_read: Called before each read, e.g. to send the get status command
+
+    Returns:
+        float: Milliseconds the panel was busy
+    """
+    start = time.monotonic()
+    interval_ms = POLL_INTERVAL_MS[0]
+    while True:
+        if before_read is not None:
+            before_read()
+        if read() != 0:
+            return (time.monotonic() - start) * 1000
+        elapsed_ms = (time.monotonic() - start) * 1000
+        if elapsed_ms > timeout_ms:
+            raise BusyTimeoutError(f"Panel still busy after {elapsed_ms:.0f}ms")
+        time.sleep(min(interval_ms, timeout_ms - elapsed_ms) / 1000)
+        interval_ms = min(interval_ms * 2, POLL_INTERVAL_MS[1])
+
 
 class RaspberryPi:
     """ "
@@ -66,6 +112,8 @@ class RaspberryPi:
         GPIO.OUT: callable
         self.GPIO = GPIO  # pylint: disable=C0103
         self.SPI = spidev.SpiDev()  # pylint: disable=C0103
+        # Cleared if the kernel refuses edge detection, polling is used instead
+        self.edge_detection = True
 
     def digital_write(self, pin: int, value: int):
         """
@@ -85,6 +133,50 @@ class RaspberryPi:
         """
         time.sleep(delaytime / 1000.0)
 
+    def wait_until_idle(
+        self,
+        pin: int,
+        timeout_ms: float = BUSY_TIMEOUT_MS,
+        before_read: Callable[[], None] | None = None,
+    ) -> float:
+        """
+        Wait for the BUSY pin to go high without spinning the CPU
+
+        Sleeps on a rising edge interrupt, falling back to polling with backoff
+        where edge detection is unavailable
+
+        Returns:
+            float: Milliseconds the panel was busy
+        Raises:
+            BusyTimeoutError: Still busy after timeout_ms
+        """
+        if not self.edge_detection:
+            return poll_until_idle(
+                lambda: self.digital_read(pin), timeout_ms, before_read
+            )
+        start = time.monotonic()
+        if before_read is not None:
+            before_read()
+        while self.digital_read(pin) == 0:
+            elapsed_ms = (time.monotonic() - start) * 1000
+            if elapsed_ms > timeout_ms:
+                raise BusyTimeoutError(f"Panel still busy after {elapsed_ms:.0f}ms")
+            try:
+                self.GPIO.wait_for_edge(
+                    pin,
+                    self.GPIO.RISING,
+                    timeout=int(min(EDGE_SLICE_MS, timeout_ms - elapsed_ms)) + 1,
+                )
+            except RuntimeError:
+                log.warning("GPIO edge detection unavailable, polling BUSY instead")
+                self.edge_detection = False
+                return (time.monotonic() - start) * 1000 + poll_until_idle(
+                    lambda: self.digital_read(pin),
+                    timeout_ms - (time.monotonic() - start) * 1000,
+                    before_read,
+                )
+        return (time.monotonic() - start) * 1000
+
     def spi_writebyte(self, data: bytes):
         """
         Write a list of values to SPI device
@@ -143,7 +235,8 @@ class RaspberryPi:
 
 class Dummy:
     """
-    Does Nothing
+    Does nothing with the hardware
+    Counts GPIO writes and SPI transactions, so driver changes can be measured
     """
 
     RST_PIN = 17
@@ -151,8 +244,14 @@ class Dummy:
     CS_PIN = 8
     BUSY_PIN = 24
 
+    def __init__(self):
+        self.gpio_writes = 0
+        self.spi_transactions = 0
+        self.spi_bytes = 0
+
     def digital_write(self, pin, value):
-        """Dummy"""
+        """Count the GPIO write"""
+        self.gpio_writes += 1
 
     def digital_read(self, pin):
         """Dummy"""
@@ -160,11 +259,19 @@ class Dummy:
     def delay_ms(self, delaytime):
         """Dummy"""
 
+    def wait_until_idle(self, pin, timeout_ms=BUSY_TIMEOUT_MS, before_read=None):
+        """Poll the dummy BUSY pin, which is never busy"""
+        return poll_until_idle(lambda: self.digital_read(pin), timeout_ms, before_read)
+
     def spi_writebyte(self, data):
-        """Dummy"""
+        """Count the SPI transaction"""
+        self.spi_transactions += 1
+        self.spi_bytes += len(data)
 
     def spi_writebyte2(self, data):
-        """Dummy"""
+        """Count the SPI transaction"""
+        self.spi_transactions += 1
+        self.spi_bytes += len(data)
 
     def module_init(self):
         """Dummy"""
@@ -174,11 +281,42 @@ class Dummy:
         """Dummy"""
         log.debug("spi end")
 
+    def counters(self) -> dict:
+        """
+        GPIO writes and SPI transactions so far
+        """
+        return {
+            "gpio_writes": self.gpio_writes,
+            "spi_transactions": self.spi_transactions,
+            "spi_bytes": self.spi_bytes,
+        }
+
 
-if os.path.exists("/sys/bus/platform/drivers/gpiomem-bcm2835"):
-    implementation = RaspberryPi()
-else:
-    implementation = Dummy()
+def create_backend(name: str | None = None):
+    """
+    Create a backend by name: raspberrypi, dummy or simulated
+
+    Defaults to EPD_BACKEND, then to raspberrypi when the GPIO driver
+    is present and dummy otherwise
+    """
+    name = name or os.environ.get("EPD_BACKEND")
+    if name is None:
+        if os.path.exists("/sys/bus/platform/drivers/gpiomem-bcm2835"):
+            name = "raspberrypi"
+        else:
+            name = "dummy"
+    if name == "raspberrypi":
+        return RaspberryPi()
+    if name == "dummy":
+        return Dummy()
+    if name == "simulated":
+        from .simulator import SimulatedPanel  # pylint: disable=C0415
+
+        return SimulatedPanel()
+    raise ValueError(f"Unknown EPD backend: {name}")
+
+
+implementation = create_backend()
 
 for func in [x for x in dir(implementation) if not x.startswith("_")]:
     setattr(sys.modules[__name__], func, getattr(implementation, func))
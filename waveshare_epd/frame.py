@@ -0,0 +1,196 @@
+"""
+Pack Pillow images into the frame buffer layout used by the 7.5" V2 panel
+
+Does not need a driver instance, so it can run on the API side
+before the frame is sent to the display server.
+"""
+import hashlib
+from typing import NamedTuple
+
+import structlog
+from PIL import Image
+
+log = structlog.getLogger()
+
+# Display resolution
+EPD_WIDTH = 800
+EPD_HEIGHT = 480
+
+
+def frame_size(width: int = EPD_WIDTH, height: int = EPD_HEIGHT) -> int:
+    """
+    Number of bytes in a packed 1bpp frame
+    """
+    return width // 8 * height
+
+
+def blank_frame(width: int = EPD_WIDTH, height: int = EPD_HEIGHT) -> bytes:
+    """
+    An all white frame
+    """
+    return bytes(frame_size(width, height))
+
+
+def pack_frame(
+    image: Image.Image, width: int = EPD_WIDTH, height: int = EPD_HEIGHT
+) -> bytes:
+    """
+    Convert a PIL Image of any mode into the panel's packed 1bpp layout
+
+    Portrait images are rotated into landscape. Non 1-bit images are converted
+    with Pillow's default dithering, the same as `EPD.getbuffer` always did.
+    The bits are packed and inverted in a single pass by Pillow's "1;I" raw
+    encoder, so the panel convention of 0=white and 1=black needs no extra loop.
+
+    Args:
+        image: The image to pack
+        width: Panel width in pixels
+        height: Panel height in pixels
+
+    Returns:
+        bytes: The packed frame, which can be written to SPI or sent as a
+        request body as is. If the image has the wrong dimensions a warning
+        is logged and a blank frame is returned.
+    """
+    imwidth, imheight = image.size
+    if (imwidth, imheight) == (height, width) and (width, height) != (height, width):
+        image = image.rotate(90, expand=True)
+    elif (imwidth, imheight) != (width, height):
+        log.warning(
+            "Incorrect image dimensions, returning blank buffer",
+            expected_x=width,
+            expected_y=height,
+            actual_x=imwidth,
+            actual_y=imheight,
+        )
+        return blank_frame(width, height)
+
+    if image.mode != "1":
+        image = image.convert("1")
+    return image.tobytes("raw", "1;I")
+
+
+class Region(NamedTuple):
+    """
+    A rectangle of the panel in pixels, with exclusive end coordinates
+    x coordinates are always multiples of 8 so the region is byte aligned
+    """
+
+    x_start: int
+    y_start: int
+    x_end: int
+    y_end: int
+
+    @property
+    def area(self) -> int:
+        """
+        Number of pixels in the region
+        """
+        return (self.x_end - self.x_start) * (self.y_end - self.y_start)
+
+
+def changed_byte_span(old_row: bytes, new_row: bytes) -> tuple[int, int]:
+    """
+    Index of the first changed byte and one past the last changed byte of a row
+    The rows are XORed as big integers so the scan happens in C
+    """
+    row_bytes = len(old_row)
+    diff = int.from_bytes(old_row, "big") ^ int.from_bytes(new_row, "big")
+    first = row_bytes - (diff.bit_length() + 7) // 8
+    last = row_bytes - 1 - ((diff & -diff).bit_length() - 1) // 8
+    return first, last + 1
+
+
+def dirty_regions(
+    old: bytes,
+    new: bytes,
+    width: int = EPD_WIDTH,
+    height: int = EPD_HEIGHT,
+    merge_gap: int = 8,
+) -> list[Region]:
+    """
+    Byte aligned bounding boxes of the parts of a frame that changed
+
+    Changed rows are grouped into horizontal bands, with bands closer than
+    `merge_gap` rows merged together, and each band gets the horizontal
+    extent of the bytes that changed within it.
+
+    Args:
+        old: The packed frame currently on the panel
+        new: The packed frame to display
+        width: Panel width in pixels
+        height: Panel height in pixels
+        merge_gap: Unchanged rows allowed inside a single region
+
+    Returns:
+        list[Region]: Changed regions from top to bottom, empty if nothing changed
+    """
+    if old == new:
+        return []
+    row_bytes = width // 8
+    old_view, new_view = memoryview(old), memoryview(new)
+    regions = []
+    band = None
+    for row in range(height):
+        start = row * row_bytes
+        old_row = old_view[start : start + row_bytes]
+        new_row = new_view[start : start + row_bytes]
+        if old_row == new_row:
+            continue
+        first, end = changed_byte_span(old_row, new_row)
+        if band is not None and row - band[1] <= merge_gap:
+            band = (band[0], row, min(band[2], first), max(band[3], end))
+        else:
+            if band is not None:
+                regions.append(Region(band[2] * 8, band[0], band[3] * 8, band[1] + 1))
+            band = (row, row, first, end)
+    regions.append(Region(band[2] * 8, band[0], band[3] * 8, band[1] + 1))
+    return regions
+
+
+def frame_hash(frame: bytes) -> str:
+    """
+    Content hash of a packed frame
+    """
+    return hashlib.blake2b(frame, digest_size=16).hexdigest()
+
+
+class FrameDeduplicator:
+    """
+    Remembers the last frame that was displayed, which is also the base
+    for delta transport, and counts how many frames were skipped for being unchanged
+    """
+
+    def __init__(self):
+        self.last_hash: str | None = None
+        self.last_frame: bytes | None = None
+        self.skipped = 0
+        self.displayed = 0
+
+    def is_duplicate(self, current_hash: str) -> bool:
+        """
+        Check a frame against the last displayed one, counting it if it is skipped
+        """
+        if current_hash == self.last_hash:
+            self.skipped += 1
+            log.info("Frame unchanged, skipping", frame_hash=current_hash)
+            return True
+        return False
+
+    def mark_displayed(self, current_hash: str, frame: bytes | None = None):
+        """
+        Record that a frame has been displayed
+        """
+        self.last_hash = current_hash
+        self.last_frame = frame
+        self.displayed += 1
+
+    def stats(self) -> dict:
+        """
+        Counters for frames skipped and displayed
+        """
+        return {
+            "frames_skipped": self.skipped,
+            "frames_displayed": self.displayed,
+            "last_frame_hash": self.last_hash,
+        }
@@ -0,0 +1,122 @@
+"""
+Keep the panel initialised between frequent updates
+
+Bringing the panel up (reset, voltages and LUTs) and putting it into deep sleep
+(a fixed 2s wait and closing SPI) takes longer than a partial refresh, so doing
+both for every frame wastes most of each update.
+"""
+import datetime
+import threading
+
+import structlog
+
+from .epd7in5_V2 import EPD
+
+log = structlog.getLogger()
+
+# Seconds without a frame before the panel is put into deep sleep
+IDLE_TIMEOUT = 180
+# Hours the dashboard is updated in, from the start up to but not including the end
+# The panel is kept awake between frames in them, outside them it sleeps after each
+AWAKE_HOURS = (6, 24)
+
+
+class PanelPowerManager:
+    """
+    Owns when the panel is initialised and when it deep sleeps
+
+    The panel is initialised lazily by the first frame and stays initialised,
+    with SPI open, while frames keep arriving. It goes into deep sleep once no
+    frame has arrived for `idle_timeout` seconds, or straight after a frame
+    outside `awake_hours`.
+    """
+
+    def __init__(
+        self,
+        epd: EPD,
+        idle_timeout: float = IDLE_TIMEOUT,
+        awake_hours: tuple[int, int] = AWAKE_HOURS,
+    ):
+        self.epd = epd
+        self.idle_timeout = idle_timeout
+        self.awake_hours = awake_hours
+        self.sleeps = 0
+        # Bumped for every frame, so a timer that fired during a refresh is ignored
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._timer: threading.Timer | None = None
+
+    @property
+    def awake(self) -> bool:
+        """
+        Whether the panel is initialised
+        """
+        return self.epd.mode is not None
+
+    def within_awake_hours(self) -> bool:
+        """
+        Whether it is worth keeping the panel awake for the next frame
+        """
+        return self.awake_hours[0] <= datetime.datetime.now().hour < self.awake_hours[1]
+
+    def _cancel_timer(self):
+        """
+        Stop the pending idle timer
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def display(self, frame: bytes):
+        """
+        Refresh the panel, initialising it if it is asleep
+        """
+        with self._lock:
+            self._cancel_timer()
+            self._generation += 1
+            try:
+                self.epd.refresh(frame)
+            except Exception:
+                # The panel state is unknown, so initialise it again next time
+                self.epd.mode = None
+                raise
+            if not self.within_awake_hours():
+                self.sleep()
+                return
+            self._timer = threading.Timer(
+                self.idle_timeout, self._on_idle, args=[self._generation]
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_idle(self, generation: int):
+        """
+        Called by the timer when no frame arrived within the idle timeout
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            log.info("Panel idle, sleeping", idle_timeout=self.idle_timeout)
+            self.sleep()
+
+    def sleep(self):
+        """
+        Put the panel into deep sleep, if it is awake
+        """
+        with self._lock:
+            self._cancel_timer()
+            if not self.awake:
+                return
+            log.info("Sending display to sleep")
+            self.epd.sleep()
+            self.sleeps += 1
+
+    def status(self) -> dict:
+        """
+        Power state of the panel
+        """
+        return {
+            "panel_awake": self.awake,
+            "panel_sleeps": self.sleeps,
+            "last_refresh_busy_ms": self.epd.refresh_busy_ms,
+        }
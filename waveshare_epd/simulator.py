@@ -0,0 +1,275 @@
+"""
+Simulated 7.5" V2 panel, for measuring the driver without hardware
+
+Decodes the command stream the driver sends, keeps the panel's old and new
+frame RAM, and holds BUSY low for as long as the real panel takes to refresh.
+Select it with `EPD(backend="simulated")` or EPD_BACKEND=simulated.
+"""
+import time
+
+import structlog
+from PIL import Image
+
+from .epdconfig import BUSY_TIMEOUT_MS, poll_until_idle
+from .frame import EPD_HEIGHT, EPD_WIDTH, blank_frame
+
+log = structlog.getLogger()
+
+# Milliseconds the panel stays busy, from the datasheet and measured refreshes
+LATENCY_MS = {
+    "full": 4000,  # LUTs from init
+    "fast": 1500,  # OTP waveform selected by forcing the temperature
+    "partial": 400,  # Inside a partial window
+    "power_on": 80,
+    "power_off": 40,
+}
+
+
+class SimulatedPanel:
+    """
+    A backend that behaves like the panel
+
+    Attributes:
+        old_ram: Frame RAM written by 0x10
+        new_ram: Frame RAM written by 0x13
+        displayed: What the panel currently shows
+        refreshes: Number of refreshes of each kind
+        time_scale: Multiplies every latency and delay, below 1 to run faster
+    """
+
+    RST_PIN = 17
+    DC_PIN = 25
+    CS_PIN = 8
+    BUSY_PIN = 24
+
+    def __init__(
+        self,
+        width: int = EPD_WIDTH,
+        height: int = EPD_HEIGHT,
+        time_scale: float = 1.0,
+        latency_ms: dict[str, float] | None = None,
+    ):
+        self.width = width
+        self.height = height
+        self.time_scale = time_scale
+        self.latency_ms = {**LATENCY_MS, **(latency_ms or {})}
+
+        self.old_ram = bytearray(blank_frame(width, height))
+        self.new_ram = bytearray(blank_frame(width, height))
+        self.displayed = bytes(blank_frame(width, height))
+
+        self.gpio_writes = 0
+        self.spi_transactions = 0
+        self.spi_bytes = 0
+        self.busy_ms = 0.0
+        self.refreshes = {"full": 0, "fast": 0, "partial": 0}
+
+        self._pins = {self.DC_PIN: 0, self.CS_PIN: 1, self.RST_PIN: 1}
+        self._command: int | None = None
+        self._data = bytearray()
+        self._busy_until = 0.0
+        self.asleep = False
+        self.powered = False
+        self.fast_waveform = False
+        self.partial_mode = False
+        self.copy_new_to_old = False
+        # x_start, x_end, y_start, y_end in pixels, inclusive
+        self.window = (0, width - 1, 0, height - 1)
+
+    # Backend interface
+
+    def digital_write(self, pin: int, value: int):
+        """
+        Track DC and CS, a rising edge on RST wakes the panel
+        """
+        self.gpio_writes += 1
+        if pin == self.RST_PIN and value and not self._pins[self.RST_PIN]:
+            self._reset()
+        if pin == self.CS_PIN and value and not self._pins[self.CS_PIN]:
+            self._end_command()
+        self._pins[pin] = value
+
+    def digital_read(self, pin: int) -> int:
+        """
+        BUSY is low while the simulated panel is busy
+        """
+        if pin == self.BUSY_PIN:
+            return int(time.monotonic() >= self._busy_until)
+        return self._pins.get(pin, 0)
+
+    def delay_ms(self, delaytime: float):
+        """
+        Sleep for the scaled time
+        """
+        time.sleep(delaytime * self.time_scale / 1000)
+
+    def wait_until_idle(self, pin, timeout_ms=BUSY_TIMEOUT_MS, before_read=None):
+        """
+        Poll BUSY with backoff, there are no edge interrupts to wait on
+        """
+        return poll_until_idle(lambda: self.digital_read(pin), timeout_ms, before_read)
+
+    def spi_writebyte(self, data):
+        """
+        A command byte when DC is low, data when it is high
+        """
+        self._write(bytes(data))
+
+    def spi_writebyte2(self, data):
+        """
+        Same as spi_writebyte, the real backend just allows longer transfers
+        """
+        self._write(bytes(data))
+
+    def module_init(self):
+        """
+        Nothing to open
+        """
+        return 0
+
+    def module_exit(self):
+        """
+        Nothing to close
+        """
+        log.debug("Simulated panel module exit")
+
+    def counters(self) -> dict:
+        """
+        GPIO writes, SPI transactions and time spent busy so far
+        """
+        return {
+            "gpio_writes": self.gpio_writes,
+            "spi_transactions": self.spi_transactions,
+            "spi_bytes": self.spi_bytes,
+            "busy_ms": self.busy_ms,
+            "refreshes": dict(self.refreshes),
+        }
+
+    # Panel model
+
+    def _reset(self):
+        """
+        Hardware reset, which is also the only way out of deep sleep
+        """
+        self.asleep = False
+        self.powered = False
+        self.fast_waveform = False
+        self.partial_mode = False
+        self.copy_new_to_old = False
+        self.window = (0, self.width - 1, 0, self.height - 1)
+
+    def _write(self, data: bytes):
+        """
+        Decode one SPI transaction
+        """
+        self.spi_transactions += 1
+        self.spi_bytes += len(data)
+        if self.asleep:
+            log.warning("Simulated panel is in deep sleep, ignoring SPI write")
+            return
+        if self._pins[self.DC_PIN]:
+            self._data += data
+            return
+        for command in data:
+            self._end_command()
+            self._command = command
+            self._run_command()
+
+    def _busy(self, kind: str):
+        """
+        Hold BUSY low for the latency of an operation
+        """
+        latency = self.latency_ms[kind]
+        self.busy_ms += latency
+        self._busy_until = time.monotonic() + latency * self.time_scale / 1000
+
+    def _run_command(self):
+        """
+        Commands that act without data
+        """
+        command = self._command
+        if command == 0x04:
+            self.powered = True
+            self._busy("power_on")
+        elif command == 0x02:
+            self.powered = False
+            self._busy("power_off")
+        elif command == 0x91:
+            self.partial_mode = True
+        elif command == 0x92:
+            self.partial_mode = False
+        elif command == 0x12:
+            self._refresh()
+
+    def _end_command(self):
+        """
+        Apply the data sent after the current command
+        """
+        command, data = self._command, bytes(self._data)
+        self._command = None
+        self._data.clear()
+        if command is None or not data:
+            return
+        if command in (0x10, 0x13):
+            self._write_ram(self.old_ram if command == 0x10 else self.new_ram, data)
+        elif command == 0x90 and len(data) >= 8:
+            values = [data[i] << 8 | data[i + 1] for i in range(0, 8, 2)]
+            self.window = tuple(values)
+        elif command == 0x00:
+            # OTP waveform instead of the LUTs written by init
+            self.fast_waveform = data[0] == 0x1F
+        elif command == 0x50:
+            # N2OCP: new data is copied to old data after a refresh
+            self.copy_new_to_old = bool(data[0] & 0x08)
+        elif command == 0x07 and data[0] == 0xA5:
+            self.asleep = True
+
+    def _write_ram(self, ram: bytearray, data: bytes):
+        """
+        Write to the whole frame, or to the partial window in partial mode
+        """
+        if not self.partial_mode:
+            ram[: len(data)] = data[: len(ram)]
+            return
+        x_start, x_end, y_start, y_end = self.window
+        row_bytes = self.width // 8
+        first, end = x_start // 8, x_end // 8 + 1
+        window_bytes = end - first
+        for index, row in enumerate(range(y_start, y_end + 1)):
+            chunk = data[index * window_bytes : (index + 1) * window_bytes]
+            if not chunk:
+                break
+            start = row * row_bytes + first
+            ram[start : start + len(chunk)] = chunk
+
+    def _refresh(self):
+        """
+        Show the new RAM and hold BUSY for the kind of refresh
+        """
+        if not self.powered:
+            log.warning("Simulated panel refreshed while powered off")
+        if self.partial_mode:
+            kind = "partial"
+        elif self.fast_waveform:
+            kind = "fast"
+        else:
+            kind = "full"
+        self.refreshes[kind] += 1
+        self.displayed = bytes(self.new_ram)
+        if self.copy_new_to_old:
+            self.old_ram[:] = self.new_ram
+        self._busy(kind)
+
+    def image(self) -> Image.Image:
+        """
+        What the panel currently shows, in the same 1-bit mode the renderers use
+        """
+        return Image.frombytes(
+            "1", (self.width, self.height), self.displayed, "raw", "1;I"
+        )
+
+    def save_png(self, path: str):
+        """
+        Dump what the panel currently shows
+        """
+        self.image().save(path, "PNG")
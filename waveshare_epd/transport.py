@@ -0,0 +1,234 @@
+"""
+Frame transport between the API and the display server
+
+Frames are sent as the request body, described by headers:
+    X-Frame-Version: format version, currently 1
+    X-Frame-Encoding: raw, zlib or rle for whole frames,
+        xor-zlib or xor-rle for a delta against a base frame
+    X-Frame-Hash: hash of the decoded frame
+    X-Frame-Base: hash of the base frame a delta applies to
+
+The display server lists the encodings it accepts in X-Frame-Accept-Encoding.
+A server that doesn't send it only accepts raw frames.
+"""
+import re
+import zlib
+from typing import Mapping, NamedTuple
+
+from .frame import frame_hash, frame_size
+
+FORMAT_VERSION = "1"
+VERSION_HEADER = "X-Frame-Version"
+ENCODING_HEADER = "X-Frame-Encoding"
+HASH_HEADER = "X-Frame-Hash"
+BASE_HEADER = "X-Frame-Base"
+ACCEPT_HEADER = "X-Frame-Accept-Encoding"
+
+ENCODINGS = ("raw", "zlib", "rle", "xor-zlib", "xor-rle")
+
+# Runs of 3 or more identical bytes
+_RUN = re.compile(rb"(.)\1{2,}", re.DOTALL)
+
+
+class FrameFormatError(ValueError):
+    """
+    The frame could not be decoded
+    """
+
+
+class BaseFrameMismatch(FrameFormatError):
+    """
+    A delta was sent against a base frame that the server does not have
+    """
+
+
+class EncodedFrame(NamedTuple):
+    """
+    Request body and headers for a frame
+    """
+
+    body: bytes
+    headers: dict[str, str]
+
+
+def _append_literal(out: bytearray, literal: bytes):
+    """
+    PackBits literal: a header of length - 1 followed by the bytes
+    """
+    for start in range(0, len(literal), 128):
+        chunk = literal[start : start + 128]
+        out.append(len(chunk) - 1)
+        out += chunk
+
+
+def rle_encode(data: bytes) -> bytes:
+    """
+    PackBits run length encoding
+    Mostly white frames and deltas are long runs of zero bytes
+    """
+    out = bytearray()
+    position = 0
+    for match in _RUN.finditer(data):
+        _append_literal(out, data[position : match.start()])
+        value = match.group(1)
+        run_length = match.end() - match.start()
+        while run_length > 0:
+            count = min(run_length, 128)
+            if count == 1:
+                _append_literal(out, value)
+            else:
+                out.append(257 - count)
+                out += value
+            run_length -= count
+        position = match.end()
+    _append_literal(out, data[position:])
+    return bytes(out)
+
+
+def rle_decode(data: bytes, max_size: int) -> bytes:
+    """
+    Decode PackBits, refusing to produce more than max_size bytes
+    """
+    out = bytearray()
+    position = 0
+    while position < len(data):
+        header = data[position]
+        position += 1
+        if header < 128:
+            count = header + 1
+            out += data[position : position + count]
+            position += count
+        else:
+            count = 257 - header
+            out += data[position : position + 1] * count
+            position += 1
+        if len(out) > max_size:
+            raise FrameFormatError("RLE frame is larger than a frame")
+    return bytes(out)
+
+
+def zlib_decode(data: bytes, max_size: int) -> bytes:
+    """
+    Decompress, refusing to produce more than max_size bytes
+    """
+    decompressor = zlib.decompressobj()
+    try:
+        out = decompressor.decompress(data, max_size)
+    except zlib.error as error:
+        raise FrameFormatError(f"Invalid zlib frame: {error}") from error
+    if decompressor.unconsumed_tail:
+        raise FrameFormatError("zlib frame is larger than a frame")
+    return out
+
+
+def xor_frames(first: bytes, second: bytes) -> bytes:
+    """
+    XOR two equal length frames, as big integers so it runs in C
+    """
+    if len(first) != len(second):
+        raise FrameFormatError("Frames have different sizes")
+    return (int.from_bytes(first, "big") ^ int.from_bytes(second, "big")).to_bytes(
+        len(first), "big"
+    )
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    """
+    Compress with raw, zlib or rle
+    """
+    if compression == "zlib":
+        return zlib.compress(data)
+    if compression == "rle":
+        return rle_encode(data)
+    return data
+
+
+def decompress(data: bytes, compression: str, max_size: int) -> bytes:
+    """
+    Decompress raw, zlib or rle
+    """
+    if compression == "zlib":
+        return zlib_decode(data, max_size)
+    if compression == "rle":
+        return rle_decode(data, max_size)
+    if compression == "raw":
+        return data
+    raise FrameFormatError(f"Unknown encoding: {compression}")
+
+
+def encode_frame(
+    frame: bytes, base: bytes | None = None, accepted: tuple[str, ...] = ("raw",)
+) -> EncodedFrame:
+    """
+    Encode a frame using the smallest of the accepted encodings
+
+    Args:
+        frame: The packed frame
+        base: The frame the server last acknowledged, to send a delta against
+        accepted: Encodings the server accepts
+    """
+    current_hash = frame_hash(frame)
+    candidates = []
+    for encoding in accepted:
+        if encoding not in ENCODINGS:
+            continue
+        headers = {
+            VERSION_HEADER: FORMAT_VERSION,
+            ENCODING_HEADER: encoding,
+            HASH_HEADER: current_hash,
+        }
+        if encoding.startswith("xor-"):
+            if base is None or len(base) != len(frame):
+                continue
+            body = compress(xor_frames(base, frame), encoding[4:])
+            headers[BASE_HEADER] = frame_hash(base)
+        else:
+            body = compress(frame, encoding)
+        candidates.append(EncodedFrame(body, headers))
+    if not candidates:
+        return EncodedFrame(frame, {})
+    return min(candidates, key=lambda candidate: len(candidate.body))
+
+
+def decode_frame(
+    body: bytes,
+    headers: Mapping[str, str],
+    base: bytes | None = None,
+    max_size: int = frame_size(),
+) -> bytes:
+    """
+    Decode a frame from a request
+
+    Requests without a version header are raw frames from older clients.
+
+    Raises:
+        BaseFrameMismatch: A delta's base is not the given base frame
+        FrameFormatError: The frame could not be decoded
+    """
+    version = headers.get(VERSION_HEADER)
+    if version is None:
+        return body
+    if version != FORMAT_VERSION:
+        raise FrameFormatError(f"Unsupported frame format version: {version}")
+
+    encoding = headers.get(ENCODING_HEADER, "raw")
+    if encoding.startswith("xor-"):
+        if base is None or headers.get(BASE_HEADER) != frame_hash(base):
+            raise BaseFrameMismatch("Base frame does not match")
+        frame = xor_frames(base, decompress(body, encoding[4:], max_size))
+    else:
+        frame = decompress(body, encoding, max_size)
+
+    expected_hash = headers.get(HASH_HEADER)
+    if expected_hash is not None and expected_hash != frame_hash(frame):
+        raise FrameFormatError("Decoded frame does not match its hash")
+    return frame
+
+
+def parse_accepted(value: str | None) -> tuple[str, ...]:
+    """
+    Parse X-Frame-Accept-Encoding, a server without it only accepts raw frames
+    """
+    if not value:
+        return ("raw",)
+    return tuple(encoding.strip() for encoding in value.split(","))